@@ -0,0 +1,287 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+AUDIO_BACKENDS = ("pygame", "callback", "null")  # pygame后端（SampleFeeder）依赖混音器，定义在audio_player中
+
+
+class SampleSink:
+    """采样输出后端的公共部分：当前与排队的数据源、曲目代号与音量
+
+    子类实现 start / stop / pause / unpause / skip_to_next / get_position_samples，
+    并给出latency（输出延迟，秒）。get_position_samples返回的是此刻发声的采样位置。
+    """
+    latency = 0.0
+
+    def __init__(self, source, fs):
+        self.source = source
+        self.fs = fs
+        self.volume = 1.0
+        self.next_source = None  # 排队的下一首，当前曲目送完后无缝衔接
+        self.generation = 0  # 正在送数的曲目代号，每切换一首加一
+        self.playing_generation = 0  # 正在发声的曲目代号
+        self.track_lengths = {}  # 已送完的曲目代号 -> 采样数
+        self.lock = threading.Lock()
+
+    def set_next(self, source):
+        """排队下一首的数据源，返回它将使用的曲目代号"""
+        with self.lock:
+            self.next_source = source
+            return self.generation + 1
+
+    def clear_next(self):
+        """取消排队的下一首"""
+        with self.lock:
+            self.next_source = None
+
+    def _switch_source(self):
+        """切换到排队的下一首"""
+        self.track_lengths[self.generation] = len(self.source)
+        self.source, self.next_source = self.next_source, None
+        self.generation += 1
+
+    def _other_generation_position(self, generation):
+        """指定的曲目代号不是正在发声的曲目时，已播完的返回其长度、尚未发声的返回0，否则返回None"""
+        if generation is None or generation == self.playing_generation:
+            return None
+        if generation < self.playing_generation:
+            return self.track_lengths.get(generation, 0)
+        return 0
+
+    def set_volume(self, volume):
+        """设置音量 (0-1)"""
+        self.volume = volume
+
+    def close(self):
+        """释放输出设备"""
+
+
+class ManualClock:
+    """可手动推进的时钟，供NullSink在测试中得到确定的播放位置"""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        """推进时钟"""
+        self.now += seconds
+
+
+class NullSink(SampleSink):
+    """不输出声音的后端：按虚拟时钟推进播放位置，用于没有声卡的环境和确定性的同步测试
+
+    clock默认为单调时钟，即以实时速度“播放”；传入ManualClock时位置只随advance推进。
+    """
+
+    def __init__(self, source, fs, clock=time.monotonic):
+        super().__init__(source, fs)
+        self.clock = clock
+        self.position = 0  # 锚点时刻的采样位置
+        self.anchor_time = None  # None表示未在推进（停止或暂停）
+        self.start_position = 0
+
+    def start(self, position=0, paused=False):
+        """从指定采样位置开始推进，paused为True时保持暂停，直到unpause"""
+        with self.lock:
+            self.position = position
+            self.start_position = position
+            self.playing_generation = self.generation
+            self.anchor_time = None if paused else self.clock()
+
+    def stop(self):
+        """停止推进"""
+        with self.lock:
+            self._advance()
+            self.anchor_time = None
+
+    def pause(self):
+        """暂停"""
+        self.stop()
+
+    def unpause(self):
+        """继续推进"""
+        with self.lock:
+            if self.anchor_time is None:
+                self.anchor_time = self.clock()
+
+    def skip_to_next(self, paused=False):
+        """立即切换到排队的下一首"""
+        with self.lock:
+            if self.next_source is None:
+                return
+            running = self.anchor_time is not None
+            self._switch_source()
+            self.playing_generation = self.generation
+            self.position = 0
+            self.anchor_time = self.clock() if running and not paused else None
+
+    def _advance(self):
+        """按时钟推进位置，越过曲目末尾时衔接排队的下一首，没有下一首则停在末尾"""
+        if self.anchor_time is None:
+            return
+        elapsed = int((self.clock() - self.anchor_time) * self.fs)
+        self.position += elapsed
+        self.anchor_time += elapsed / self.fs  # 不足一个采样的部分留到下次
+        while self.position >= len(self.source):
+            if self.next_source is None:
+                self.position = len(self.source)
+                break
+            self.position -= len(self.source)
+            self._switch_source()
+            self.playing_generation = self.generation
+
+    def get_position_samples(self, generation=None):
+        """获取虚拟时钟下的播放位置；generation的含义同SampleFeeder"""
+        with self.lock:
+            self._advance()
+            other = self._other_generation_position(generation)
+            return self.position if other is None else other
+
+
+class CallbackSink(SampleSink):
+    """回调驱动的低延迟后端：PortAudio（sounddevice）的音频线程从预读缓冲中取数
+
+    送数线程向数据源读取（可能等待解码）并把数据块放入队列，音频回调只从队列取数，
+    不加锁、不等待，队列为空时输出静音。每个送出的块记下它到达DAC的时刻，
+    播放位置按流时钟精确到采样；暂停时回调输出静音而不取数。
+    """
+
+    def __init__(self, source, fs, block_size=256, latency="low", buffer_seconds=0.2, poll_interval=0.005):
+        import sounddevice
+
+        super().__init__(source, fs)
+        self.read_size = block_size * 8  # 送数线程每次读取的采样数
+        self.buffer_samples = max(int(buffer_seconds * fs), self.read_size * 2)
+        self.poll_interval = poll_interval
+        self.next_sample = 0  # 送数线程下一个待读取的采样位置
+        self.start_position = 0
+        # 单生产者单消费者：送数线程只追加、回调只取出，deque的append/popleft本身是原子的
+        self.chunks = deque()  # (曲目代号, 起点, 数据)
+        self.queued_samples = 0  # 只由送数线程累加
+        self.consumed_samples = 0  # 只由回调累加
+        self.current_chunk = None  # 回调正在输出的块 [曲目代号, 起点, 数据, 已输出的采样数]
+        self.blocks = deque(maxlen=256)  # 已送出的块 (到达DAC的时刻, 曲目代号, 起点, 长度)
+        self.paused = True
+        self.running = False
+        self.thread = None
+        self.stream = sounddevice.OutputStream(samplerate=fs, channels=2, dtype="float32",
+                                               blocksize=block_size, latency=latency, callback=self._callback)
+
+    @property
+    def latency(self):
+        """设备报告的输出延迟（秒）"""
+        return self.stream.latency
+
+    def start(self, position=0, paused=False):
+        """从指定采样位置开始送数，paused为True时定位后保持暂停，直到unpause"""
+        self.stop()
+        self.next_sample = position
+        self.start_position = position
+        self.playing_generation = self.generation
+        self.paused = paused
+        self.running = True
+        self.thread = threading.Thread(target=self._feed_loop, daemon=True)
+        self.thread.start()
+        self.stream.start()
+
+    def stop(self):
+        """停止输出与送数，丢弃设备缓冲和预读队列中的数据"""
+        if self.stream.active:
+            self.stream.abort()
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.chunks.clear()
+        self.current_chunk = None
+        self.queued_samples = self.consumed_samples = 0
+        self.blocks.clear()
+
+    def pause(self):
+        """暂停：之后的回调只输出静音"""
+        self.paused = True
+
+    def unpause(self):
+        """继续播放"""
+        self.paused = False
+
+    def _switch_source(self):
+        """切换到排队的下一首"""
+        super()._switch_source()
+        self.next_sample = 0
+
+    def skip_to_next(self, paused=False):
+        """立即切换到排队的下一首"""
+        if self.next_source is None:
+            return
+        running = self.running
+        self.stop()
+        with self.lock:
+            self._switch_source()
+        if running:
+            self.start(0, paused)
+
+    def close(self):
+        """关闭输出流"""
+        self.stop()
+        self.stream.close()
+
+    def _feed_loop(self):
+        """送数线程：保持预读队列中有buffer_samples个采样，当前曲目读完时接着读排队的下一首"""
+        while self.running:
+            if self.queued_samples - self.consumed_samples >= self.buffer_samples:
+                time.sleep(self.poll_interval)
+                continue
+            with self.lock:
+                if self.next_sample >= len(self.source) and self.next_source is not None:
+                    self._switch_source()
+                source, generation, start = self.source, self.generation, self.next_sample
+            block = source.read(start, start + self.read_size)  # 可能等待解码，不持有锁
+            if len(block) == 0:
+                time.sleep(self.poll_interval)  # 曲目结束，或解码尚未跟上
+                continue
+            # 复制出来再排队：读到的块可能是环形缓冲区或共享内存的视图，排队期间会被解码线程覆盖或释放
+            self.chunks.append((generation, start, np.array(block[:, :2], dtype=np.float32)))
+            self.queued_samples += len(block)
+            self.next_sample = start + len(block)
+
+    def _callback(self, outdata, frames, time_info, status):
+        """音频线程：从预读队列填满一个输出块，不加锁、不等待，数据不足的部分输出静音"""
+        filled = 0
+        while not self.paused and filled < frames:
+            if self.current_chunk is None:
+                try:
+                    generation, start, data = self.chunks.popleft()
+                except IndexError:
+                    break
+                self.current_chunk = [generation, start, data, 0]
+            generation, start, data, offset = self.current_chunk
+            length = min(frames - filled, len(data) - offset)
+            np.multiply(data[offset:offset + length], self.volume, out=outdata[filled:filled + length])
+            self.blocks.append((time_info.outputBufferDacTime + filled / self.fs, generation, start + offset, length))
+            filled += length
+            if offset + length < len(data):
+                self.current_chunk[3] = offset + length
+            else:
+                self.current_chunk = None
+        self.consumed_samples += filled
+        outdata[filled:] = 0
+
+    def get_position_samples(self, generation=None):
+        """按流时钟找到正在发声的块，返回精确到采样的播放位置；generation的含义同SampleFeeder"""
+        now = self.stream.time
+        with self.lock:
+            for dac_time, block_generation, start, length in reversed(list(self.blocks)):  # 回调可能同时追加，先取快照
+                if dac_time <= now:
+                    self.playing_generation = block_generation
+                    position = start + min(int((now - dac_time) * self.fs), length)
+                    break
+            else:
+                position = self.start_position  # 第一个块尚未发声
+            other = self._other_generation_position(generation)
+            return position if other is None else other
@@ -0,0 +1,108 @@
+import os
+
+from audio_source import StreamingAudioSource, to_stereo
+from process_decoder import SharedMemoryAudioSource
+from seek_index import build_seek_index
+from signal_stats import load_stats
+from wav_reader import WavAudioSource, load_wav, parse_wav_header
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".ogg", ".flac")
+
+
+def attach_cache_writer(source, file_path, cache):
+    """首次顺序解码的同时写入缓存"""
+    if cache is None:
+        return
+    try:
+        writer = cache.create_writer(file_path, source.fs, len(source))
+    except OSError as e:
+        print(f"无法写入解码缓存: {e}")
+        return
+    if writer is not None:
+        source.block_sinks.append(writer)
+
+
+def load_audio(file_path, streaming=True, cache=None, start=True, decode_process=False):
+    """加载音频文件，返回 (立体声数据或流式数据源, 采样率)
+
+    start为False时流式数据源暂不开始解码，便于调用方先挂接其他写入器。
+    PCM WAV不经过解码器和解码缓存，直接内存映射读取；decode_process为True时，不超过共享内存上限的文件
+    在子进程中整轨解码、经共享内存传回，更长的文件仍用有界环形缓冲区流式解码（并构建跳转索引）；
+    librosa只在其他方式都无法解码时才导入。
+    """
+    if os.path.splitext(file_path)[1].lower() == ".wav":
+        info = parse_wav_header(file_path)
+        if info is not None:
+            if streaming:
+                source = WavAudioSource(file_path, info)
+                return source, source.fs
+            return load_wav(file_path, info)
+
+    if cache is not None:
+        cached = cache.get(file_path)
+        if cached is not None:
+            # 命中解码缓存：内存映射打开，数据按需分页读入
+            return cached
+
+    if decode_process:
+        try:
+            source = SharedMemoryAudioSource(file_path, start=False)
+        except Exception as e:
+            print(f"不在子进程中解码，改为本进程解码: {e}")
+        else:
+            attach_cache_writer(source, file_path, cache)
+            if start:
+                source.start()
+            return source, source.fs
+
+    if streaming:
+        try:
+            # 压缩格式在加载时构建一次跳转索引（缓存命中时直接读取）
+            source = StreamingAudioSource(file_path, seek_index=build_seek_index(file_path, cache),
+                                          start=False)
+        except Exception as e:
+            print(f"无法流式解码，改为完整加载: {e}")
+        else:
+            attach_cache_writer(source, file_path, cache)
+            if start:
+                source.start()
+            return source, source.fs
+
+    # 使用librosa完整解码（导入librosa会连带加载numba、scipy，耗时数秒）
+    import librosa
+
+    data, fs = librosa.load(file_path, sr=None, mono=False)
+    data = to_stereo(data, channels_first=True)
+    if cache is not None:
+        try:
+            cache.put(file_path, data, fs)
+        except OSError as e:
+            print(f"无法写入解码缓存: {e}")
+    return data, fs
+
+
+def load_audio_with_stats(file_path, streaming=True, cache=None, decode_process=False):
+    """加载音频并获取信号统计，返回 (数据, 采样率, SignalStats)
+
+    统计优先读缓存；流式解码时随顺序解码逐块补全，完整数组则一次分块扫描。
+    """
+    data, fs = load_audio(file_path, streaming, cache, start=False, decode_process=decode_process)
+    stats = load_stats(file_path, data, cache)
+    if hasattr(data, "start"):
+        data.start()
+    return data, fs, stats
+
+
+def load_audio_channels(file_path):
+    """完整解码并保留全部声道，返回 (采样点, 声道) 的float32数组和采样率，供多示波器按声道对显示"""
+    try:
+        import soundfile
+
+        data, fs = soundfile.read(file_path, dtype='float32', always_2d=True)
+    except Exception as e:
+        print(f"soundfile无法解码，改用librosa: {e}")
+        import librosa
+
+        data, fs = librosa.load(file_path, sr=None, mono=False)
+        data = data.reshape(-1, data.shape[-1]).T.astype('float32')
+    return data, fs
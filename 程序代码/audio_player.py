@@ -1,57 +1,290 @@
+import threading
+import time
+
+import numpy as np
 import pygame
 
+from audio_backends import AUDIO_BACKENDS, CallbackSink, NullSink, SampleSink
+from audio_source import as_audio_source
+
+MIXER_BUFFER = 512  # pygame混音器的设备缓冲（采样数）
+
+
+class SampleFeeder(SampleSink):
+    """pygame后端：将可视化使用的同一份采样数据分块送入pygame混音通道"""
+
+    def __init__(self, source, fs, block_size=4096, poll_interval=0.005):
+        super().__init__(source, fs)
+        self.block_size = block_size
+        self.poll_interval = poll_interval
+        self.channel = pygame.mixer.Channel(0)
+        self.latency = MIXER_BUFFER / fs  # 混音后还要经过设备缓冲才发声
+
+        self.next_sample = 0  # 下一个待送入通道的采样位置
+        self.block_starts = []  # 已送入通道但尚未开始播放的块 (Sound, 曲目代号, 起点, 长度)
+        self.current_sound = None
+        self.current_block_start = 0
+        self.current_block_length = 0
+        self.current_block_time = None  # 当前块开始播放的时刻
+        self.paused_at = None
+
+        self.running = False
+        self.thread = None
+
+    def start(self, position=0, paused=False):
+        """从指定采样位置开始送数，paused为True时定位后保持暂停，直到unpause"""
+        self.stop()
+        self.next_sample = position
+        self.current_block_start = position
+        self.current_block_length = 0
+        self.current_block_time = None
+        self.current_sound = None
+        self.block_starts = []
+        self.paused_at = time.monotonic() if paused else None
+        self.running = True
+        self.thread = threading.Thread(target=self._feed_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """停止送数并清空通道"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.channel.stop()
+
+    def pause(self):
+        """暂停通道播放"""
+        with self.lock:
+            if self.paused_at is None:
+                self.paused_at = time.monotonic()
+                self.channel.pause()
+
+    def unpause(self):
+        """恢复通道播放，暂停时长不计入播放位置"""
+        with self.lock:
+            if self.paused_at is not None:
+                if self.current_block_time is not None:
+                    self.current_block_time += time.monotonic() - self.paused_at
+                self.paused_at = None
+                self.channel.unpause()
+
+    def _switch_source(self):
+        """切换到排队的下一首"""
+        super()._switch_source()
+        self.next_sample = 0
+
+    def skip_to_next(self, paused=False):
+        """不等当前曲目送完，立即切换到排队的下一首（如静音时画面先行结束）"""
+        if self.next_source is None:
+            return
+        running = self.running
+        self.stop()
+        self._switch_source()
+        self.playing_generation = self.generation
+        self.current_block_start = 0
+        self.current_block_time = None
+        if running:
+            self.start(0, paused)
+
+    def set_volume(self, volume):
+        """设置通道音量 (0-1)"""
+        self.volume = volume
+        self.channel.set_volume(volume)
+
+    def _make_sound(self, start):
+        """读取一个数据块并转换为pygame的Sound对象"""
+        block = self.source.read(start, start + self.block_size)
+        if len(block) == 0:
+            return None, 0
+        pcm = np.empty((len(block), 2), dtype=np.int16)
+        np.multiply(np.clip(block[:, :2], -1.0, 1.0), 32767, out=pcm, casting="unsafe")
+        return pygame.sndarray.make_sound(pcm), len(block)
+
+    def _feed_loop(self):
+        """保持通道中始终有一个排队的数据块"""
+        while self.running:
+            with self.lock:
+                if self.paused_at is None:
+                    self._track_playing_block()
+                    if (self.channel.get_queue() is None and self.next_sample >= len(self.source) and
+                            self.next_source is not None):
+                        self._switch_source()
+                    if self.channel.get_queue() is None and self.next_sample < len(self.source):
+                        sound, length = self._make_sound(self.next_sample)
+                        if sound is not None:
+                            if self.channel.get_busy():
+                                self.channel.queue(sound)
+                            else:
+                                self.channel.play(sound)
+                                self.channel.set_volume(self.volume)
+                            self.block_starts.append((sound, self.generation, self.next_sample, length))
+                            self.next_sample += length
+                            self._track_playing_block()
+            time.sleep(self.poll_interval)
+
+    def _track_playing_block(self):
+        """检测通道切换到新的数据块，记录其开始播放的时刻"""
+        playing = self.channel.get_sound()
+        if playing is None or playing is self.current_sound:
+            return
+        while self.block_starts:
+            sound, generation, start, length = self.block_starts.pop(0)
+            if sound is playing:
+                self.current_sound = sound
+                self.playing_generation = generation
+                self.current_block_start = start
+                self.current_block_length = length
+                self.current_block_time = time.monotonic()
+                break
+
+    def get_position_samples(self, generation=None):
+        """获取此刻发声的采样位置（扣除设备缓冲延迟）；指定曲目代号时，已播完的曲目返回其长度，尚未发声的返回0"""
+        with self.lock:
+            other = self._other_generation_position(generation)
+            if other is not None:
+                return other
+            if self.current_block_time is None:
+                return self.current_block_start
+            now = self.paused_at if self.paused_at is not None else time.monotonic()
+            elapsed = min(int((now - self.current_block_time) * self.fs), self.current_block_length)
+            return max(0, self.current_block_start + elapsed - MIXER_BUFFER)
+
 
 class AudioPlayer:
-    """音频播放控制类"""
+    """音频播放控制类
 
-    def __init__(self):
-        pygame.mixer.init()
+    backend选择共享采样的输出后端：pygame（混音通道）、callback（sounddevice回调，低延迟、
+    位置精确到采样）或null（不输出声音，按虚拟时钟推进，用于无声卡环境与测试）。
+    输出始终播放可视化使用的同一份采样数据（load_samples加载），避免二次解码。
+    """
+
+    def __init__(self, backend="pygame", clock=None):
+        if backend not in AUDIO_BACKENDS:
+            raise ValueError(f"未知的音频后端: {backend}")
+        if backend == "callback":
+            try:
+                import sounddevice  # 仅检查PortAudio是否可用
+            except (ImportError, OSError) as e:
+                print(f"无法使用回调音频后端，改用pygame: {e}")
+                backend = "pygame"
+        self.backend = backend
+        self.clock = clock  # null后端的虚拟时钟，默认单调时钟
+        if backend == "pygame":
+            pygame.mixer.init(buffer=MIXER_BUFFER)
         self.current_file = None
         self.is_playing = False
         self.sound_enabled = True
         self.volume = 0.8
+        self.start_position = 0.0  # 下次play()开始的位置（秒），播放前跳转时记录
+        self.started = False
+        self.feeder = None
 
-    def load_file(self, file_path):
-        """加载音频文件"""
+    def load_samples(self, data, fs, file_path=None):
+        """加载已解码的采样数据（ndarray或数据源），与可视化共用同一次解码"""
         try:
-            pygame.mixer.music.load(file_path)
-            self.current_file = file_path
-            pygame.mixer.music.set_volume(self.volume)
+            self.stop()
+            self.release_samples()
+            self.feeder = self.create_feeder(as_audio_source(data, fs), fs)
+            self.feeder.set_volume(self.volume)
+            self.current_file = file_path or "<samples>"
             return True
         except Exception as e:
-            print(f"加载音频文件失败: {e}")
+            print(f"加载采样数据失败: {e}")
+            self.feeder = None
             return False
 
+    def create_feeder(self, source, fs):
+        """按后端创建共享采样的输出"""
+        if self.backend == "null":
+            return NullSink(source, fs, self.clock or time.monotonic)
+        if self.backend == "callback":
+            return CallbackSink(source, fs)
+        # 混音器采样率与数据一致，保证音频与画面使用同一个采样时钟
+        if pygame.mixer.get_init() != (fs, -16, 2):
+            pygame.mixer.quit()
+            pygame.mixer.init(frequency=fs, size=-16, channels=2, buffer=MIXER_BUFFER, allowedchanges=0)
+        return SampleFeeder(source, fs)
+
+    def release_samples(self):
+        """释放共享采样数据"""
+        if self.feeder is not None:
+            self.feeder.stop()
+            self.feeder.close()
+            self.feeder = None
+
+    def get_latency(self):
+        """输出延迟（秒），由后端报告"""
+        return self.feeder.latency if self.feeder is not None else 0.0
+
     def play(self):
         """播放音频"""
-        if self.current_file and self.sound_enabled:
+        if self.feeder is not None and self.sound_enabled:
             try:
-                pygame.mixer.music.play()
+                self.feeder.start(int(self.start_position * self.feeder.fs))
                 self.is_playing = True
+                self.started = True
             except Exception as e:
                 print(f"播放音频失败: {e}")
 
     def pause(self):
         """暂停播放"""
         if self.is_playing:
-            pygame.mixer.music.pause()
+            if self.feeder is not None:
+                self.feeder.pause()
             self.is_playing = False
 
     def unpause(self):
         """继续播放"""
         if not self.is_playing and self.sound_enabled:
-            pygame.mixer.music.unpause()
+            if self.feeder is not None:
+                self.feeder.unpause()
             self.is_playing = True
 
     def stop(self):
         """停止播放"""
-        pygame.mixer.music.stop()
+        if self.feeder is not None:
+            self.feeder.stop()
+            self.feeder.clear_next()
         self.is_playing = False
+        self.started = False
+        self.start_position = 0.0
+
+    def seek(self, seconds):
+        """跳转到指定位置（秒），暂停中跳转后保持暂停，尚未播放时记录为起始位置"""
+        self.start_position = max(0.0, seconds)
+        if not self.started or self.feeder is None:
+            return
+        try:
+            self.feeder.start(int(self.start_position * self.feeder.fs), paused=not self.is_playing)
+        except Exception as e:
+            print(f"音频跳转失败: {e}")
+
+    def queue_samples(self, data, fs):
+        """排队下一首的采样数据，当前曲目送完后无缝衔接，返回其曲目代号
+
+        采样率与混音器不同（需要重新初始化混音器）或尚未加载采样时无法衔接，返回None。
+        """
+        if self.feeder is None or fs != self.feeder.fs:
+            return None
+        return self.feeder.set_next(as_audio_source(data, fs))
+
+    def skip_to_queued(self):
+        """立即切换到排队的下一首，保持当前的播放/暂停状态"""
+        if self.feeder is not None:
+            self.feeder.skip_to_next(paused=not self.is_playing)
+
+    def get_position(self, generation=None):
+        """获取当前音频播放位置（秒），未在发声时返回None；generation见SampleFeeder.get_position_samples"""
+        if not self.is_playing or not self.sound_enabled or self.feeder is None:
+            return None
+        return self.feeder.get_position_samples(generation) / self.feeder.fs
 
     def set_volume(self, volume_percent):
         """设置音量 (0-100)"""
         self.volume = max(0, min(1.0, volume_percent / 100.0))
-        pygame.mixer.music.set_volume(self.volume)
+        if self.feeder is not None:
+            self.feeder.set_volume(self.volume)
 
     def toggle_sound(self, enabled):
         """切换声音开关"""
@@ -0,0 +1,342 @@
+import threading
+
+import numpy as np
+
+
+def to_stereo(data, channels_first=False):
+    """将解码得到的音频数据整理为 (N, 2) 的立体声数组"""
+    if len(data.shape) == 1:
+        return np.column_stack((data, data))
+    if channels_first:
+        # librosa返回 (声道, 采样点) 布局
+        data = data.T
+    if data.shape[1] == 1:
+        return np.column_stack((data[:, 0], data[:, 0]))
+    return data[:, :2]
+
+
+class ArrayAudioSource:
+    """已完整解码到内存中的音频数据源"""
+
+    def __init__(self, data, fs):
+        self.data = data
+        self.fs = fs
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def channels(self):
+        return self.data.shape[1] if self.data.ndim == 2 else 1
+
+    def read(self, start, stop):
+        """读取 [start, stop) 区间的采样点"""
+        return self.data[start:stop]
+
+    def release(self, position):
+        """内存数据源无需释放缓冲"""
+
+    def seek(self, position):
+        """内存数据源可随机访问，无需处理"""
+
+    def close(self):
+        """关闭数据源"""
+
+
+class StreamingAudioSource:
+    """后台线程分块解码到有界环形缓冲区的流式音频数据源"""
+
+    def __init__(self, file_path, block_size=65536, capacity_seconds=20.0, read_timeout=0.5,
+                 block_sinks=(), seek_index=None, start=True):
+        import soundfile
+
+        self.file_path = file_path
+        self.sound_file = soundfile.SoundFile(file_path)
+        self.decoder = self.sound_file  # 当前读取的解码器，按跳转索引定位后为从帧边界打开的新解码器
+        self.seek_index = seek_index  # 可选：压缩格式的跳转索引（见seek_index.py）
+        self.fs = self.sound_file.samplerate
+        self.total_samples = self.sound_file.frames
+        self.block_size = block_size
+        self.read_timeout = read_timeout
+        self.block_sinks = list(block_sinks)  # 接收顺序解码块的写入器（如解码缓存、信号统计）
+
+        capacity = max(int(capacity_seconds * self.fs), block_size * 2)
+        self.capacity = capacity
+        self.ring = np.zeros((capacity, 2), dtype=np.float32)
+        self.base = 0  # 缓冲区中最早仍有效的采样位置
+        self.head = 0  # 已解码到的采样位置
+        self.seek_request = None
+        self.error = None
+        self.closed = False
+        self.condition = threading.Condition()
+
+        self.decode_thread = threading.Thread(target=self._decode_loop, daemon=True)
+        if start:
+            self.start()
+
+    def start(self):
+        """启动后台解码；需要在解码前挂接写入器时以start=False构造，挂接后再调用"""
+        self.decode_thread.start()
+
+    def __len__(self):
+        return self.total_samples
+
+    @property
+    def channels(self):
+        return 2  # 解码块统一整理为立体声
+
+    @property
+    def finished(self):
+        """是否已解码到文件末尾"""
+        return self.head >= self.total_samples
+
+    def _decode_loop(self):
+        """后台解码循环：缓冲区满时等待消费者释放空间"""
+        while True:
+            with self.condition:
+                while not self.closed and self.seek_request is None and (
+                        self.head >= self.total_samples or
+                        self.head - self.base + self.block_size > self.capacity):
+                    self.condition.wait()
+                if self.closed:
+                    break
+                if self.seek_request is not None:
+                    position = self.seek_request
+                    self.seek_request = None
+                    self._sink_abort()
+                    self._reposition(position)
+                    self.base = self.head = position
+                    self.condition.notify_all()
+                    continue
+                head = self.head
+
+            try:
+                block = self.decoder.read(self.block_size, dtype='float32', always_2d=True)
+            except Exception as e:
+                with self.condition:
+                    self.error = e
+                    self.closed = True
+                    self.condition.notify_all()
+                print(f"流式解码失败: {e}")
+                break
+
+            # 从帧边界重新打开的MP3解码器不裁剪末尾的编码填充
+            block = block[:max(0, self.total_samples - head)]
+            if len(block) == 0:
+                # 实际长度短于文件头声明的长度
+                with self.condition:
+                    self.total_samples = head
+                    self.condition.notify_all()
+
+            block = to_stereo(block)
+            with self.condition:
+                if self.seek_request is not None or head != self.head:
+                    continue  # 解码期间发生了跳转，丢弃该块
+                if len(block):
+                    self._write_ring(head, block)
+                    self.head = head + len(block)
+                    self.condition.notify_all()
+                reached_end = self.head >= self.total_samples
+
+            for sink in self.block_sinks:
+                if len(block):
+                    sink.write(head, block)
+                if reached_end:
+                    sink.finish(self.total_samples)
+            if reached_end:
+                self.block_sinks = []
+
+        self._sink_abort()
+        self._close_decoder()
+        self.sound_file.close()
+
+    def _reposition(self, position):
+        """将解码器定位到position：有跳转索引时从就近的帧边界重新打开，否则使用解码器自身的seek"""
+        opened = None
+        if self.seek_index is not None and position > 0:
+            try:
+                opened = self.seek_index.open_at(position)
+            except Exception as e:
+                print(f"按跳转索引定位失败: {e}")
+        self._close_decoder()
+        if opened is None:
+            self.sound_file.seek(position)
+            return
+        self.decoder, skip = opened
+        self.decoder.read(skip, dtype='float32')  # 丢弃预解码部分，精确对齐到目标采样
+
+    def _close_decoder(self):
+        """关闭按跳转索引打开的解码器，恢复使用原解码器"""
+        if self.decoder is not self.sound_file:
+            self.decoder.close()
+            self.decoder = self.sound_file
+
+    def _sink_abort(self):
+        """跳转或关闭时通知写入器，要求从头连续写入的写入器（如解码缓存）随之移除"""
+        for sink in self.block_sinks:
+            sink.abort()
+        self.block_sinks = [sink for sink in self.block_sinks if not sink.sequential]
+
+    def _write_ring(self, position, block):
+        """将一个解码块写入环形缓冲区（可能回绕）"""
+        offset = position % self.capacity
+        first = min(len(block), self.capacity - offset)
+        self.ring[offset:offset + first] = block[:first]
+        if first < len(block):
+            self.ring[:len(block) - first] = block[first:]
+
+    def read(self, start, stop):
+        """读取 [start, stop) 区间的采样点，数据未就绪时最多等待read_timeout秒"""
+        stop = min(stop, self.total_samples)
+        with self.condition:
+            if start < self.base or start - self.head > self.capacity // 4:
+                # 请求的数据已被释放或远超当前解码位置，重新定位解码位置
+                self._request_seek(start)
+            elif stop > self.base + self.capacity:
+                # 读取更靠后的数据意味着更早的数据已不再需要
+                self.release(stop - self.capacity)
+            self.condition.wait_for(
+                lambda: self.closed or (self.seek_request is None and self.head >= stop),
+                timeout=self.read_timeout)
+            start = max(start, self.base)
+            stop = min(stop, self.head)
+            if stop <= start:
+                return self.ring[:0]
+
+            offset = start % self.capacity
+            length = stop - start
+            if offset + length <= self.capacity:
+                return self.ring[offset:offset + length]
+            first = self.capacity - offset
+            return np.concatenate((self.ring[offset:], self.ring[:length - first]))
+
+    def release(self, position):
+        """声明position之前的数据不再需要，供解码线程复用空间"""
+        with self.condition:
+            position = min(position, self.head)
+            if position > self.base:
+                self.base = position
+                self.condition.notify_all()
+
+    def seek(self, position):
+        """跳转到指定采样位置，缓冲区内已有的数据直接复用"""
+        with self.condition:
+            if self.base <= position <= self.head:
+                return
+            self._request_seek(position)
+
+    def _request_seek(self, position):
+        """通知解码线程从指定位置重新开始解码"""
+        with self.condition:
+            self.seek_request = max(0, min(position, self.total_samples))
+            self.condition.notify_all()
+
+    def close(self):
+        """停止后台解码"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class PipeAudioSource:
+    """从标准输入或命名管道实时读取交织原始PCM（int16或float32）的直播数据源
+
+    读取线程把数据写入固定容量的环形缓冲区，写满时直接覆盖最旧的数据而不是阻塞或无限缓冲；
+    读取方不加锁，复制后按写入线程预留的位置校验并丢弃读取期间被覆盖的部分。
+    """
+    live = True  # 长度未知、不可跳转，画面以已收到的采样数为时钟
+
+    SAMPLE_FORMATS = {"s16": ("<i2", 1 / 32768), "f32": ("<f4", 1.0)}
+
+    def __init__(self, stream, fs, sample_format="s16", channels=2, capacity_seconds=2.0,
+                 chunk_bytes=16384):
+        """stream为二进制文件对象，或命名管道路径（在读取线程中打开，避免等待写入端时阻塞界面）"""
+        self.stream = None if isinstance(stream, str) else stream
+        self.file_path = stream if isinstance(stream, str) else getattr(stream, "name", "<stdin>")
+        self.fs = fs
+        self.dtype, self.scale = self.SAMPLE_FORMATS[sample_format]
+        self.input_channels = channels
+        self.chunk_bytes = chunk_bytes
+        self.capacity = int(capacity_seconds * fs)
+        self.ring = np.zeros((self.capacity, 2), dtype=np.float32)
+        self.head = 0  # 已写入完成的采样总数
+        self.reserved = 0  # 写入线程正在写入的区间终点，此前capacity个采样之外的数据可能已被覆盖
+        self.finished = False  # 输入已结束
+        self.closed = False
+        self.error = None
+
+        self.read_thread = threading.Thread(target=self._read_loop, daemon=True)
+        self.read_thread.start()
+
+    def __len__(self):
+        return self.head
+
+    @property
+    def channels(self):
+        return 2
+
+    def _read_loop(self):
+        """读取线程：按整帧解析输入，写入环形缓冲区"""
+        frame_bytes = np.dtype(self.dtype).itemsize * self.input_channels
+        pending = b""
+        try:
+            stream = self.stream or open(self.file_path, "rb")
+            read = getattr(stream, "read1", stream.read)  # 有多少读多少，不等凑满整块
+            while not self.closed:
+                data = read(self.chunk_bytes)
+                if not data:
+                    break
+                pending += data
+                usable = len(pending) - len(pending) % frame_bytes
+                if usable:
+                    samples = np.frombuffer(pending[:usable], dtype=self.dtype).reshape(-1, self.input_channels)
+                    pending = pending[usable:]
+                    self._write_ring(to_stereo(samples) * np.float32(self.scale))
+        except Exception as e:
+            self.error = e
+            print(f"实时输入读取失败: {e}")
+        self.finished = True
+
+    def _write_ring(self, block):
+        """写入一块数据，超过容量的部分只保留最新的"""
+        block = block[-self.capacity:]
+        head = self.head
+        self.reserved = head + len(block)  # 先声明将被覆盖的区间，再写入
+        offset = head % self.capacity
+        first = min(len(block), self.capacity - offset)
+        self.ring[offset:offset + first] = block[:first]
+        self.ring[:len(block) - first] = block[first:]
+        self.head = self.reserved
+
+    def read(self, start, stop):
+        """读取 [start, stop) 区间仍在缓冲区中的采样点（返回副本）"""
+        start = max(start, self.reserved - self.capacity)
+        stop = min(stop, self.head)
+        if stop <= start:
+            return self.ring[:0].copy()
+        offset = start % self.capacity
+        length = stop - start
+        if offset + length <= self.capacity:
+            block = self.ring[offset:offset + length].copy()
+        else:
+            block = np.concatenate((self.ring[offset:], self.ring[:length - (self.capacity - offset)]))
+        # 复制期间写入线程可能已覆盖了最旧的一段，丢弃这部分
+        overwritten = self.reserved - self.capacity - start
+        return block[overwritten:] if overwritten > 0 else block
+
+    def release(self, position):
+        """环形缓冲区自动覆盖旧数据，无需释放"""
+
+    def seek(self, position):
+        """直播输入不可跳转"""
+
+    def close(self):
+        """停止读取；阻塞在管道读取上的线程会在下一次读取返回后退出"""
+        self.closed = True
+
+
+def as_audio_source(data, fs):
+    """将ndarray包装为数据源，已是数据源的对象原样返回"""
+    if isinstance(data, np.ndarray):
+        return ArrayAudioSource(data, fs)
+    return data
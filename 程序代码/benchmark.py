@@ -0,0 +1,265 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows没有resource模块，只报告tracemalloc统计的峰值
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+
+from signal_generator import lissajous
+
+SAMPLE_RATES = (44100, 96000, 192000)
+DURATIONS = (10, 60)
+QUICK_DURATIONS = (5,)
+HEAVY_MODULES = ("librosa", "numba", "scipy")  # 启动时不应导入，只在需要librosa解码时加载
+
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import oscillofun_player
+imported = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv[:1])
+window = oscillofun_player.OscillofunPlayer()
+window.show()
+app.processEvents()
+shown = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "window_ms": (shown - start) * 1000,
+                  "heavy": [name for name in %r if name in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def time_call(func, repeat):
+    """重复执行并返回每次耗时（毫秒）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings, **extra):
+    """汇总耗时统计"""
+    result = {
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "max_ms": max(timings),
+        "runs": len(timings),
+    }
+    result.update(extra)
+    return result
+
+
+def peak_memory(func):
+    """执行func并返回 (返回值, 期间Python/NumPy分配的峰值字节数)"""
+    tracemalloc.start()
+    try:
+        value = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return value, peak
+
+
+def max_rss_bytes():
+    """进程的峰值常驻内存（字节），不支持的平台返回None；ru_maxrss在macOS上以字节计，其他Unix以KB计"""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def write_test_file(tmp_dir, fs, seconds):
+    """生成李萨如测试信号并写为WAV文件"""
+    import soundfile
+
+    file_path = os.path.join(tmp_dir, f"lissajous_{fs}_{seconds}s.wav")
+    soundfile.write(file_path, lissajous(fs, seconds), fs, subtype="FLOAT")
+    return file_path
+
+
+def bench_startup(repeat):
+    """冷启动：在新进程中从导入播放器模块到主窗口显示的耗时，并检查是否提前导入了重量级解码库"""
+    env = dict(os.environ)
+    env.setdefault("SDL_AUDIODRIVER", "dummy")
+    import_times, window_times, heavy = [], [], set()
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), env=env, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        import_times.append(result["import_ms"])
+        window_times.append(result["window_ms"])
+        heavy.update(result["heavy"])
+    return {
+        "import": summarize(import_times),
+        "window_shown": summarize(window_times, heavy_modules=sorted(heavy)),
+    }
+
+
+def bench_decode(file_path, repeat):
+    """加载/解码：完整解码以及流式解码到第一帧可用"""
+    from audio_loader import load_audio
+
+    results = {}
+
+    def full_load():
+        data, _ = load_audio(file_path, streaming=False)
+        return data
+
+    full_load()  # 预热，排除首次导入开销
+    (_, peak) = peak_memory(full_load)
+    results["full"] = summarize(time_call(full_load, repeat), peak_bytes=peak)
+
+    def first_frame():
+        source, fs = load_audio(file_path, streaming=True)
+        source.read(0, fs // 30)
+        source.close()
+
+    (_, peak) = peak_memory(first_frame)
+    results["stream_first_frame"] = summarize(time_call(first_frame, repeat), peak_bytes=peak)
+    return results
+
+
+def bench_frames(data, fs, frame_rate=30):
+    """逐帧截取：OscillofunThread.get_frame 遍历整段数据"""
+    from oscillofun_thread import OscillofunThread
+
+    framer = OscillofunThread(data, fs, frame_rate)
+    frames = min(framer.total_frames, 3000)
+
+    def walk():
+        for frame_number in range(frames):
+            framer.get_frame(frame_number)
+
+    timings = time_call(walk, 3)
+    return summarize([t / frames for t in timings], frames=frames)
+
+
+def bench_paint(data, fs, repeat, frame_rate=30):
+    """离屏绘制：OscilloscopeWidget.paintEvent 渲染到QImage"""
+    from PyQt5.QtGui import QImage
+    from oscilloscope_widget import OscilloscopeWidget
+
+    widget = OscilloscopeWidget()
+    widget.resize(720, 720)
+    image = QImage(720, 720, QImage.Format_RGB32)
+    frame = data[:fs // frame_rate]
+
+    results = {}
+    for name, mode, persistence, binning in (("legacy", "legacy", False, False),
+                                             ("vectorized", "vectorized", False, False),
+                                             ("pixel_binned", "vectorized", False, True),
+                                             ("persistence", "vectorized", True, False)):
+        widget.set_render_mode(mode)
+        widget.set_persistence(persistence)
+        widget.set_level_of_detail(pixel_binning=binning)
+
+        def paint():
+            widget.set_frame_data(frame)
+            widget.render(image)
+
+        paint()
+        runs = max(3, repeat // 4) if mode == "legacy" else repeat
+        results[name] = summarize(time_call(paint, runs), points=len(frame))
+    widget.deleteLater()
+    return results
+
+
+def run_suite(quick=False, repeat=20, startup_only=False):
+    """运行全部基准测试，返回可序列化为JSON的结果"""
+    from PyQt5.QtWidgets import QApplication
+
+    results = {}
+    for name, value in bench_startup(max(3, repeat // 4)).items():
+        results[f"startup/{name}"] = value
+    if startup_only:
+        return {"meta": {"python": sys.version.split()[0], "platform": platform.platform(),
+                         "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")},
+                "results": results}
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    durations = QUICK_DURATIONS if quick else DURATIONS
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for fs in SAMPLE_RATES:
+            for seconds in durations:
+                label = f"{fs}Hz/{seconds}s"
+                file_path = write_test_file(tmp_dir, fs, seconds)
+                for name, value in bench_decode(file_path, max(3, repeat // 4)).items():
+                    results[f"decode/{name}/{label}"] = value
+                data = lissajous(fs, seconds)
+                results[f"frames/get_frame/{label}"] = bench_frames(data, fs)
+                os.remove(file_path)
+            for name, value in bench_paint(lissajous(fs, 1), fs, repeat).items():
+                results[f"paint/{name}/{fs}Hz"] = value
+    del app
+
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "quick": quick,
+            "max_rss_bytes": max_rss_bytes(),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """与基线比较中位耗时，返回退化项列表"""
+    regressions = []
+    for name, value in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        if value["median_ms"] > base["median_ms"] * (1 + tolerance):
+            regressions.append((name, base["median_ms"], value["median_ms"]))
+    return regressions
+
+
+def main():
+    """命令行入口：运行基准测试，输出JSON并可与基线比较"""
+    parser = argparse.ArgumentParser(description="Oscillofun解码、分帧与绘制性能基准测试")
+    parser.add_argument("-o", "--output", help="结果JSON输出路径，省略时打印到标准输出")
+    parser.add_argument("--baseline", help="基线JSON文件，任一项中位耗时超出容差即以非零状态退出")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许的相对退化比例，默认0.25")
+    parser.add_argument("--quick", action="store_true", help="仅运行短信号，便于快速检查")
+    parser.add_argument("--repeat", type=int, default=20, help="每项重复次数")
+    parser.add_argument("--startup", action="store_true", help="仅测量冷启动耗时")
+    args = parser.parse_args()
+
+    report = run_suite(quick=args.quick, repeat=args.repeat, startup_only=args.startup)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for name, before, after in regressions:
+            print(f"性能退化: {name} {before:.3f}ms -> {after:.3f}ms", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("未发现性能退化", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
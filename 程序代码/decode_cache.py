@@ -0,0 +1,228 @@
+import glob
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+
+class CacheWriter:
+    """将流式解码的数据块顺序写入缓存文件，完整写完后才提交"""
+    sequential = True  # 跳转后放弃
+
+    def __init__(self, cache, key, file_path, fs, total_samples):
+        self.cache = cache
+        self.key = key
+        self.file_path = file_path
+        self.fs = fs
+        self.tmp_path = cache.entry_path(key) + f".{os.getpid()}.{threading.get_ident()}.tmp"
+        self.array = np.lib.format.open_memmap(self.tmp_path, mode="w+", dtype=np.float32,
+                                               shape=(total_samples, 2))
+        self.written = 0  # 从头开始连续写入的采样数
+        self.broken = False
+
+    def write(self, position, block):
+        """写入一个解码块，出现跳转后放弃本次缓存"""
+        if self.broken:
+            return
+        if position != self.written or position + len(block) > len(self.array):
+            self.broken = True
+            return
+        self.array[position:position + len(block)] = block
+        self.written += len(block)
+
+    def finish(self, total_samples):
+        """解码结束，数据完整时提交到缓存"""
+        if self.broken or self.written != total_samples or total_samples != len(self.array):
+            self.abort()
+            return
+        self.array.flush()
+        del self.array
+        self.cache.commit(self.key, self.file_path, self.fs, self.tmp_path)
+
+    def abort(self):
+        """丢弃未完成的缓存文件"""
+        self.broken = True
+        self.array = None
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+class DecodeCache:
+    """已解码音频的磁盘缓存，以内存映射方式打开，按LRU淘汰"""
+
+    def __init__(self, cache_dir=None, max_bytes=2 * 1024 ** 3):
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "oscillofun_player")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+        self.index = self._load_index()
+
+    def _load_index(self):
+        """读取缓存索引，丢弃对应文件已不存在的条目"""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        return {key: entry for key, entry in index.items() if os.path.exists(self.entry_path(key))}
+
+    def _save_index(self):
+        """原子地写回缓存索引"""
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    def entry_path(self, key):
+        """缓存条目对应的.npy文件路径"""
+        return os.path.join(self.cache_dir, key + ".npy")
+
+    def sidecar_path(self, key, name):
+        """缓存条目附属数据（如跳转索引）的.npz文件路径"""
+        return os.path.join(self.cache_dir, f"{key}.{name}.npz")
+
+    @staticmethod
+    def make_key(file_path, sample_rate=None):
+        """按路径、大小、修改时间和目标采样率生成缓存键"""
+        stat = os.stat(file_path)
+        raw = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}|{sample_rate}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, file_path, sample_rate=None):
+        """查询缓存，命中时返回 (内存映射的立体声数组, 采样率)，否则返回None"""
+        try:
+            key = self.make_key(file_path, sample_rate)
+        except OSError:
+            return None
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            try:
+                data = np.load(self.entry_path(key), mmap_mode="r")
+            except (OSError, ValueError):
+                self.index.pop(key, None)
+                self._save_index()
+                self.misses += 1
+                return None
+            entry["last_access"] = time.time()
+            self._save_index()
+            self.hits += 1
+            return data, entry["fs"]
+
+    def fits(self, total_samples):
+        """立体声float32数据是否装得下；超过容量上限的曲目写入后也会立即被淘汰，不必缓存"""
+        return total_samples * 2 * np.dtype(np.float32).itemsize <= self.max_bytes
+
+    def put(self, file_path, data, fs, sample_rate=None):
+        """将完整解码的立体声数组写入缓存，超过容量上限时跳过"""
+        if not self.fits(len(data)):
+            return
+        key = self.make_key(file_path, sample_rate)
+        tmp_path = self.entry_path(key) + f".{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(data, dtype=np.float32))
+        self.commit(key, file_path, fs, tmp_path)
+
+    def load_sidecar(self, file_path, name, sample_rate=None):
+        """读取与源文件关联的附属数组，返回 {名称: 数组} 或None；不要求解码数据本身已缓存"""
+        try:
+            path = self.sidecar_path(self.make_key(file_path, sample_rate), name)
+            with np.load(path) as arrays:
+                return {key: arrays[key] for key in arrays.files}
+        except (OSError, ValueError):
+            return None
+
+    def save_sidecar(self, file_path, name, arrays, sample_rate=None):
+        """保存与源文件关联的附属数组，源文件修改后键随之失效"""
+        path = self.sidecar_path(self.make_key(file_path, sample_rate), name)
+        tmp_path = path + f".{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    def create_writer(self, file_path, fs, total_samples, sample_rate=None):
+        """为流式解码创建缓存写入器，曲目超过容量上限时返回None"""
+        if not self.fits(total_samples):
+            return None
+        key = self.make_key(file_path, sample_rate)
+        return CacheWriter(self, key, file_path, fs, total_samples)
+
+    def commit(self, key, file_path, fs, tmp_path):
+        """将写好的临时文件纳入缓存并执行淘汰"""
+        with self.lock:
+            os.replace(tmp_path, self.entry_path(key))
+            self.index[key] = {
+                "path": os.path.abspath(file_path),
+                "fs": fs,
+                "bytes": os.path.getsize(self.entry_path(key)),
+                "last_access": time.time(),
+            }
+            self._evict(keep=key)
+            self._save_index()
+
+    def _evict(self, keep=None):
+        """超出容量上限时按最近最少使用顺序删除条目，keep为刚写入、不参与淘汰的条目"""
+        total = sum(entry["bytes"] for entry in self.index.values())
+        for key in sorted(self.index, key=lambda k: self.index[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self.index[key]["bytes"]
+            del self.index[key]
+            for path in [self.entry_path(key)] + glob.glob(self.sidecar_path(key, "*")):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # Windows下仍被映射的文件暂时无法删除
+
+    def clear(self):
+        """清空缓存"""
+        with self.lock:
+            paths = [self.entry_path(key) for key in self.index]
+            for path in paths + glob.glob(self.sidecar_path("*", "*")):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.index = {}
+            self._save_index()
+
+    def get_stats(self):
+        """获取缓存统计信息"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.index),
+            "bytes": sum(entry["bytes"] for entry in self.index.values()),
+            "max_bytes": self.max_bytes,
+        }
+
+
+def main():
+    """命令行：查看或清空解码缓存"""
+    cache = DecodeCache()
+    if "--clear" in sys.argv[1:]:
+        cache.clear()
+        print("解码缓存已清空")
+    stats = cache.get_stats()
+    print(f"缓存目录: {cache.cache_dir}")
+    print(f"条目: {stats['entries']} | 占用: {stats['bytes'] / 1024 ** 2:.1f}MB / "
+          f"{stats['max_bytes'] / 1024 ** 2:.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
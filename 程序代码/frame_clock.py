@@ -0,0 +1,85 @@
+import time
+
+
+class FrameClock:
+    """画面线程的调度时钟：优先跟随音频播放位置，不可用时退回单调时钟，按时钟决定下一帧
+
+    单示波器与多示波器的画面线程共用，暂停补偿、时钟回退时的重同步与丢帧统计只在这里实现。
+    """
+
+    def __init__(self, resync_threshold=0.25, max_sleep=0.05):
+        self.clock_source = None
+        self.live_time = None  # 可选：实时输入按已收到的采样数给出的时间，优先于其他时钟
+        self.origin = time.monotonic()
+        self.pause_started = None
+        self.dropped_frames = 0
+        self.sync_offset = 0.0  # 最近一帧的画面相对时钟的偏差（秒，正数表示画面落后）
+        self.max_sync_offset = 0.0
+        self.resync_threshold = resync_threshold  # 音频时钟回退超过该值时画面跟随回退（秒）
+        self.max_sleep = max_sleep  # 单次休眠上限，保证暂停/停止响应及时
+
+    def set_clock_source(self, clock_source):
+        """设置外部时钟，clock_source() 返回音频播放位置（秒），不可用时返回None"""
+        self.clock_source = clock_source
+
+    def anchor(self, playback_time):
+        """将单调时钟锚定到指定的播放时间；暂停中锚定时从此刻重新计算暂停时长"""
+        self.origin = time.monotonic() - playback_time
+        if self.pause_started is not None:
+            self.pause_started = time.monotonic()
+
+    def playback_time(self):
+        """获取当前播放时间（秒），音频时钟可用时同步校准单调时钟"""
+        if self.live_time is not None:
+            return self.live_time()
+        if self.clock_source is not None:
+            audio_time = self.clock_source()
+            if audio_time is not None:
+                self.anchor(audio_time)
+                return audio_time
+        return time.monotonic() - self.origin
+
+    def pause(self):
+        """开始暂停，暂停期间的时长不计入单调时钟"""
+        if self.pause_started is None:
+            self.pause_started = time.monotonic()
+
+    def resume(self):
+        """结束暂停"""
+        if self.pause_started is not None:
+            self.origin += time.monotonic() - self.pause_started
+        self.pause_started = None
+
+    def next_frame(self, current_frame, frame_rate):
+        """按时钟决定要发布的帧号；画面超前时休眠并返回None，落后时直接跳过过期帧而不是排队补发"""
+        now = self.playback_time()
+        target_frame = int(now * frame_rate)
+        if target_frame < current_frame:
+            if current_frame - target_frame <= self.resync_threshold * frame_rate:
+                # 画面超前，等待时钟追上
+                time.sleep(min(current_frame / frame_rate - now, self.max_sleep))
+                return None
+            # 否则音频时钟明显回退（如恢复声音），画面跟随音频
+        elif target_frame > current_frame:
+            self.dropped_frames += target_frame - current_frame
+        self.sync_offset = now - target_frame / frame_rate
+        self.max_sync_offset = max(self.max_sync_offset, abs(self.sync_offset))
+        return target_frame
+
+    def sleep_until(self, frame_number, frame_rate):
+        """休眠到指定帧的时刻，而不是在处理耗时之上再叠加固定间隔"""
+        wait = frame_number / frame_rate - self.playback_time()
+        if wait > 0:
+            time.sleep(min(wait, self.max_sleep))
+
+    def idle(self):
+        """暂停中的一次轮询休眠"""
+        time.sleep(self.max_sleep)
+
+    def get_stats(self):
+        """获取调度统计：丢弃帧数与音画偏差"""
+        return {
+            "dropped_frames": self.dropped_frames,
+            "sync_offset": self.sync_offset,
+            "max_sync_offset": self.max_sync_offset,
+        }
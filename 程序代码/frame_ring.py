@@ -0,0 +1,63 @@
+import threading
+
+import numpy as np
+
+
+class FrameRing:
+    """预分配的帧槽环：工作线程写入，界面线程只取最新的完整帧"""
+
+    def __init__(self, max_frame_size, slots=3, channels=2, dtype=np.float32):
+        # 至少三个槽：一个正在写入，一个是最新完成帧，一个被界面持有
+        slots = max(3, slots)
+        self.buffers = np.zeros((slots, max_frame_size, channels), dtype=dtype)
+        self.lengths = [0] * slots
+        self.sequences = [-1] * slots
+        self.frame_numbers = [-1] * slots
+        self.progress = [0.0] * slots
+        self.latest_slot = -1
+        self.reading_slot = -1
+        self.writing_slot = -1
+        self.sequence = -1
+        self.lock = threading.Lock()
+
+    @property
+    def max_frame_size(self):
+        return self.buffers.shape[1]
+
+    def begin_write(self):
+        """选取一个既不是最新帧也未被界面持有的槽，返回 (槽号, 整个槽的缓冲区)"""
+        with self.lock:
+            for slot in range(len(self.buffers)):
+                if slot != self.latest_slot and slot != self.reading_slot:
+                    self.writing_slot = slot
+                    return slot, self.buffers[slot]
+        raise RuntimeError("帧槽环没有可写入的槽")
+
+    def commit(self, slot, length, frame_number, progress):
+        """发布写好的帧，返回其序号"""
+        with self.lock:
+            self.sequence += 1
+            self.lengths[slot] = length
+            self.sequences[slot] = self.sequence
+            self.frame_numbers[slot] = frame_number
+            self.progress[slot] = progress
+            self.latest_slot = slot
+            self.writing_slot = -1
+            return self.sequence
+
+    def acquire_latest(self, after_sequence=-1):
+        """获取序号大于after_sequence的最新帧并持有该槽，返回 (帧数据视图, 帧号, 进度, 序号) 或None"""
+        with self.lock:
+            slot = self.latest_slot
+            if slot < 0 or self.sequences[slot] <= after_sequence:
+                return None
+            self.reading_slot = slot
+            return (self.buffers[slot, :self.lengths[slot]], self.frame_numbers[slot],
+                    self.progress[slot], self.sequences[slot])
+
+    def clear(self):
+        """丢弃已发布的帧"""
+        with self.lock:
+            self.latest_slot = -1
+            self.reading_slot = -1
+            self.sequences = [-1] * len(self.buffers)
@@ -0,0 +1,363 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from PyQt5.QtWidgets import QOpenGLWidget
+from PyQt5.QtGui import (QPainter, QColor, QImage, QOpenGLBuffer, QOpenGLContext, QOpenGLShader,
+                         QOpenGLShaderProgram, QOpenGLVersionProfile, QOffscreenSurface,
+                         QSurfaceFormat)
+
+from beam_interpolation import upsample_frame
+from oscilloscope_widget import OscilloscopeWidget, ScopeDecorations, map_to_screen
+from signal_stats import DEFAULT_DISPLAY_RANGE
+from signal_transform import SignalTransform
+
+GL_POINTS = 0x0000
+GL_LINE_STRIP = 0x0003
+GL_FLOAT = 0x1406
+GL_BLEND = 0x0BE2
+GL_SRC_ALPHA = 0x0302
+GL_ONE = 0x0001
+GL_VERTEX_PROGRAM_POINT_SIZE = 0x8642
+GL_POINT_SMOOTH = 0x0B10
+
+VERTEX_SHADER = """
+attribute vec2 a_position;
+uniform vec2 u_scale;
+uniform vec2 u_offset;
+uniform float u_point_size;
+void main() {
+    gl_Position = vec4(a_position * u_scale + u_offset, 0.0, 1.0);
+    gl_PointSize = u_point_size;
+}
+"""
+
+FRAGMENT_SHADER = """
+uniform vec4 u_color;
+void main() {
+    gl_FragColor = u_color;
+}
+"""
+
+
+def gl_profile():
+    """显示组件使用的OpenGL版本配置（2.0兼容模式，Mesa llvmpipe可用）"""
+    profile = QOpenGLVersionProfile()
+    profile.setVersion(2, 0)
+    return profile
+
+
+def opengl_available():
+    """探测当前平台能否创建OpenGL 2.0上下文"""
+    try:
+        context = QOpenGLContext()
+        context.setFormat(QSurfaceFormat.defaultFormat())
+        if not context.create() or context.isOpenGLES():
+            return False
+        surface = QOffscreenSurface()
+        surface.setFormat(context.format())
+        surface.create()
+        if not surface.isValid() or not context.makeCurrent(surface):
+            return False
+        functions = context.versionFunctions(gl_profile())
+        context.doneCurrent()
+        return functions is not None
+    except Exception as e:
+        print(f"OpenGL不可用: {e}")
+        return False
+
+
+class GLOscilloscopeWidget(ScopeDecorations, QOpenGLWidget):
+    """基于QOpenGLWidget的示波器显示组件，接口与OscilloscopeWidget一致
+
+    每帧的float32采样点直接上传到复用的顶点缓冲区，坐标变换在顶点着色器中完成，
+    发光效果通过加色混合叠加两遍绘制实现。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumSize(500, 500)
+        self.setSizePolicy(1, 1)
+
+        self.current_frame_data = None
+        self.display_range = list(DEFAULT_DISPLAY_RANGE)
+        self.point_color = QColor(0, 255, 0)
+        self.point_size = 2
+        self.title_text = "Oscillofun - X-Y Mode"
+        self.transform = SignalTransform()  # 坐标轴反转等信号变换，播放时与画面线程共用
+        self.draw_mode = "points"
+        self.interpolation = "none"
+        self.upsample_factor = 4
+        self.persistence_enabled = False  # 由加色发光代替CPU余辉缓冲
+        self.frame_number = -1
+        self.perf_monitor = None
+        self.quality_governor = None
+        self.antialiasing = True  # 着色器绘制的数据点不使用该设置，保留以便与QPainter组件互换
+        self.overlay_text = None
+        self.layer_key = None
+        self.background_layer = None
+        self.text_layer = None
+
+        self.gl = None
+        self.program = None
+        self.vertex_buffer = None
+        self.buffer_capacity = 0  # 顶点缓冲区已分配的字节数
+        self.vertex_count = 0
+        self.pending_upload = None
+
+    # ---- 与OscilloscopeWidget一致的接口 ----
+
+    def set_frame_data(self, frame_data, frame_number=-1):
+        """设置当前帧的数据，在下一次paintGL时上传到顶点缓冲区"""
+        self.current_frame_data = frame_data
+        self.frame_number = frame_number
+        self.pending_upload = frame_data
+        self.update()
+
+    def set_display_range(self, display_range, clear=True):
+        """设置显示范围；clear与QPainter组件接口一致（本组件没有余辉缓冲区）"""
+        self.display_range = display_range
+        self.update()
+
+    def set_overlay_text(self, text):
+        """设置性能叠加层文字，None表示隐藏"""
+        self.overlay_text = text
+        self.update()
+
+    def set_persistence(self, enabled, decay_time=None):
+        """OpenGL后端以加色发光呈现，不维护CPU侧的余辉缓冲"""
+        self.persistence_enabled = enabled
+        self.update()
+
+    def set_render_mode(self, mode):
+        """OpenGL后端只有一种渲染方式，保留该接口以便与QPainter组件互换"""
+        self.update()
+
+    def set_level_of_detail(self, pixel_binning=None, max_points=None, hit_brightness=None):
+        """采样点直接上传到GPU绘制，不做像素去重，保留该接口以便与QPainter组件互换"""
+        self.update()
+
+    def set_draw_mode(self, mode, interpolation=None, upsample_factor=None):
+        """设置绘制方式，光束模式可选帧内升采样插值"""
+        if mode not in ("points", "beam"):
+            raise ValueError(f"未知的绘制方式: {mode}")
+        self.draw_mode = mode
+        if interpolation is not None:
+            self.interpolation = interpolation
+        if upsample_factor is not None:
+            self.upsample_factor = max(1, int(upsample_factor))
+        self.pending_upload = self.current_frame_data
+        self.update()
+
+    def transform_changed(self):
+        """信号变换参数改变：重绘标示（没有CPU侧的余辉缓冲需要清除）"""
+        self.update()
+
+    # ---- OpenGL ----
+
+    def initializeGL(self):
+        """编译着色器并创建可复用的顶点缓冲区"""
+        self.gl = self.context().versionFunctions(gl_profile())
+        if self.gl is None:
+            print("无法获取OpenGL 2.0函数，示波器将不绘制数据点")
+            return
+        self.gl.initializeOpenGLFunctions()
+
+        self.program = QOpenGLShaderProgram(self)
+        self.program.addShaderFromSourceCode(QOpenGLShader.Vertex, VERTEX_SHADER)
+        self.program.addShaderFromSourceCode(QOpenGLShader.Fragment, FRAGMENT_SHADER)
+        self.program.bindAttributeLocation("a_position", 0)
+        if not self.program.link():
+            print(f"着色器链接失败: {self.program.log()}")
+            self.program = None
+            return
+
+        self.vertex_buffer = QOpenGLBuffer(QOpenGLBuffer.VertexBuffer)
+        self.vertex_buffer.create()
+        self.vertex_buffer.setUsagePattern(QOpenGLBuffer.StreamDraw)
+        self.buffer_capacity = 0
+        self.pending_upload = self.current_frame_data
+
+    def upload_frame(self, frame_data):
+        """将一帧float32采样点写入顶点缓冲区，容量不足时才重新分配"""
+        if frame_data is None or len(frame_data) == 0 or len(frame_data.shape) == 1:
+            self.vertex_count = 0
+            return
+        if self.draw_mode == "beam" and self.interpolation != "none":
+            frame_data = upsample_frame(frame_data, self.upsample_factor, self.interpolation)
+        vertices = np.ascontiguousarray(frame_data[:, :2], dtype=np.float32)
+
+        self.vertex_buffer.bind()
+        if vertices.nbytes > self.buffer_capacity:
+            self.buffer_capacity = max(vertices.nbytes, self.buffer_capacity * 2)
+            self.vertex_buffer.allocate(self.buffer_capacity)
+        self.vertex_buffer.write(0, vertices, vertices.nbytes)
+        self.vertex_buffer.release()
+        self.vertex_count = len(vertices)
+
+    def screen_transform(self, width, height):
+        """与map_to_screen一致的坐标映射，换算为着色器使用的NDC缩放与偏移"""
+        x_min, x_max, y_min, y_max = self.display_range
+        x_scale = width / (x_max - x_min) if x_max != x_min else 1
+        y_scale = height / (y_max - y_min) if y_max != y_min else 1
+        # 屏幕坐标 (width//2 + (x-cx)*sx, height//2 - (y-cy)*sy) 转换到 [-1, 1]，c为显示范围中心
+        x_center = (x_min + x_max) / 2
+        y_center = (y_min + y_max) / 2
+        scale = (2 * x_scale / width, 2 * y_scale / height)
+        offset = (2 * (width // 2 - x_center * x_scale) / width - 1,
+                  1 - 2 * (height // 2 + y_center * y_scale) / height)
+        return scale, offset
+
+    def draw_beam(self, width, height):
+        """用着色器绘制顶点缓冲区中的采样点，两遍加色混合形成发光"""
+        gl = self.gl
+        if gl is None or self.program is None or self.vertex_count == 0:
+            return
+        scale, offset = self.screen_transform(width, height)
+
+        self.program.bind()
+        self.program.setUniformValue("u_scale", *scale)
+        self.program.setUniformValue("u_offset", *offset)
+        self.vertex_buffer.bind()
+        self.program.enableAttributeArray(0)
+        self.program.setAttributeBuffer(0, GL_FLOAT, 0, 2)
+
+        gl.glEnable(GL_BLEND)
+        gl.glBlendFunc(GL_SRC_ALPHA, GL_ONE)
+        gl.glEnable(GL_VERTEX_PROGRAM_POINT_SIZE)
+        gl.glEnable(GL_POINT_SMOOTH)
+        primitive = GL_LINE_STRIP if self.draw_mode == "beam" else GL_POINTS
+        color = self.point_color
+        glow_alpha = 0.35 if self.persistence_enabled else 0.2
+        for point_size, alpha, line_width in ((self.point_size * 4, glow_alpha, 4.0),
+                                              (self.point_size, 0.9, 1.0)):
+            self.program.setUniformValue("u_point_size", float(point_size))
+            self.program.setUniformValue("u_color", color.redF(), color.greenF(), color.blueF(), alpha)
+            gl.glLineWidth(line_width)
+            gl.glDrawArrays(primitive, 0, self.vertex_count)
+        gl.glDisable(GL_BLEND)
+
+        self.program.disableAttributeArray(0)
+        self.vertex_buffer.release()
+        self.program.release()
+
+    def paintGL(self):
+        """QPainter绘制网格与文字，中间插入原生OpenGL绘制数据点"""
+        paint_start = time.perf_counter() if self.paint_timed() else None
+
+        width = self.width()
+        height = self.height()
+        if self.pending_upload is not None and self.vertex_buffer is not None:
+            self.upload_frame(self.pending_upload)
+        elif self.current_frame_data is None:
+            self.vertex_count = 0
+        self.pending_upload = None
+
+        background_layer, text_layer = self.static_layers(width, height)
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, background_layer)
+
+        painter.beginNativePainting()
+        self.draw_beam(width, height)
+        painter.endNativePainting()
+
+        painter.drawPixmap(0, 0, text_layer)
+        if self.overlay_text:
+            self.draw_overlay(painter)
+        painter.end()
+
+        if paint_start is not None:
+            self.record_paint_time((time.perf_counter() - paint_start) * 1000)
+
+
+def create_oscilloscope_widget(prefer_opengl=False, parent=None):
+    """创建示波器显示组件：优先OpenGL，不可用时回退到QPainter实现"""
+    if prefer_opengl and opengl_available():
+        return GLOscilloscopeWidget(parent)
+    if prefer_opengl:
+        print("OpenGL不可用，回退到QPainter示波器组件")
+    return OscilloscopeWidget(parent)
+
+
+def image_to_rgb(image):
+    """QImage转换为 (高, 宽, 3) 的RGB数组"""
+    image = image.convertToFormat(QImage.Format_RGB32)
+    bits = image.constBits()
+    bits.setsize(image.byteCount())
+    pixels = np.frombuffer(bits, dtype=np.uint8).reshape(image.height(), image.bytesPerLine() // 4, 4)
+    return pixels[:, :image.width(), 2::-1].copy()  # 小端序下为BGRA
+
+
+def check_lit_pixels(rgb, screen_points, radius):
+    """比较点亮的绿色像素与期望的屏幕坐标，返回 (命中的期望点比例, 离所有期望点都超过radius的亮像素数)
+
+    网格与文字为灰、白、黄色，只有数据点以绿色为主。
+    """
+    red, green, blue = (rgb[:, :, c].astype(np.int32) for c in range(3))
+    lit = (green >= 32) & (green > 2 * red) & (green > 2 * blue)
+    ys, xs = np.nonzero(lit)
+    if len(xs) == 0:
+        return 0.0, 0
+    distance = np.hypot(xs[:, None] - screen_points[None, :, 0], ys[:, None] - screen_points[None, :, 1])
+    hit = (distance.min(axis=0) <= 2).mean()  # 每个期望点附近2像素内有亮像素
+    stray = int((distance.min(axis=1) > radius).sum())
+    return float(hit), stray
+
+
+def check_rendering(widget, app, size=300):
+    """离屏渲染一帧已知的采样点，检查点亮的像素与map_to_screen的映射一致，返回 (通过, 说明)"""
+    angles = np.linspace(0, 2 * np.pi, 16, endpoint=False)
+    frame_data = (np.column_stack((np.cos(angles), np.sin(angles))) * 0.5).astype(np.float32)
+    widget.set_transform(SignalTransform())  # 不做方向变换，直接比较映射
+    widget.setMinimumSize(size, size)
+    widget.resize(size, size)
+    widget.show()
+    widget.set_frame_data(frame_data)
+    for _ in range(5):
+        app.processEvents()
+    if isinstance(widget, QOpenGLWidget):
+        image = widget.grabFramebuffer()
+    else:
+        image = widget.grab().toImage()
+    rgb = image_to_rgb(image)
+    expected = map_to_screen(frame_data, widget.width(), widget.height(), widget.display_range)
+    hit, stray = check_lit_pixels(rgb, expected, radius=widget.point_size * 2 + 2)  # 发光半径为点大小的2倍
+    return hit == 1.0 and stray == 0, f"期望点命中 {hit * 100:.0f}%，多余亮像素 {stray}", image
+
+
+def main():
+    """自检：离屏渲染已知的一帧并与map_to_screen比较，可在Mesa llvmpipe软件光栅化下无人值守运行
+
+    退出码：0通过或无法创建OpenGL上下文而跳过，1渲染结果不一致。
+    """
+    parser = argparse.ArgumentParser(description="OpenGL示波器组件离屏自检")
+    parser.add_argument("output", nargs="?", help="保存渲染结果的PNG路径")
+    parser.add_argument("--painter", action="store_true", help="改为检查QPainter组件（作为对照）")
+    args = parser.parse_args()
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.environ.setdefault("LIBGL_ALWAYS_SOFTWARE", "1")
+
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication(sys.argv[:1])
+    if args.painter:
+        widget = OscilloscopeWidget()
+    elif opengl_available():
+        widget = GLOscilloscopeWidget()
+    else:
+        print("跳过：无法创建OpenGL上下文")
+        return
+    passed, message, image = check_rendering(widget, app)
+    if args.output:
+        image.save(args.output)
+    if isinstance(widget, QOpenGLWidget):
+        message = f"OpenGL {widget.context().format().version()}: {message}"
+    print(("通过 " if passed else "失败 ") + message)
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
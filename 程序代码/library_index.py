@@ -0,0 +1,289 @@
+import argparse
+import base64
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from audio_loader import AUDIO_EXTENSIONS, load_audio
+from audio_source import to_stereo
+from process_decoder import START_METHOD
+from signal_stats import HISTOGRAM_LIMIT, SignalStats
+from signal_transform import SignalTransform
+
+INDEX_VERSION = 1
+THUMBNAIL_SIZE = 64
+DENSITY_BINS = 1024  # 累积用的细分直方图，结束时按自动量程裁剪缩放为缩略图
+SAVE_EVERY = 20  # 扫描中每完成若干首写回一次索引，中断后已完成的部分不必重扫
+
+
+class TrackAnalysis:
+    """整轨分析：X-Y密度缩略图（左右声道的二维直方图）、响度与立体声宽度，按数据块增量累积
+
+    密度先在覆盖 [-2, 2] 的细分直方图中累积，结束时按全轨统计的自动量程裁剪，
+    因此无需预先知道信号幅度，也只需顺序解码一遍。
+    """
+
+    def __init__(self, transform=None):
+        self.transform = transform or SignalTransform((-1, -1))  # 与播放器默认的显示方向一致
+        self.stats = SignalStats(2)
+        self.density = np.zeros((DENSITY_BINS, DENSITY_BINS), dtype=np.int64)
+        self.total_lr = 0.0  # 左右声道乘积之和，用于相关系数
+
+    def update(self, block):
+        """累积一个 (采样点, 2) 数据块"""
+        if len(block) == 0:
+            return
+        block = np.ascontiguousarray(block[:, :2], dtype=np.float32)
+        self.stats.update(block)
+        self.total_lr += float(np.dot(block[:, 0].astype(np.float64), block[:, 1]))
+        points = self.transform.apply(block)
+        bins = ((points + HISTOGRAM_LIMIT) * (DENSITY_BINS / (2 * HISTOGRAM_LIMIT))).astype(np.int64)
+        np.clip(bins, 0, DENSITY_BINS - 1, out=bins)
+        self.density += np.bincount(bins[:, 1] * DENSITY_BINS + bins[:, 0],
+                                    minlength=self.density.size).reshape(self.density.shape)
+
+    def thumbnail(self, size=THUMBNAIL_SIZE):
+        """按自动量程裁剪并缩放为 size×size 的uint8密度图（对数亮度，第0行为Y最大处）"""
+        x_min, x_max, y_min, y_max = self.stats.display_range(transform=self.transform)
+        rows, columns = np.nonzero(self.density)
+        counts = self.density[rows, columns]
+        centers = (np.arange(DENSITY_BINS) + 0.5) * (2 * HISTOGRAM_LIMIT / DENSITY_BINS) - HISTOGRAM_LIMIT
+        x = ((centers[columns] - x_min) / (x_max - x_min) * size).astype(np.int64)
+        y = ((y_max - centers[rows]) / (y_max - y_min) * size).astype(np.int64)
+        inside = (x >= 0) & (x < size) & (y >= 0) & (y < size)
+        image = np.bincount(y[inside] * size + x[inside], weights=counts[inside],
+                            minlength=size * size).reshape(size, size)
+        if not image.any():
+            return np.zeros((size, size), dtype=np.uint8)
+        return (np.log1p(image) / np.log1p(image.max()) * 255).astype(np.uint8)
+
+    def summary(self, fs):
+        """可写入索引的统计：时长、峰值与RMS电平（dBFS）、立体声宽度、相关系数与画面覆盖率"""
+        stats = self.stats
+        if not stats.count:
+            raise ValueError("没有可分析的采样")
+        left_squares, right_squares = stats.total_squares
+        mid_squares = (left_squares + right_squares + 2 * self.total_lr) / 4
+        side_squares = (left_squares + right_squares - 2 * self.total_lr) / 4
+        mid_rms, side_rms = np.sqrt(max(mid_squares, 0.0)), np.sqrt(max(side_squares, 0.0))
+        energy = np.sqrt(left_squares * right_squares)
+        thumbnail = self.thumbnail()
+        return {
+            "fs": fs,
+            "duration": stats.count / fs,
+            "peak_db": level_db(stats.peak.max()),
+            "rms_db": level_db(np.sqrt(np.mean(stats.total_squares) / stats.count)),
+            # 侧信号在中、侧信号总幅度中的占比：0为单声道，约0.5为左右不相关，1为完全反相
+            "width": float(side_rms / (mid_rms + side_rms)) if mid_rms + side_rms else 0.0,
+            "correlation": float(self.total_lr / energy) if energy else 1.0,
+            "coverage": float(np.count_nonzero(thumbnail) / thumbnail.size),
+            "thumbnail": base64.b64encode(thumbnail.tobytes()).decode("ascii"),
+        }
+
+
+def level_db(value):
+    """线性幅度转换为dBFS，静音记为-120"""
+    return float(20 * np.log10(value)) if value > 1e-6 else -120.0
+
+
+def decode_thumbnail(entry):
+    """从索引条目还原 (THUMBNAIL_SIZE, THUMBNAIL_SIZE) 的uint8密度图"""
+    data = np.frombuffer(base64.b64decode(entry["thumbnail"]), dtype=np.uint8)
+    return data.reshape(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+
+
+def analyze_file(file_path, block_size=65536):
+    """工作进程：顺序解码整个文件并分析，返回索引条目（不含文件大小与修改时间）"""
+    analysis = TrackAnalysis()
+    try:
+        import soundfile
+
+        with soundfile.SoundFile(file_path) as sound_file:
+            fs = sound_file.samplerate
+            for block in sound_file.blocks(block_size, dtype="float32", always_2d=True):
+                analysis.update(to_stereo(block))
+    except Exception:
+        # soundfile不支持的格式交给librosa完整解码
+        analysis = TrackAnalysis()
+        data, fs = load_audio(file_path, streaming=False)
+        for start in range(0, len(data), block_size):
+            analysis.update(data[start:start + block_size])
+    return analysis.summary(fs)
+
+
+def _init_worker():
+    """工作进程以较低优先级运行，批量索引时不影响界面与播放"""
+    if hasattr(os, "nice"):
+        os.nice(10)
+
+
+def file_signature(file_path):
+    """文件大小与修改时间，任一变化即需要重新分析"""
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class LibraryIndex:
+    """持久化的曲库索引：按文件路径与修改时间保存缩略图和统计，重扫时只分析新增或修改过的文件"""
+
+    def __init__(self, index_path=None):
+        if index_path is None:
+            index_path = os.path.join(os.path.expanduser("~"), ".cache", "oscillofun_player", "library_index.json")
+        self.index_path = index_path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+        self.entries = self._load()
+
+    def _load(self):
+        """读取索引，版本不符时从头开始"""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if index.get("version") != INDEX_VERSION:
+            return {}
+        return index.get("entries", {})
+
+    def save(self):
+        """原子地写回索引"""
+        with self.lock:
+            tmp_path = self.index_path + f".{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "entries": self.entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+
+    def _lookup(self, file_path):
+        """与文件当前大小、修改时间一致的条目（包括分析失败的记录），否则返回None"""
+        try:
+            size, mtime_ns = file_signature(file_path)
+        except OSError:
+            return None
+        with self.lock:
+            entry = self.entries.get(file_path)
+        if entry is None or entry["size"] != size or entry["mtime_ns"] != mtime_ns:
+            return None
+        return entry
+
+    def get(self, file_path):
+        """查询文件的索引条目，文件不存在、已修改或无法分析时返回None"""
+        entry = self._lookup(os.path.abspath(file_path))
+        return None if entry is None or "error" in entry else entry
+
+    def prune(self):
+        """删除对应文件已不存在的条目，返回删除的条目数"""
+        with self.lock:
+            missing = [path for path in self.entries if not os.path.exists(path)]
+            for path in missing:
+                del self.entries[path]
+        return len(missing)
+
+    def scan(self, file_paths, jobs=None, callback=None, should_stop=None):
+        """用进程池分析尚未索引或已修改的文件，返回新分析的文件数
+
+        每个文件完成（或已在索引中）时调用callback(文件路径, 条目)，分析失败时条目为None；
+        无法解码的文件也记入索引，文件修改前不再重试；should_stop返回True时取消尚未开始的任务并提前返回。
+        """
+        pending = []
+        for file_path in dict.fromkeys(os.path.abspath(path) for path in file_paths):
+            entry = self._lookup(file_path)
+            if entry is not None:
+                if callback:
+                    callback(file_path, None if "error" in entry else entry)
+            elif os.path.isfile(file_path):
+                pending.append(file_path)
+        if not pending:
+            return 0
+
+        jobs = jobs or os.cpu_count() or 1
+        analyzed = 0
+        # 界面进程中不能直接fork，与子进程解码使用相同的启动方式；预加载本模块（已包含解码所需的依赖）
+        context = multiprocessing.get_context(START_METHOD)
+        if START_METHOD == "forkserver":
+            context.set_forkserver_preload([__name__])
+        with ProcessPoolExecutor(max_workers=min(jobs, len(pending)), initializer=_init_worker,
+                                 mp_context=context) as executor:
+            futures = {}
+            for file_path in pending:
+                futures[executor.submit(analyze_file, file_path)] = (file_path, file_signature(file_path))
+            while futures:
+                if should_stop and should_stop():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    break
+                done, _ = wait(futures, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path, (size, mtime_ns) = futures.pop(future)
+                    try:
+                        entry = future.result()
+                    except Exception as e:
+                        message = str(e) or type(e).__name__
+                        print(f"索引失败 {os.path.basename(file_path)}: {message}")
+                        entry = {"error": message}
+                    entry.update(size=size, mtime_ns=mtime_ns, indexed_at=time.time())
+                    with self.lock:
+                        self.entries[file_path] = entry
+                    analyzed += 1
+                    if analyzed % SAVE_EVERY == 0:
+                        self.save()
+                    if callback:
+                        callback(file_path, None if "error" in entry else entry)
+        self.save()
+        return analyzed
+
+
+def describe(entry):
+    """索引条目的文字说明"""
+    return (f"时长 {entry['duration']:.0f}s | 峰值 {entry['peak_db']:.1f}dBFS | RMS {entry['rms_db']:.1f}dBFS | "
+            f"宽度 {entry['width']:.2f} | 相关 {entry['correlation']:+.2f} | 覆盖 {entry['coverage'] * 100:.0f}%")
+
+
+def collect_files(paths):
+    """展开命令行给出的文件与文件夹（递归查找音频文件）"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, _, names in os.walk(path):
+                files.extend(os.path.join(folder, name) for name in sorted(names)
+                             if name.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            files.append(path)
+    return files
+
+
+def main():
+    """命令行：批量索引文件夹并按指定统计排序列出"""
+    parser = argparse.ArgumentParser(description="Oscillofun曲库索引：并行生成X-Y缩略图与响度、立体声宽度统计")
+    parser.add_argument("paths", nargs="+", help="音频文件或文件夹")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="并行进程数，默认等于CPU核心数")
+    parser.add_argument("--sort", choices=["coverage", "width", "rms_db", "peak_db", "duration"],
+                        default="coverage", help="列表排序依据（降序）")
+    parser.add_argument("--index", default=None, help="索引文件路径")
+    args = parser.parse_args()
+
+    files = collect_files(args.paths)
+    index = LibraryIndex(args.index)
+    index.prune()
+    done = [0]
+
+    def report(file_path, entry):
+        done[0] += 1
+        print(f"\r索引进度: {done[0]}/{len(files)}", end="", file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    analyzed = index.scan(files, jobs=args.jobs, callback=report)
+    print(f"\n新分析 {analyzed} 个文件，用时 {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    entries = [(path, index.get(path)) for path in dict.fromkeys(os.path.abspath(f) for f in files)]
+    entries = [(path, entry) for path, entry in entries if entry is not None]
+    for path, entry in sorted(entries, key=lambda item: item[1][args.sort], reverse=True):
+        print(f"{os.path.basename(path)}: {describe(entry)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+import argparse
+import math
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
+                             QGridLayout, QLabel, QPushButton)
+from PyQt5.QtCore import QThread, Qt, pyqtSignal
+
+from audio_source import as_audio_source
+from frame_clock import FrameClock
+from frame_ring import FrameRing
+from signal_transform import SignalTransform
+
+
+class SourceGroup:
+    """同一数据源上的一组示波器：每个周期只读取一次数据，一次向量化运算切出全部声道对"""
+
+    def __init__(self, source, fs, frame_rate):
+        self.source = source
+        self.fs = fs
+        self.pairs = []  # 每个示波器使用的 (X声道, Y声道)
+        self.transforms = []  # 每个示波器的信号变换，与其显示组件共用
+        self.scope_ids = []
+        self.pair_index = None
+        self.ring = None
+        self.last_taken_sequence = -1
+        self.configure(frame_rate)
+
+    def add_pair(self, scope_id, channels, transform):
+        """追加一个声道对及其信号变换，下次发布帧前重新分配帧槽"""
+        if max(channels) >= self.source.channels:
+            raise ValueError(f"声道 {channels} 超出数据源的声道数 {self.source.channels}")
+        self.pairs.append(tuple(channels))
+        self.transforms.append(transform)
+        self.scope_ids.append(scope_id)
+        self.ring = None
+
+    def configure(self, frame_rate):
+        """按刷新率计算帧参数，与OscillofunThread的分数采样帧边界一致"""
+        self.frame_rate = int(frame_rate)
+        self.frame_size = -(-self.fs // self.frame_rate)
+        self.total_frames = -(-len(self.source) * self.frame_rate // self.fs)
+        self.ring = None
+
+    def prepare(self):
+        """分配帧槽环：每个槽按 (采样点, 声道对*2) 存放本组全部示波器的同一帧"""
+        if self.ring is None:
+            self.pair_index = np.asarray(self.pairs, dtype=np.intp)
+            self.ring = FrameRing(self.frame_size, channels=2 * len(self.pairs))
+            self.last_taken_sequence = -1
+
+    def frame_bounds(self, frame_number):
+        """第k帧的采样区间 [k*fs/rate, (k+1)*fs/rate)"""
+        start_idx = frame_number * self.fs // self.frame_rate
+        end_idx = min((frame_number + 1) * self.fs // self.frame_rate, len(self.source))
+        return start_idx, end_idx
+
+    def publish_frame(self, frame_number):
+        """读取一次数据块，按声道对索引取出所有示波器的数据，各自经信号变换后直接写入帧槽"""
+        slot, buffer = self.ring.begin_write()
+        start_idx, end_idx = self.frame_bounds(frame_number)
+        length = 0
+        if start_idx < end_idx:
+            block = self.source.read(start_idx, end_idx)
+            length = len(block)
+            out = buffer[:length].reshape(length, len(self.pairs), 2)
+            np.take(block, self.pair_index, axis=1, out=out)
+            for i, transform in enumerate(self.transforms):
+                transform.apply(out[:, i], out=out[:, i])
+            # 保留约1秒的已播放数据，其余缓冲交还给流式解码线程
+            self.source.release(start_idx - self.fs)
+        progress = min(100.0, end_idx / len(self.source) * 100) if len(self.source) else 100.0
+        self.ring.commit(slot, length, frame_number, progress)
+
+    def take_latest(self):
+        """取本组最新的帧，返回 [(示波器序号, 帧数据视图)]，以及帧号和进度"""
+        latest = self.ring.acquire_latest(self.last_taken_sequence) if self.ring is not None else None
+        if latest is None:
+            return None
+        frame_data, frame_number, progress, sequence = latest
+        self.last_taken_sequence = sequence
+        frames = frame_data.reshape(len(frame_data), len(self.pairs), 2)
+        return [(scope_id, frames[:, i]) for i, scope_id in enumerate(self.scope_ids)], frame_number, progress
+
+
+class MultiScopeScheduler(QThread):
+    """多示波器共用的调度线程：一个时钟、每帧一次唤醒，按数据源批量切帧后分发
+
+    无论示波器有多少个，线程数和唤醒次数都不变；数据源较多时切帧工作分给固定数量的工作线程。
+    """
+    frames_ready_signal = pyqtSignal()  # 有新帧可取；同一时刻最多只有一个通知在队列中
+    finished_signal = pyqtSignal()
+
+    def __init__(self, frame_rate=30, workers=None, parallel_threshold=4):
+        super().__init__()
+        self.frame_rate = int(frame_rate)
+        self.groups = []
+        self.scope_count = 0
+        self.workers = workers if workers is not None else min(4, os.cpu_count() or 1)
+        self.parallel_threshold = parallel_threshold  # 数据源数达到该值时并行切帧
+        self.executor = None
+
+        self.is_running = False
+        self.paused = False
+        self.current_frame = 0
+        self.notify_pending = False
+        self.clock = FrameClock()  # 与单示波器画面线程相同的调度时钟
+
+    def add_source(self, data, fs):
+        """添加数据源（ndarray或流式数据源），返回数据源序号"""
+        self.groups.append(SourceGroup(as_audio_source(data, fs), fs, self.frame_rate))
+        return len(self.groups) - 1
+
+    def add_scope(self, source_id, channels=(0, 1), direction_coeff=(-1, -1), transform=None):
+        """在指定数据源上添加一个示波器，显示channels给出的声道对，返回示波器序号
+
+        transform为该示波器的信号变换（与OscillofunThread相同，默认只乘方向系数），
+        与显示组件共用时坐标轴反转、视图等设置直接作用于这一路数据。
+        """
+        scope_id = self.scope_count
+        transform = transform if transform is not None else SignalTransform(direction_coeff)
+        self.groups[source_id].add_pair(scope_id, channels, transform)
+        self.scope_count += 1
+        return scope_id
+
+    @property
+    def total_frames(self):
+        return max((group.total_frames for group in self.groups if group.pairs), default=0)
+
+    def set_clock_source(self, clock_source):
+        """设置外部时钟，clock_source() 返回音频播放位置（秒），不可用时返回None"""
+        self.clock.set_clock_source(clock_source)
+
+    @property
+    def dropped_frames(self):
+        return self.clock.dropped_frames
+
+    def publish_frame(self, frame_number):
+        """切出所有数据源的同一帧"""
+        groups = [group for group in self.groups if group.pairs]
+        for group in groups:
+            group.prepare()
+        if self.executor is not None:
+            list(self.executor.map(lambda group: group.publish_frame(frame_number), groups))
+        else:
+            for group in groups:
+                group.publish_frame(frame_number)
+
+    def notify_frame(self):
+        """通知界面有新帧；上一个通知尚未被处理时不再排队新的信号"""
+        if not self.notify_pending:
+            self.notify_pending = True
+            self.frames_ready_signal.emit()
+
+    def take_latest_frames(self):
+        """界面线程：取各数据源的最新帧，返回 [(示波器序号, 帧数据, 帧号, 进度)]"""
+        self.notify_pending = False
+        frames = []
+        for group in self.groups:
+            latest = group.take_latest()
+            if latest is None:
+                continue
+            scopes, frame_number, progress = latest
+            frames.extend((scope_id, frame_data, frame_number, progress) for scope_id, frame_data in scopes)
+        return frames
+
+    def run(self):
+        """按时钟推进帧号，过期帧直接跳过"""
+        self.is_running = True
+        self.paused = False
+        self.clock.resume()
+        self.clock.anchor(self.current_frame / self.frame_rate)
+        sources = sum(1 for group in self.groups if group.pairs)
+        if self.workers > 1 and sources >= self.parallel_threshold:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        total_frames = self.total_frames
+
+        try:
+            while self.is_running and self.current_frame < total_frames:
+                if self.paused:
+                    self.clock.idle()
+                    continue
+
+                frame_number = self.clock.next_frame(self.current_frame, self.frame_rate)
+                if frame_number is None:
+                    continue
+                self.current_frame = frame_number
+                if self.current_frame >= total_frames:
+                    break
+
+                self.publish_frame(self.current_frame)
+                self.notify_frame()
+                self.current_frame += 1
+                self.clock.sleep_until(self.current_frame, self.frame_rate)
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+        if self.current_frame >= total_frames:
+            self.finished_signal.emit()
+
+    def pause(self):
+        """暂停"""
+        self.clock.pause()
+        self.paused = True
+
+    def resume(self):
+        """继续，暂停期间的时长不计入单调时钟"""
+        self.clock.resume()
+        self.paused = False
+
+    def stop(self):
+        """停止线程"""
+        self.is_running = False
+        self.wait()
+
+    def close(self):
+        """停止线程并关闭所有数据源"""
+        self.stop()
+        for group in self.groups:
+            group.source.close()
+
+
+class MultiScopeWindow(QMainWindow):
+    """多示波器网格窗口：多个文件或多声道文件的各声道对并排显示，共用一个调度线程"""
+
+    def __init__(self, frame_rate=30, use_opengl=False, sound=True, audio_backend="pygame"):
+        super().__init__()
+        from gl_oscilloscope_widget import create_oscilloscope_widget
+
+        self.create_widget = create_oscilloscope_widget
+        self.use_opengl = use_opengl
+        self.scheduler = MultiScopeScheduler(frame_rate)
+        self.scheduler.frames_ready_signal.connect(self.on_frames_ready)
+        self.scheduler.finished_signal.connect(self.on_finished)
+        self.scopes = []
+        self.audio_player = None
+        self.sound = sound
+        self.audio_backend = audio_backend
+        self.init_ui()
+
+    def init_ui(self):
+        """初始化界面"""
+        self.setWindowTitle("Oscillofun播放器 - 多示波器")
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        layout = QVBoxLayout()
+        central_widget.setLayout(layout)
+
+        self.grid_layout = QGridLayout()
+        layout.addLayout(self.grid_layout, 1)
+
+        self.progress_label = QLabel("进度: 0%")
+        self.progress_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.progress_label)
+
+        button_layout = QHBoxLayout()
+        self.play_pause_btn = QPushButton("播放")
+        self.play_pause_btn.clicked.connect(self.toggle_play_pause)
+        exit_btn = QPushButton("退出")
+        exit_btn.clicked.connect(self.close)
+        button_layout.addWidget(self.play_pause_btn)
+        button_layout.addWidget(exit_btn)
+        layout.addLayout(button_layout)
+
+    def add_source(self, data, fs, pairs=((0, 1),), label=""):
+        """添加一个数据源及其上的若干声道对示波器，第一个数据源同时用于声音输出"""
+        source_id = self.scheduler.add_source(data, fs)
+        for channels in pairs:
+            transform = SignalTransform(direction_coeff=(-1, -1))
+            self.scheduler.add_scope(source_id, channels, transform=transform)
+            widget = self.create_widget(self.use_opengl)
+            widget.set_transform(transform)  # 显示组件上的坐标轴反转等设置作用于调度线程
+            widget.setMinimumSize(240, 240)
+            widget.title_text = f"{label} {channels[0] + 1}/{channels[1] + 1}".strip()
+            self.scopes.append(widget)  # 列表下标即调度线程分配的示波器序号
+
+        if source_id == 0 and self.sound:
+            from audio_player import AudioPlayer
+
+            self.audio_player = AudioPlayer(self.audio_backend)
+            if self.audio_player.load_samples(data, fs):
+                self.scheduler.set_clock_source(self.audio_player.get_position)
+        self.arrange_grid()
+
+    def arrange_grid(self):
+        """按接近正方形的行列排布示波器"""
+        columns = math.ceil(math.sqrt(len(self.scopes)))
+        for index, widget in enumerate(self.scopes):
+            self.grid_layout.addWidget(widget, index // columns, index % columns)
+
+    def on_frames_ready(self):
+        """取各数据源的最新帧分发给对应示波器"""
+        frames = self.scheduler.take_latest_frames()
+        for scope_id, frame_data, frame_number, progress in frames:
+            self.scopes[scope_id].set_frame_data(frame_data, frame_number)
+        if frames:
+            self.progress_label.setText(
+                f"进度: {frames[0][3]:.1f}% | 帧: {frames[0][2]} | 丢帧: {self.scheduler.dropped_frames}")
+
+    def on_finished(self):
+        """播放完成"""
+        self.play_pause_btn.setText("播放完成")
+        self.play_pause_btn.setEnabled(False)
+        if self.audio_player is not None:
+            self.audio_player.stop()
+
+    def toggle_play_pause(self):
+        """切换播放/暂停状态"""
+        if not self.scheduler.isRunning():
+            self.scheduler.start()
+            self.play_pause_btn.setText("暂停")
+            if self.audio_player is not None:
+                self.audio_player.play()
+        elif self.scheduler.paused:
+            self.scheduler.resume()
+            self.play_pause_btn.setText("暂停")
+            if self.audio_player is not None:
+                self.audio_player.unpause()
+        else:
+            self.scheduler.pause()
+            self.play_pause_btn.setText("继续")
+            if self.audio_player is not None:
+                self.audio_player.pause()
+
+    def closeEvent(self, event):
+        """关闭时停止调度线程与声音"""
+        if self.audio_player is not None:
+            self.audio_player.stop()
+        self.scheduler.close()
+        event.accept()
+
+
+def main():
+    """命令行：python multi_scope.py 文件1 [文件2 ...] [--pairs]"""
+    from audio_backends import AUDIO_BACKENDS
+    from audio_loader import load_audio, load_audio_channels
+    from decode_cache import DecodeCache
+
+    parser = argparse.ArgumentParser(description="Oscillofun多示波器网格")
+    parser.add_argument("files", nargs="+", help="音频文件路径")
+    parser.add_argument("--pairs", action="store_true",
+                        help="多声道文件按声道对 1/2、3/4 ... 各显示一个示波器")
+    parser.add_argument("--frame-rate", type=int, default=30)
+    parser.add_argument("--opengl", action="store_true", help="优先使用OpenGL示波器组件")
+    parser.add_argument("--mute", action="store_true", help="不输出声音")
+    parser.add_argument("--audio-backend", choices=AUDIO_BACKENDS, default="pygame",
+                        help="音频输出后端：pygame / callback（sounddevice低延迟回调） / null（无声卡时按虚拟时钟）")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    app.setStyle('Fusion')
+    window = MultiScopeWindow(args.frame_rate, use_opengl=args.opengl, sound=not args.mute,
+                              audio_backend=args.audio_backend)
+    cache = DecodeCache()
+    for file_path in args.files:
+        label = os.path.basename(file_path)
+        if args.pairs:
+            data, fs = load_audio_channels(file_path)
+            pairs = [(c, c + 1) for c in range(0, data.shape[1] - 1, 2)] or [(0, 0)]
+        else:
+            data, fs = load_audio(file_path, cache=cache)
+            pairs = [(0, 1)]
+        window.add_source(data, fs, pairs, label)
+    window.resize(960, 960)
+    window.show()
+    sys.exit(app.exec_())
+
+
+if __name__ == "__main__":
+    main()
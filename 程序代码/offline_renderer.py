@@ -0,0 +1,207 @@
+import argparse
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from oscillofun_thread import OscillofunThread
+from oscilloscope_widget import map_to_screen
+from phosphor_buffer import PhosphorBuffer
+from signal_transform import VIEWS, SignalTransform
+
+GRID_COLOR = (50, 50, 50)
+POINT_COLOR = (0, 255, 0)
+
+_worker_state = {}
+
+
+def write_png(file_path, rgb):
+    """使用标准库将 (H, W, 3) 的uint8数组写为PNG文件"""
+    height, width, _ = rgb.shape
+
+    def chunk(tag, payload):
+        return (struct.pack(">I", len(payload)) + tag + payload +
+                struct.pack(">I", zlib.crc32(tag + payload) & 0xFFFFFFFF))
+
+    # 每行前加一个字节的过滤类型（0表示不过滤）
+    raw = np.empty((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 0] = 0
+    raw[:, 1:] = rgb.reshape(height, width * 3)
+    with open(file_path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)))
+        f.write(chunk(b"IEND", b""))
+
+
+def draw_background(width, height):
+    """绘制与OscilloscopeWidget一致的黑色背景和网格"""
+    background = np.zeros((height, width, 3), dtype=np.uint8)
+    grid_size = 5
+    for i in range(1, grid_size):
+        background[i * height // grid_size, :] = GRID_COLOR
+        background[:, i * width // grid_size] = GRID_COLOR
+    return background
+
+
+def render_points(image, frame_data, options):
+    """将一帧数据按示波器的坐标映射绘制为点"""
+    if len(frame_data) == 0 or len(frame_data.shape) == 1:
+        return
+    height, width, _ = image.shape
+    screen = map_to_screen(frame_data, width, height, options["display_range"])
+    xs = np.rint(screen[:, 0]).astype(np.intp)
+    ys = np.rint(screen[:, 1]).astype(np.intp)
+    half = options["point_size"] // 2
+    for dy in range(-half, options["point_size"] - half):
+        for dx in range(-half, options["point_size"] - half):
+            px = xs + dx
+            py = ys + dy
+            inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+            image[py[inside], px[inside]] = POINT_COLOR
+
+
+def _init_worker(npy_path, fs, options):
+    """进程池初始化：以内存映射方式打开音频数据，复用线程的分帧逻辑"""
+    data = np.load(npy_path, mmap_mode="r")
+    transform = SignalTransform(options["direction_coeff"], options["x_reversed"], options["y_reversed"],
+                                options["view"], options["gain"])
+    _worker_state["framer"] = OscillofunThread(data, fs, options["frame_rate"], transform=transform)
+    _worker_state["options"] = options
+    _worker_state["background"] = draw_background(options["width"], options["height"])
+
+
+def _render_range(first, last):
+    """渲染 [first, last) 范围内的帧，PNG模式直接写文件，原始流模式返回字节"""
+    framer = _worker_state["framer"]
+    options = _worker_state["options"]
+    background = _worker_state["background"]
+
+    phosphor = None
+    start = first
+    if options["persistence"] is not None:
+        # 余辉依赖前序帧：先预热若干帧，保证按帧区间切分后结果与顺序渲染一致
+        phosphor = PhosphorBuffer(decay_time=options["persistence"], color=POINT_COLOR)
+        phosphor.resize(options["width"], options["height"])
+        warmup = int(np.ceil(options["persistence"] * options["frame_rate"] * 8))
+        start = max(0, first - warmup)
+
+    output = []
+    for frame_number in range(start, last):
+        frame_data, _ = framer.get_frame(frame_number)
+        if phosphor is not None:
+            if len(frame_data) and len(frame_data.shape) == 2:
+                screen = map_to_screen(frame_data, options["width"], options["height"], options["display_range"])
+            else:
+                screen = np.empty((0, 2))
+            phosphor.deposit(screen, now=frame_number / options["frame_rate"])
+            if frame_number < first:
+                continue
+            glow = phosphor.tone_map()[:, :, None].astype(np.uint16)
+            image = background.copy()
+            beam = (glow * np.array(POINT_COLOR, dtype=np.uint16)) // 255
+            np.minimum(image + beam, 255, out=beam)
+            image = beam.astype(np.uint8)
+        else:
+            image = background.copy()
+            render_points(image, frame_data, options)
+
+        if options["output_dir"]:
+            write_png(os.path.join(options["output_dir"], f"frame_{frame_number:06d}.png"), image)
+        else:
+            output.append(image.tobytes())
+    return b"".join(output)
+
+
+def render_file(file_path, options, jobs=None, chunk_frames=32, progress=None):
+    """离线渲染整个音频文件的所有帧，返回渲染的帧数"""
+    from audio_loader import load_audio
+    from decode_cache import DecodeCache
+
+    data, fs = load_audio(file_path, streaming=False, cache=DecodeCache())
+    total_frames = OscillofunThread(data, fs, options["frame_rate"]).total_frames
+    if options["output_dir"]:
+        os.makedirs(options["output_dir"], exist_ok=True)
+
+    jobs = jobs or os.cpu_count() or 1
+    ranges = [(first, min(first + chunk_frames, total_frames))
+              for first in range(0, total_frames, chunk_frames)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 工作进程共享同一份以内存映射方式打开的采样数据
+        npy_path = os.path.join(tmp_dir, "samples.npy")
+        np.save(npy_path, np.ascontiguousarray(data, dtype=np.float32))
+        del data
+
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(npy_path, fs, options)) as executor:
+            # 有限的在途任务窗口，按顺序取回结果，避免原始流模式占用过多内存
+            pending = []
+            next_range = 0
+            done_frames = 0
+            while next_range < len(ranges) or pending:
+                while next_range < len(ranges) and len(pending) < jobs * 2:
+                    pending.append((ranges[next_range], executor.submit(_render_range, *ranges[next_range])))
+                    next_range += 1
+                (first, last), future = pending.pop(0)
+                payload = future.result()
+                if not options["output_dir"]:
+                    sys.stdout.buffer.write(payload)
+                done_frames += last - first
+                if progress:
+                    progress(done_frames, total_frames)
+    return total_frames
+
+
+def main():
+    """命令行入口：离线渲染示波器视频帧"""
+    parser = argparse.ArgumentParser(description="Oscillofun离线渲染器：输出PNG序列或原始RGB帧流")
+    parser.add_argument("file", help="音频文件路径")
+    parser.add_argument("-o", "--output-dir", help="PNG序列输出目录；省略时向标准输出写原始RGB24帧流")
+    parser.add_argument("--width", type=int, default=720)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frame-rate", type=int, default=30)
+    parser.add_argument("--point-size", type=int, default=2)
+    parser.add_argument("--display-range", type=float, nargs=4, default=[-0.7, 0.7, -0.7, 0.7],
+                        metavar=("X_MIN", "X_MAX", "Y_MIN", "Y_MAX"))
+    parser.add_argument("--reverse-x", action="store_true", help="反转X轴")
+    parser.add_argument("--reverse-y", action="store_true", help="反转Y轴")
+    parser.add_argument("--view", choices=sorted(VIEWS), default="xy", help="视图：xy 或 mid_side（中/侧测角仪）")
+    parser.add_argument("--gain", type=float, default=1.0, help="显示增益")
+    parser.add_argument("--persistence", type=float, default=None, metavar="SECONDS",
+                        help="启用荧光余辉并指定衰减时间常数（秒）")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="并行进程数，默认等于CPU核心数")
+    args = parser.parse_args()
+
+    options = {
+        "width": args.width,
+        "height": args.height,
+        "frame_rate": args.frame_rate,
+        "point_size": args.point_size,
+        "display_range": args.display_range,
+        "x_reversed": args.reverse_x,
+        "y_reversed": args.reverse_y,
+        "direction_coeff": (-1, -1),
+        "view": args.view,
+        "gain": args.gain,
+        "persistence": args.persistence,
+        "output_dir": args.output_dir,
+    }
+
+    def report(done, total):
+        print(f"\r渲染进度: {done}/{total}", end="", file=sys.stderr, flush=True)
+
+    if not args.output_dir:
+        print(f"原始帧流: rgb24 {args.width}x{args.height} @ {args.frame_rate}fps，例如管道至 "
+              f"ffmpeg -f rawvideo -pix_fmt rgb24 -s {args.width}x{args.height} "
+              f"-r {args.frame_rate} -i - out.mp4", file=sys.stderr)
+    total = render_file(args.file, options, jobs=args.jobs, progress=report)
+    print(f"\n完成，共渲染 {total} 帧", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,65 @@
+import argparse
 import sys
 import os
-import numpy as np
-import librosa
+from functools import partial
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QLabel, QPushButton, QFileDialog,
-                             QMessageBox, QSlider)
-from PyQt5.QtCore import QTimer, Qt
-from PyQt5.QtGui import QFont
+                             QMessageBox, QSlider, QComboBox, QListWidget)
+from PyQt5.QtCore import QSize, QTimer, Qt
+from PyQt5.QtGui import QFont, QIcon, QImage, QPixmap, qRgb
 
 from oscillofun_thread import OscillofunThread
-from oscilloscope_widget import OscilloscopeWidget
+from gl_oscilloscope_widget import create_oscilloscope_widget
+from audio_backends import AUDIO_BACKENDS
 from audio_player import AudioPlayer
+from audio_source import PipeAudioSource
+from decode_cache import DecodeCache
+from perf_metrics import PerfMonitor
+from quality_governor import QualityGovernor
+from library_index import THUMBNAIL_SIZE, decode_thumbnail, describe
+from playlist import Playlist, ThumbnailIndexer, TrackPrefetcher, load_track
+from signal_stats import DEFAULT_DISPLAY_RANGE, RangeTracker
+from signal_transform import VIEWS, SignalTransform
 
 
 class OscillofunPlayer(QMainWindow):
     """主应用程序窗口"""
 
-    def __init__(self):
+    def __init__(self, use_opengl=False, audio_backend="pygame", decode_process=False):
         super().__init__()
-        self.audio_player = AudioPlayer()
+        self.use_opengl = use_opengl  # 优先使用OpenGL示波器组件，不可用时回退到QPainter
+        self.audio_player = AudioPlayer(audio_backend)
         self.oscillofun_thread = None
         self.current_audio_data = None
+        self.finished_audio_data = None  # 无缝切换后输出端可能仍在播放其结尾的上一首数据
         self.sample_rate = None
         self.auto_reset_enabled = True
+        self.streaming_enabled = True  # 支持的格式采用后台分块流式解码
+        # 可选：较短的压缩格式在子进程中整轨解码到共享内存，不占用界面进程的GIL；默认使用有界环形缓冲区的流式解码
+        self.process_decoding_enabled = decode_process
+        self.decode_cache = DecodeCache()
+        self.perf_monitor = PerfMonitor()
+        self.quality_governor = QualityGovernor()  # 负载过高时自动降低画质与刷新率
+        self.frame_rate = 30  # 用户选择的刷新率，实际刷新率可能被画质档位限制
+        self.signal_stats = None
+        self.range_mode = "fixed"  # 显示范围: fixed(固定) / auto(按全文件统计) / adaptive(播放中自适应)
+        self.range_tracker = None
+        self.stats_count_applied = 0
+        self.last_range_frame = None
+        self.track_info_text = ""
+        self.stats_summary_shown = False  # 信息栏是否已附上完整的信号统计
+        # 方向系数、坐标轴反转、视图与去直流合成的信号变换，画面线程与示波器组件共用
+        self.signal_transform = SignalTransform(direction_coeff=(-1, -1))
+        self.dc_removal_enabled = False
+        self.playlist = Playlist()
+        self.prefetcher = TrackPrefetcher(cache=self.decode_cache, streaming=self.streaming_enabled,
+                                          decode_process=self.process_decoding_enabled)
+        self.prefetcher.track_ready.connect(self.on_track_prefetched)
+        # 曲库索引：播放列表中的文件在后台进程池中生成X-Y缩略图，重扫时只分析新增或修改过的文件
+        self.thumbnail_indexer = ThumbnailIndexer()
+        self.thumbnail_indexer.thumbnail_ready.connect(self.on_thumbnail_ready)
+        self.next_track = None  # 已排队的下一首（PreparedTrack）
+        self.next_thread = None  # 为下一首提前构造的画面线程，音频可无缝衔接时才有
         self.init_ui()
         self.setup_timers()
 
@@ -54,6 +91,14 @@ class OscillofunPlayer(QMainWindow):
         self.progress_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(self.progress_label)
 
+        # 时间轴：拖动时预览画面，松开时音频与画面一起跳转
+        self.timeline_slider = QSlider(Qt.Horizontal)
+        self.timeline_slider.setRange(0, 0)
+        self.timeline_slider.valueChanged.connect(self.on_timeline_changed)
+        self.timeline_slider.sliderReleased.connect(self.on_timeline_released)
+        self.timeline_slider.setEnabled(False)
+        layout.addWidget(self.timeline_slider)
+
         # 控制面板区域
         control_panel_layout = QHBoxLayout()
 
@@ -65,6 +110,10 @@ class OscillofunPlayer(QMainWindow):
         self.y_axis_btn.clicked.connect(self.toggle_y_axis)
         axis_control_layout.addWidget(self.x_axis_btn)
         axis_control_layout.addWidget(self.y_axis_btn)
+        self.dc_removal_btn = QPushButton("去直流: 关")
+        self.dc_removal_btn.setCheckable(True)
+        self.dc_removal_btn.clicked.connect(self.toggle_dc_removal)
+        axis_control_layout.addWidget(self.dc_removal_btn)
 
         # 自动重置控制
         reset_control_layout = QVBoxLayout()
@@ -74,6 +123,54 @@ class OscillofunPlayer(QMainWindow):
         self.auto_reset_btn.clicked.connect(self.toggle_auto_reset)
         reset_control_layout.addWidget(self.auto_reset_btn)
 
+        # 荧光余辉控制
+        self.persistence_btn = QPushButton("余辉: 关")
+        self.persistence_btn.setCheckable(True)
+        self.persistence_btn.clicked.connect(self.toggle_persistence)
+        reset_control_layout.addWidget(self.persistence_btn)
+
+        # 性能监视控制
+        perf_control_layout = QVBoxLayout()
+        self.perf_btn = QPushButton("性能监视: 关")
+        self.perf_btn.setCheckable(True)
+        self.perf_btn.clicked.connect(self.toggle_perf_monitor)
+        perf_control_layout.addWidget(self.perf_btn)
+        self.export_perf_btn = QPushButton("导出性能数据")
+        self.export_perf_btn.clicked.connect(self.export_perf_data)
+        self.export_perf_btn.setEnabled(False)
+        perf_control_layout.addWidget(self.export_perf_btn)
+        self.governor_btn = QPushButton("自动画质: 开")
+        self.governor_btn.setCheckable(True)
+        self.governor_btn.setChecked(True)
+        self.governor_btn.clicked.connect(self.toggle_quality_governor)
+        perf_control_layout.addWidget(self.governor_btn)
+
+        # 显示控制：刷新率与绘制方式
+        display_control_layout = QVBoxLayout()
+        self.refresh_combo = QComboBox()
+        for rate in (30, 60, 120, 144):
+            self.refresh_combo.addItem(f"刷新率: {rate}Hz", rate)
+        self.refresh_combo.currentIndexChanged.connect(self.change_refresh_rate)
+        display_control_layout.addWidget(self.refresh_combo)
+        self.draw_mode_combo = QComboBox()
+        self.draw_mode_combo.addItem("绘制: 点", ("points", "none"))
+        self.draw_mode_combo.addItem("绘制: 光束", ("beam", "none"))
+        self.draw_mode_combo.addItem("绘制: 光束+线性插值", ("beam", "linear"))
+        self.draw_mode_combo.addItem("绘制: 光束+多相插值", ("beam", "polyphase"))
+        self.draw_mode_combo.currentIndexChanged.connect(self.change_draw_mode)
+        display_control_layout.addWidget(self.draw_mode_combo)
+        self.range_combo = QComboBox()
+        self.range_combo.addItem("量程: 固定", "fixed")
+        self.range_combo.addItem("量程: 自动", "auto")
+        self.range_combo.addItem("量程: 自适应", "adaptive")
+        self.range_combo.currentIndexChanged.connect(self.change_range_mode)
+        display_control_layout.addWidget(self.range_combo)
+        self.view_combo = QComboBox()
+        for view, (name, _) in VIEWS.items():
+            self.view_combo.addItem(f"视图: {name}", view)
+        self.view_combo.currentIndexChanged.connect(self.change_view)
+        display_control_layout.addWidget(self.view_combo)
+
         # 声音控制
         sound_control_layout = QVBoxLayout()
         self.sound_toggle_btn = QPushButton("🔊 声音: 开")
@@ -93,38 +190,57 @@ class OscillofunPlayer(QMainWindow):
         # 将控制面板组合
         control_panel_layout.addLayout(axis_control_layout)
         control_panel_layout.addLayout(reset_control_layout)
+        control_panel_layout.addLayout(perf_control_layout)
+        control_panel_layout.addLayout(display_control_layout)
         control_panel_layout.addStretch(1)
         control_panel_layout.addLayout(sound_control_layout)
 
         layout.addLayout(control_panel_layout)
 
         # 模拟示波器区域
-        self.oscilloscope = OscilloscopeWidget()
+        self.oscilloscope = create_oscilloscope_widget(self.use_opengl)
+        self.oscilloscope.perf_monitor = self.perf_monitor
+        self.oscilloscope.quality_governor = self.quality_governor
+        self.oscilloscope.set_transform(self.signal_transform)
         layout.addWidget(self.oscilloscope, 1)
 
         # 添加垂直弹簧
         layout.addStretch(1)
 
+        # 播放列表：双击切换曲目，后续曲目在后台预取；图标为整轨的X-Y密度缩略图，悬停显示响度与立体声宽度
+        self.playlist_widget = QListWidget()
+        self.playlist_widget.setMaximumHeight(140)
+        self.playlist_widget.setIconSize(QSize(40, 40))
+        self.playlist_widget.itemDoubleClicked.connect(self.on_playlist_activated)
+        layout.addWidget(self.playlist_widget)
+
         # 主要功能按钮区域
         button_layout = QHBoxLayout()
         self.select_btn = QPushButton("选择文件")
+        self.folder_btn = QPushButton("添加文件夹")
         self.play_pause_btn = QPushButton("播放/暂停")
+        self.next_btn = QPushButton("下一首")
         self.reset_btn = QPushButton("重置")
         self.exit_btn = QPushButton("退出")
 
         self.select_btn.clicked.connect(self.select_file)
+        self.folder_btn.clicked.connect(self.add_folder)
         self.play_pause_btn.clicked.connect(self.toggle_play_pause)
+        self.next_btn.clicked.connect(self.play_next)
         self.reset_btn.clicked.connect(self.reset_player)
         self.exit_btn.clicked.connect(self.close)
 
         button_layout.addWidget(self.select_btn)
+        button_layout.addWidget(self.folder_btn)
         button_layout.addWidget(self.play_pause_btn)
+        button_layout.addWidget(self.next_btn)
         button_layout.addWidget(self.reset_btn)
         button_layout.addWidget(self.exit_btn)
         layout.addLayout(button_layout)
 
         # 初始状态设置
         self.play_pause_btn.setEnabled(False)
+        self.next_btn.setEnabled(False)
         self.reset_btn.setEnabled(False)
         self.sound_toggle_btn.setEnabled(False)
         self.x_axis_btn.setEnabled(False)
@@ -138,44 +254,16 @@ class OscillofunPlayer(QMainWindow):
         self.ui_timer.start(100)
 
     def select_file(self):
-        """选择音频文件"""
-        file_path, _ = QFileDialog.getOpenFileName(
+        """选择音频文件（可多选），加入播放列表并立即加载第一个"""
+        file_paths, _ = QFileDialog.getOpenFileNames(
             self, "选择音频文件", "",
             "音频文件 (*.wav *.mp3 *.ogg *.flac);;所有文件 (*.*)"
         )
 
-        if file_path:
-            try:
-                # 使用librosa加载音频文件
-                self.current_audio_data, self.sample_rate = librosa.load(file_path, sr=None, mono=False)
-
-                # 确保数据是二维的（立体声）
-                if len(self.current_audio_data.shape) == 1:
-                    self.current_audio_data = np.column_stack((self.current_audio_data, self.current_audio_data))
-                elif self.current_audio_data.shape[0] == 2:
-                    self.current_audio_data = self.current_audio_data.T
-
-                # 使用AudioPlayer加载音频文件
-                if self.audio_player.load_file(file_path):
-                    print("音频文件加载成功，准备播放")
-
-                # 更新音频信息显示
-                file_name = os.path.basename(file_path)
-                duration = len(self.current_audio_data) / self.sample_rate
-                self.info_label.setText(
-                    f"文件: {file_name} | 采样率: {self.sample_rate}Hz | 时长: {duration:.2f}秒")
-
-                # 启用所有控制按钮
-                self.play_pause_btn.setEnabled(True)
-                self.reset_btn.setEnabled(True)
-                self.sound_toggle_btn.setEnabled(True)
-                self.x_axis_btn.setEnabled(True)
-                self.y_axis_btn.setEnabled(True)
-                self.auto_reset_btn.setEnabled(True)
-
-                # 准备Oscillofun线程
-                self.prepare_oscillofun()
-
+        if file_paths:
+            first = self.playlist.add_files(file_paths)
+            self.refresh_playlist_widget()
+            if self.load_index(first):
                 # 保留功能介绍弹窗
                 QMessageBox.information(self, "加载成功",
                                         "音频文件加载成功！\n\nOscillofun特效说明：\n"
@@ -183,30 +271,329 @@ class OscillofunPlayer(QMainWindow):
                                         "• 绿色点显示音频波形在X-Y平面的分布\n"
                                         "• 模拟真实示波器的X-Y模式显示")
 
-            except Exception as e:
-                QMessageBox.critical(self, "错误", f"无法加载音频文件: {str(e)}")
+    def add_folder(self):
+        """将文件夹中的音频文件追加到播放列表，尚未加载曲目时加载第一个"""
+        folder = QFileDialog.getExistingDirectory(self, "选择音频文件夹")
+        if not folder:
+            return
+        try:
+            first = self.playlist.add_folder(folder)
+        except OSError as e:
+            QMessageBox.critical(self, "错误", f"无法读取文件夹: {str(e)}")
+            return
+        self.refresh_playlist_widget()
+        if first >= len(self.playlist):
+            return
+        if self.current_audio_data is None:
+            self.load_index(first)
+        else:
+            self.prefetch_next()
+
+    def refresh_playlist_widget(self):
+        """同步播放列表显示并标出当前曲目，新加入的文件排队生成缩略图"""
+        new_files = self.playlist.files[self.playlist_widget.count():]
+        for file_path in new_files:
+            self.playlist_widget.addItem(os.path.basename(file_path))
+        self.thumbnail_indexer.request(new_files)
+        if self.playlist.current >= 0:
+            self.playlist_widget.setCurrentRow(self.playlist.current)
+        self.next_btn.setEnabled(self.playlist.next_index() is not None)
+
+    def on_thumbnail_ready(self, file_path, entry):
+        """曲库索引完成一首：为播放列表中对应的项设置缩略图图标与统计提示"""
+        if entry is None:
+            return
+        pixels = decode_thumbnail(entry).tobytes()  # QImage不复制数据，转换为QPixmap前需保持引用
+        image = QImage(pixels, THUMBNAIL_SIZE, THUMBNAIL_SIZE, THUMBNAIL_SIZE, QImage.Format_Indexed8)
+        image.setColorTable([qRgb(0, level, 0) for level in range(256)])  # 与示波器相同的绿色
+        icon = QIcon(QPixmap.fromImage(image))
+        for row, path in enumerate(self.playlist.files):
+            if os.path.abspath(path) == file_path:
+                item = self.playlist_widget.item(row)
+                item.setIcon(icon)
+                item.setToolTip(describe(entry))
+
+    def load_index(self, index, track=None):
+        """加载播放列表中的一首曲目，优先使用后台预取的结果，成功时返回True"""
+        if track is None and self.next_track is not None and self.next_track.index == index:
+            track, self.next_track = self.next_track, None
+        try:
+            if track is None:
+                track = self.prefetcher.take(index)
+            if track is None:
+                # 加载音频文件（流式数据源或完整解码的立体声数组）
+                track = load_track(index, self.playlist.files[index],
+                                   streaming=self.streaming_enabled, cache=self.decode_cache,
+                                   decode_process=self.process_decoding_enabled)
+
+            if self.oscillofun_thread:
+                self.oscillofun_thread.stop()
+            self.discard_next_track()
+            self.close_audio_data()
+            self.show_track(track)
+
+            # 音频输出与可视化共用同一份解码数据
+            if self.audio_player.load_samples(self.current_audio_data, self.sample_rate, track.file_path):
+                print("音频文件加载成功，准备播放")
+
+            # 启用所有控制按钮
+            self.play_pause_btn.setText("播放")
+            self.play_pause_btn.setEnabled(True)
+            self.reset_btn.setEnabled(True)
+            self.sound_toggle_btn.setEnabled(True)
+            self.x_axis_btn.setEnabled(True)
+            self.y_axis_btn.setEnabled(True)
+            self.auto_reset_btn.setEnabled(True)
+
+            # 准备Oscillofun线程
+            self.prepare_oscillofun()
+            self.update_timeline_range()
+            self.timeline_slider.setEnabled(True)
+            self.apply_display_range()
+            self.prefetch_next()
+            return True
+
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"无法加载音频文件: {str(e)}")
+            return False
+
+    def load_live_input(self, stream, sample_rate, sample_format="s16"):
+        """接入实时原始PCM输入（标准输入或命名管道）：只显示画面，不输出声音，也不能跳转"""
+        if self.oscillofun_thread:
+            self.oscillofun_thread.stop()
+        self.discard_next_track()
+        self.close_audio_data()
+        self.audio_player.stop()
+        self.audio_player.release_samples()
+        self.audio_player.current_file = None
+
+        self.current_audio_data = PipeAudioSource(stream, sample_rate, sample_format)
+        self.sample_rate = sample_rate
+        self.signal_stats = None
+        self.apply_dc_removal()
+        self.playlist.current = -1
+        self.info_label.setText(
+            f"实时输入: {self.current_audio_data.file_path} | 采样率: {sample_rate}Hz | 格式: {sample_format}")
+
+        self.play_pause_btn.setEnabled(True)
+        self.reset_btn.setEnabled(False)
+        self.sound_toggle_btn.setEnabled(False)
+        self.x_axis_btn.setEnabled(True)
+        self.y_axis_btn.setEnabled(True)
+        self.timeline_slider.setEnabled(False)
+        self.prepare_oscillofun()
+        self.apply_display_range()
+        self.toggle_play_pause()
+
+    def show_track(self, track):
+        """将曲目设为当前曲目并更新音频信息显示"""
+        self.playlist.current = track.index
+        self.current_audio_data, self.sample_rate, self.signal_stats = track.data, track.fs, track.stats
+        track.data = None  # 数据的所有权转移给播放器
+        self.stats_count_applied = 0
+        self.apply_dc_removal()
+
+        file_name = os.path.basename(track.file_path)
+        duration = len(self.current_audio_data) / self.sample_rate
+        self.track_info_text = f"文件: {file_name} | 采样率: {self.sample_rate}Hz | 时长: {duration:.2f}秒"
+        self.update_info_label()
+        self.refresh_playlist_widget()
+
+    def update_info_label(self):
+        """显示当前曲目信息，信号统计完成后在第二行附上各声道的统计摘要"""
+        text = self.track_info_text
+        self.stats_summary_shown = self.signal_stats is not None and self.signal_stats.complete
+        if self.stats_summary_shown:
+            text += "\n" + self.signal_stats.summary()
+        self.info_label.setText(text)
+
+    def prefetch_next(self):
+        """在后台预取后续曲目"""
+        self.prefetcher.prefetch(self.playlist)
+        self.queue_next_track()
+
+    def on_track_prefetched(self, track):
+        """后台预取完成"""
+        self.queue_next_track()
+
+    def queue_next_track(self, track=None):
+        """把预取好的下一首排到当前音频之后，并提前构造它的画面线程
+
+        采样率相同时SampleFeeder在当前曲目送完后直接接续下一首，两首之间没有空隙；
+        否则需要重新初始化混音器，只保留预取的数据，播完后再切换。
+        """
+        next_index = self.playlist.next_index()
+        if self.next_track is not None or next_index is None or self.oscillofun_thread is None:
+            return
+        track = track or self.prefetcher.take(next_index)
+        if track is None:
+            return
+        self.next_track = track
+        generation = self.audio_player.queue_samples(track.data, track.fs)
+        if generation is not None:
+            self.next_thread = self.create_oscillofun_thread(track.data, track.fs, generation)
+
+    def release_next_track(self):
+        """取消下一首的排队并返回它，由调用方决定重新排队或释放"""
+        track = self.next_track
+        self.next_track = None
+        self.next_thread = None
+        if self.audio_player.feeder is not None:
+            self.audio_player.feeder.clear_next()
+        return track
+
+    def discard_next_track(self):
+        """取消并释放已排队的下一首"""
+        track = self.release_next_track()
+        if track is not None:
+            track.close()
+
+    def switch_to_next_track(self):
+        """无缝切换到已排队的下一首：音频已由SampleFeeder接续，这里换上提前构造好的画面线程"""
+        track, thread = self.next_track, self.next_thread
+        self.next_track = None
+        self.next_thread = None
+        self.oscillofun_thread.stop()
+        if not self.audio_player.is_playing:
+            # 静音时音频没有推进，由这里切换到下一首
+            self.audio_player.skip_to_queued()
+        self.retire_audio_data()
+        self.show_track(track)
+        self.oscillofun_thread = thread
+        self.update_timeline_range()
+        self.apply_display_range()
+        thread.start()
+        self.prefetch_next()
+
+    def play_next(self):
+        """切换到下一首，正在播放时继续播放"""
+        next_index = self.playlist.next_index()
+        if next_index is not None:
+            self.play_index(next_index)
+
+    def on_playlist_activated(self, item):
+        """双击播放列表中的曲目"""
+        self.play_index(self.playlist_widget.row(item))
+
+    def play_index(self, index):
+        """加载并播放播放列表中的一首曲目"""
+        if self.load_index(index):
+            self.toggle_play_pause()
+
+    def close_audio_data(self):
+        """释放当前音频数据（停止流式解码线程）"""
+        for data in (self.finished_audio_data, self.current_audio_data):
+            if data is not None and hasattr(data, "close"):
+                data.close()
+        self.finished_audio_data = None
+        self.current_audio_data = None
+
+    def retire_audio_data(self):
+        """无缝切换时暂不关闭当前数据：画面先于声音到达曲目末尾，输出端还要读完它的结尾，
+        关闭后数据源长度归零会让输出端按错误的长度衔接下一首；等下一次切换时再释放"""
+        if not self.audio_player.is_playing:
+            self.close_audio_data()
+            return
+        finished = self.current_audio_data
+        self.current_audio_data = None
+        self.close_audio_data()
+        self.finished_audio_data = finished
 
     def prepare_oscillofun(self):
         """准备Oscillofun线程"""
         if self.oscillofun_thread:
             self.oscillofun_thread.stop()
 
-        self.oscillofun_thread = OscillofunThread(
-            self.current_audio_data,
-            self.sample_rate,
-            frame_rate=30,
-            direction_coeff=(-1, -1)
+        self.oscillofun_thread = self.create_oscillofun_thread(self.current_audio_data, self.sample_rate)
+
+    def create_oscillofun_thread(self, audio_data, sample_rate, generation=None):
+        """构造画面线程，generation为排队曲目在SampleFeeder中的代号，使其时钟只跟随该曲目"""
+        thread = OscillofunThread(
+            audio_data,
+            sample_rate,
+            frame_rate=self.quality_governor.frame_rate(self.frame_rate),
+            transform=self.signal_transform
         )
-        self.oscillofun_thread.update_signal.connect(self.on_oscillofun_update)
-        self.oscillofun_thread.finished_signal.connect(self.on_playback_finished)
+        thread.set_clock_source(partial(self.audio_player.get_position, generation))
+        thread.perf_monitor = self.perf_monitor
+        thread.quality_governor = self.quality_governor
+        thread.frame_ready_signal.connect(self.on_frame_ready)
+        thread.finished_signal.connect(self.on_playback_finished)
+        return thread
+
+    def on_frame_ready(self):
+        """从帧槽环取最新帧，积压的旧帧直接跳过"""
+        if self.oscillofun_thread is None:
+            return
+        latest = self.oscillofun_thread.take_latest_frame()
+        if latest is not None:
+            self.on_oscillofun_update(*latest)
 
     def on_oscillofun_update(self, frame_data, frame_number, progress):
         """处理Oscillofun线程的更新信号"""
-        self.oscilloscope.set_frame_data(frame_data)
-        self.progress_label.setText(f"进度: {progress:.1f}% | 帧: {frame_number}")
+        self.perf_monitor.mark_delivered(frame_number)
+        if self.range_tracker is not None:
+            self.track_display_range(frame_data, frame_number)
+        self.oscilloscope.set_frame_data(frame_data, frame_number)
+        stats = self.oscillofun_thread.get_sync_stats()
+        text = (f"进度: {progress:.1f}% | 帧: {frame_number} | "
+                f"丢帧: {stats['dropped_frames']} | 偏差: {stats['sync_offset'] * 1000:.0f}ms")
+        if hasattr(self.current_audio_data, "progress") and not self.current_audio_data.finished:
+            text += f" | 解码: {self.current_audio_data.progress * 100:.0f}%"
+        text += f" | {self.quality_governor.status_text()}"
+        self.progress_label.setText(text)
+        if not self.oscillofun_thread.live and not self.timeline_slider.isSliderDown():
+            if self.timeline_slider.maximum() != self.oscillofun_thread.total_frames - 1:
+                self.update_timeline_range()  # 运行中切换刷新率后总帧数变化
+            self.set_timeline_value(frame_number)
+
+    def update_timeline_range(self):
+        """按当前刷新率的总帧数设置时间轴范围"""
+        if self.oscillofun_thread is None or self.oscillofun_thread.live:
+            return
+        self.timeline_slider.blockSignals(True)
+        self.timeline_slider.setRange(0, max(0, self.oscillofun_thread.total_frames - 1))
+        self.timeline_slider.setValue(self.oscillofun_thread.current_frame)
+        self.timeline_slider.blockSignals(False)
+
+    def set_timeline_value(self, frame_number):
+        """随播放进度移动时间轴滑块，不触发跳转"""
+        self.timeline_slider.blockSignals(True)
+        self.timeline_slider.setValue(frame_number)
+        self.timeline_slider.blockSignals(False)
+
+    def on_timeline_changed(self, frame_number):
+        """拖动中只在未发声时预览画面；点击轨道等非拖动操作直接跳转"""
+        if self.oscillofun_thread is None:
+            return
+        if not self.timeline_slider.isSliderDown():
+            self.seek_to_frame(frame_number)
+        elif not self.oscillofun_thread.isRunning() or self.oscillofun_thread.paused:
+            self.oscillofun_thread.scrub(frame_number)
+
+    def on_timeline_released(self):
+        """松开滑块时跳转"""
+        self.seek_to_frame(self.timeline_slider.value())
+
+    def seek_to_frame(self, frame_number):
+        """画面与音频一起跳转到指定帧，暂停状态保持不变"""
+        if self.oscillofun_thread is None:
+            return
+        self.oscillofun_thread.scrub(frame_number)
+        start_idx = self.oscillofun_thread.frame_bounds(frame_number)[0]
+        self.audio_player.seek(start_idx / self.sample_rate)
 
     def on_playback_finished(self):
-        """播放完成时的处理 - 移除提示框，只进行静默重置"""
+        """播放完成时的处理 - 播放列表还有下一首时切换过去，否则静默重置"""
+        if self.sender() is not self.oscillofun_thread:
+            return  # 已被替换的线程
+        if self.next_thread is not None:
+            self.switch_to_next_track()
+            return
+        next_index = self.playlist.next_index()
+        if next_index is not None:
+            self.play_index(next_index)
+            return
         if self.auto_reset_enabled:
             # 自动重置播放器，不显示提示框
             self.reset_player()
@@ -225,6 +612,103 @@ class OscillofunPlayer(QMainWindow):
         else:
             self.auto_reset_btn.setText("❌ 自动重置: 关")
 
+    def toggle_persistence(self):
+        """切换荧光余辉模式"""
+        enabled = self.persistence_btn.isChecked()
+        self.oscilloscope.set_persistence(enabled)
+        self.persistence_btn.setText(f"余辉: {'开' if enabled else '关'}")
+
+    def toggle_perf_monitor(self):
+        """切换性能监视与屏幕叠加层"""
+        enabled = self.perf_btn.isChecked()
+        self.perf_monitor.set_enabled(enabled)
+        self.perf_btn.setText(f"性能监视: {'开' if enabled else '关'}")
+        self.export_perf_btn.setEnabled(enabled)
+        if not enabled:
+            self.oscilloscope.set_overlay_text(None)
+
+    def export_perf_data(self):
+        """将逐帧性能记录导出为CSV或JSON"""
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "导出性能数据", "perf_metrics.csv", "CSV文件 (*.csv);;JSON文件 (*.json)")
+        if not file_path:
+            return
+        try:
+            if file_path.lower().endswith(".json"):
+                self.perf_monitor.export_json(file_path)
+            else:
+                self.perf_monitor.export_csv(file_path)
+        except OSError as e:
+            QMessageBox.critical(self, "错误", f"无法导出性能数据: {str(e)}")
+
+    def change_refresh_rate(self):
+        """切换画面刷新率"""
+        self.frame_rate = self.refresh_combo.currentData()
+        self.apply_frame_rate()
+
+    def apply_frame_rate(self):
+        """按用户选择的刷新率与当前画质档位的上限设置画面线程（包括为下一首提前构造的线程）的刷新率"""
+        frame_rate = self.quality_governor.frame_rate(self.frame_rate)
+        if self.next_thread is not None:
+            self.next_thread.set_frame_rate(frame_rate)
+        if self.oscillofun_thread:
+            self.oscillofun_thread.set_frame_rate(frame_rate)
+            self.update_timeline_range()
+
+    def toggle_quality_governor(self):
+        """开关自动画质，关闭时恢复最高画质"""
+        enabled = self.governor_btn.isChecked()
+        self.governor_btn.setText(f"自动画质: {'开' if enabled else '关'}")
+        self.quality_governor.set_enabled(enabled)
+        self.apply_quality_level()
+
+    def apply_quality_level(self):
+        """将画质调节器的当前档位应用到示波器组件与画面线程"""
+        level = self.quality_governor.current
+        self.oscilloscope.set_level_of_detail(max_points=level.max_points)
+        self.oscilloscope.set_render_quality(antialiasing=level.antialiasing, point_size=level.point_size)
+        self.apply_frame_rate()
+
+    def change_draw_mode(self):
+        """切换点/光束绘制方式"""
+        mode, interpolation = self.draw_mode_combo.currentData()
+        self.oscilloscope.set_draw_mode(mode, interpolation)
+
+    def change_range_mode(self):
+        """切换固定/自动/自适应显示范围"""
+        self.range_mode = self.range_combo.currentData()
+        self.apply_display_range()
+
+    def apply_display_range(self):
+        """按全文件信号统计设置显示范围；流式解码尚未完成时统计会随解码不断补全"""
+        stats = self.signal_stats
+        if self.range_mode == "fixed" or stats is None:
+            self.range_tracker = None
+            self.oscilloscope.set_display_range(list(DEFAULT_DISPLAY_RANGE))
+            return
+        display_range = stats.display_range(transform=self.signal_transform)
+        self.stats_count_applied = stats.count
+        if self.range_mode == "adaptive":
+            if self.range_tracker is None:
+                self.range_tracker = RangeTracker(display_range)
+                self.last_range_frame = None
+            else:
+                self.range_tracker.set_base_range(display_range)
+        else:
+            self.range_tracker = None
+        self.oscilloscope.set_display_range(display_range)
+
+    def track_display_range(self, frame_data, frame_number):
+        """自适应模式：只用当前帧的峰值平滑调整显示范围"""
+        if self.last_range_frame is None or frame_number <= self.last_range_frame:
+            dt = 1 / self.oscillofun_thread.frame_rate
+        else:
+            dt = (frame_number - self.last_range_frame) / self.oscillofun_thread.frame_rate
+        self.last_range_frame = frame_number
+        display_range = self.range_tracker.update(frame_data, dt)
+        if display_range != self.oscilloscope.display_range:
+            self.oscilloscope.set_display_range(display_range, clear=False)
+
     def toggle_play_pause(self):
         """切换播放/暂停状态"""
         if self.oscillofun_thread is None:
@@ -254,11 +738,41 @@ class OscillofunPlayer(QMainWindow):
         """切换X轴方向"""
         is_reversed = self.oscilloscope.toggle_x_axis()
         self.x_axis_btn.setText(f"X轴: {'反方向' if is_reversed else '正方向'}")
+        self.on_transform_changed()
 
     def toggle_y_axis(self):
         """切换Y轴方向"""
         is_reversed = self.oscilloscope.toggle_y_axis()
         self.y_axis_btn.setText(f"Y轴: {'反方向' if is_reversed else '正方向'}")
+        self.on_transform_changed()
+
+    def change_view(self):
+        """切换X-Y / 中侧（测角仪）视图"""
+        self.signal_transform.set_view(self.view_combo.currentData())
+        self.oscilloscope.transform_changed()
+        self.on_transform_changed()
+
+    def toggle_dc_removal(self):
+        """开启/关闭去直流"""
+        self.dc_removal_enabled = self.dc_removal_btn.isChecked()
+        self.dc_removal_btn.setText(f"去直流: {'开' if self.dc_removal_enabled else '关'}")
+        self.apply_dc_removal()
+        self.oscilloscope.transform_changed()
+        self.on_transform_changed()
+
+    def apply_dc_removal(self):
+        """去直流开启时减去全文件统计的直流偏移，流式解码中随统计补全而更新"""
+        stats = self.signal_stats
+        if self.dc_removal_enabled and stats is not None:
+            self.signal_transform.set_dc_offset(stats.dc_offset[:2])
+        else:
+            self.signal_transform.set_dc_offset((0, 0))
+
+    def on_transform_changed(self):
+        """信号变换改变后按新的坐标重新计算显示范围，并刷新暂停中的画面"""
+        self.apply_display_range()
+        if self.oscillofun_thread:
+            self.oscillofun_thread.refresh_frame()
 
     def toggle_sound(self):
         """切换声音开关"""
@@ -288,21 +802,44 @@ class OscillofunPlayer(QMainWindow):
             self.oscillofun_thread.seek(0)
             self.oscilloscope.set_frame_data(None)
             self.progress_label.setText("进度: 0%")
+            self.set_timeline_value(0)
             self.play_pause_btn.setText("播放")
             self.play_pause_btn.setEnabled(True)
 
+        # 停止音频会清空排队，重置后重新排队下一首
+        track = self.release_next_track()
         if self.audio_player:
             self.audio_player.stop()
+        if track is not None:
+            self.queue_next_track(track)
 
         # 重置坐标轴方向
         self.oscilloscope.set_x_axis_reversed(False)
         self.oscilloscope.set_y_axis_reversed(False)
         self.x_axis_btn.setText("X轴: 正方向")
         self.y_axis_btn.setText("Y轴: 正方向")
+        self.apply_display_range()
 
     def update_ui(self):
         """更新UI显示"""
-        pass
+        if self.perf_monitor.enabled:
+            cache_stats = self.decode_cache.get_stats()
+            self.oscilloscope.set_overlay_text(
+                f"{self.perf_monitor.overlay_text()}\n{self.quality_governor.status_text()}\n"
+                f"解码缓存 命中: {cache_stats['hits']} 未命中: {cache_stats['misses']}")
+        thread = self.oscillofun_thread
+        if thread is not None and thread.isRunning() and not thread.paused:
+            if self.quality_governor.evaluate(self.frame_rate, thread.dropped_frames):
+                self.apply_quality_level()
+        stats = self.signal_stats
+        if (stats is not None and (self.range_mode != "fixed" or self.dc_removal_enabled) and
+                stats.count != self.stats_count_applied):
+            # 流式解码中统计逐块增长，或刚完成
+            self.stats_count_applied = stats.count
+            self.apply_dc_removal()
+            self.apply_display_range()
+        if stats is not None and stats.complete and not self.stats_summary_shown:
+            self.update_info_label()  # 流式解码完成后统计才完整
 
     def closeEvent(self, event):
         """关闭应用程序时的清理工作"""
@@ -310,15 +847,36 @@ class OscillofunPlayer(QMainWindow):
             self.oscillofun_thread.stop()
         if self.audio_player:
             self.audio_player.stop()
+        self.discard_next_track()
+        self.prefetcher.close()
+        self.thumbnail_indexer.close()
+        self.close_audio_data()
         event.accept()
 
 
 def main():
-    """主函数"""
+    """主函数
+
+    实时输入示例：python signal_generator.py lissajous | python oscillofun_player.py --pipe -
+    """
+    parser = argparse.ArgumentParser(description="Oscillofun播放器 - X-Y模式")
+    parser.add_argument("--opengl", action="store_true", help="优先使用OpenGL示波器组件")
+    parser.add_argument("--pipe", metavar="PATH", help="读取交织的原始PCM立体声：命名管道路径，'-'表示标准输入")
+    parser.add_argument("--rate", type=int, default=44100, help="实时输入的采样率")
+    parser.add_argument("--format", choices=("s16", "f32"), default="s16", help="实时输入的采样格式")
+    parser.add_argument("--audio-backend", choices=AUDIO_BACKENDS, default="pygame",
+                        help="音频输出后端：pygame / callback（sounddevice低延迟回调） / null（无声卡时按虚拟时钟）")
+    parser.add_argument("--decode-process", action="store_true",
+                        help="较短的压缩格式在子进程中解码，经共享内存传回（超过大小上限的仍用流式解码）")
+    args, _ = parser.parse_known_args()  # 其余参数留给Qt
+
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
-    player = OscillofunPlayer()
+    player = OscillofunPlayer(use_opengl=args.opengl, audio_backend=args.audio_backend,
+                              decode_process=args.decode_process)
     player.show()
+    if args.pipe:
+        player.load_live_input(sys.stdin.buffer if args.pipe == "-" else args.pipe, args.rate, args.format)
     sys.exit(app.exec_())
 
 
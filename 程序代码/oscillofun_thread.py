@@ -1,57 +1,206 @@
-import numpy as np
+import sys
+import time
+
 from PyQt5.QtCore import QThread, pyqtSignal
 
+from audio_source import as_audio_source
+from frame_clock import FrameClock
+from frame_ring import FrameRing
+from signal_stats import DEFAULT_DISPLAY_RANGE
+from signal_transform import SignalTransform
+
 
 class OscillofunThread(QThread):
     """专门处理Oscillofun显示效果的线程"""
-    update_signal = pyqtSignal(np.ndarray, int, float)  # 发送帧数据，当前帧数，完成百分比
+    frame_ready_signal = pyqtSignal()  # 有新帧可取；同一时刻最多只有一个通知在队列中
     finished_signal = pyqtSignal()  # 新增：播放完成信号
 
-    def __init__(self, data, fs, frame_rate=30, direction_coeff=(-1, -1)):
+    def __init__(self, data, fs, frame_rate=30, direction_coeff=(-1, -1), transform=None):
         super().__init__()
-        self.data = data
+        self.source = as_audio_source(data, fs)  # ndarray或流式数据源
+        self.live = getattr(self.source, "live", False)  # 实时输入：长度未知，画面跟随最新数据
         self.fs = fs
-        self.frame_rate = frame_rate
-        self.direction_coeff = direction_coeff
+        # 方向系数、坐标轴反转、视图等合成的信号变换，可与界面共用同一个实例
+        self.transform = transform if transform is not None else SignalTransform(direction_coeff)
+        self.direction_coeff = self.transform.direction_coeff
         self.is_running = False
         self.paused = False
-        self.frame_size = fs // frame_rate
-        self.total_frames = len(data) // self.frame_size
         self.current_frame = 0
-        self.display_range = [-0.7, 0.7, -0.7, 0.7]
+        self.display_range = list(DEFAULT_DISPLAY_RANGE)
+
+        # 帧交接：预分配的帧槽环，界面只取最新完整帧
+        self.frame_ring = None
+        self.pending_frame_rate = None
+        self.configure_frames(frame_rate)
+        self.notify_pending = False
+        self.last_taken_sequence = -1
+        self.preview_pending = False  # 暂停中跳转后需要刷新一次画面
+
+        # 时钟调度：优先跟随音频播放位置，静音时退回单调时钟；实时输入跟随已收到的数据
+        self.clock = FrameClock()
+        if self.live:
+            self.clock.live_time = self.live_playback_time
+        self.perf_monitor = None  # 可选的PerfMonitor性能埋点
+        self.quality_governor = None  # 可选的QualityGovernor，接收每帧的生成耗时
+
+    def set_clock_source(self, clock_source):
+        """设置外部时钟，clock_source() 返回音频播放位置（秒），不可用时返回None"""
+        self.clock.set_clock_source(clock_source)
+
+    def live_playback_time(self):
+        """实时输入：以已收到的采样数为时钟并退后一帧，保证目标帧已完整到达；输入积压时直接跳到最新帧"""
+        return self.source.head / self.fs - 1 / self.frame_rate
+
+    @property
+    def dropped_frames(self):
+        return self.clock.dropped_frames
+
+    def get_sync_stats(self):
+        """获取调度统计：丢弃帧数与音画偏差"""
+        return self.clock.get_stats()
 
     def run(self):
         """运行Oscillofun显示线程"""
         self.is_running = True
         self.paused = False
+        self.clock.resume()
+        self.clock.anchor(self.current_frame / self.frame_rate)
 
         while self.is_running and self.current_frame < self.total_frames:
-            if not self.paused:
-                start_idx = self.current_frame * self.frame_size
-                end_idx = min(start_idx + self.frame_size, len(self.data))
-                frame_data = self.data[start_idx:end_idx]
+            if self.pending_frame_rate is not None:
+                self.apply_frame_rate()
+
+            if self.live and self.source.finished and self.total_frames == sys.maxsize:
+                self.configure_frames(self.frame_rate)  # 输入结束，按实际收到的长度确定总帧数
+
+            if self.paused:
+                if self.preview_pending:
+                    self.preview_pending = False
+                    self.publish_frame(self.current_frame)
+                    self.notify_frame()
+                self.clock.idle()
+                continue
+
+            frame_number = self.clock.next_frame(self.current_frame, self.frame_rate)
+            if frame_number is None:
+                continue
+            self.current_frame = frame_number
+            if self.current_frame >= self.total_frames:
+                self.finished_signal.emit()
+                break
+
+            monitor = self.perf_monitor
+            governor = self.quality_governor
+            monitored = monitor is not None and monitor.enabled
+            governed = governor is not None and governor.enabled
+            if monitored or governed:
+                produce_start = time.perf_counter()
+                self.publish_frame(self.current_frame)
+                produce_ms = (time.perf_counter() - produce_start) * 1000
+                if monitored:
+                    monitor.mark_created(self.current_frame, produce_ms, self.clock.dropped_frames,
+                                         self.clock.sync_offset)
+                if governed:
+                    governor.record_produce(produce_ms)
+            else:
+                self.publish_frame(self.current_frame)
+            # 保留约1秒的已播放数据，其余缓冲交还给流式解码线程
+            self.source.release(self.frame_bounds(self.current_frame)[0] - self.fs)
 
-                if len(frame_data.shape) == 2 and frame_data.shape[1] == 2:
-                    frame_data[:, 0] = self.direction_coeff[0] * frame_data[:, 0]
-                    frame_data[:, 1] = self.direction_coeff[1] * frame_data[:, 1]
+            self.notify_frame()
+            self.current_frame += 1
 
-                progress = (end_idx / len(self.data)) * 100
-                self.update_signal.emit(frame_data, self.current_frame, progress)
-                self.current_frame += 1
+            # 检测播放是否完成
+            if self.current_frame >= self.total_frames:
+                self.finished_signal.emit()  # 发射播放完成信号
+                break
 
-                # 检测播放是否完成
-                if self.current_frame >= self.total_frames:
-                    self.finished_signal.emit()  # 发射播放完成信号
-                    break
+            self.clock.sleep_until(self.current_frame, self.frame_rate)
 
-            self.msleep(1000 // self.frame_rate)
+    def configure_frames(self, frame_rate):
+        """按刷新率计算帧参数，帧长不整除采样率时采用分数采样帧边界"""
+        self.frame_rate = int(frame_rate)
+        self.frame_size = -(-self.fs // self.frame_rate)  # 最长一帧的采样数（向上取整）
+        if self.live and not self.source.finished:
+            self.total_frames = sys.maxsize  # 实时输入长度未知
+        else:
+            self.total_frames = -(-len(self.source) * self.frame_rate // self.fs)
+        if self.frame_ring is None or self.frame_ring.max_frame_size < self.frame_size:
+            self.frame_ring = FrameRing(self.frame_size)
+            self.last_taken_sequence = -1
+
+    def frame_bounds(self, frame_number):
+        """第k帧的采样区间 [k*fs/rate, (k+1)*fs/rate)，以整数运算累计小数部分，
+
+        相邻帧首尾相接，不丢失也不重复采样，画面不会相对音频漂移。
+        """
+        start_idx = frame_number * self.fs // self.frame_rate
+        end_idx = min((frame_number + 1) * self.fs // self.frame_rate, len(self.source))
+        return start_idx, end_idx
+
+    def set_frame_rate(self, frame_rate):
+        """切换刷新率（如60/120/144Hz），运行中时由线程在下一帧前应用"""
+        self.pending_frame_rate = frame_rate
+        if not self.isRunning():
+            self.apply_frame_rate()
+
+    def apply_frame_rate(self):
+        """应用新的刷新率，并保持当前播放位置不变"""
+        frame_rate = self.pending_frame_rate
+        self.pending_frame_rate = None
+        if frame_rate is None or int(frame_rate) == self.frame_rate:
+            return
+        position = self.current_frame / self.frame_rate
+        self.configure_frames(frame_rate)
+        self.current_frame = int(position * self.frame_rate)
+
+    def get_frame(self, frame_number, out=None):
+        """截取指定帧的数据并应用信号变换，返回 (帧数据, 完成百分比)
+
+        变换只作用于输出，绝不写回源数据；提供out时结果直接写入out，不分配新数组。
+        """
+        start_idx, end_idx = self.frame_bounds(frame_number)
+        frame_data = self.source.read(start_idx, end_idx)
+
+        if len(frame_data.shape) == 2 and frame_data.shape[1] == 2:
+            frame_data = self.transform.apply(frame_data, out=None if out is None else out[:len(frame_data)])
+        elif out is not None:
+            out[:len(frame_data)] = frame_data.reshape(len(frame_data), -1)[:, :1]
+            frame_data = out[:len(frame_data)]
+
+        progress = (end_idx / len(self.source)) * 100
+        return frame_data, progress
+
+    def publish_frame(self, frame_number):
+        """将指定帧写入帧槽环的空闲槽并发布"""
+        slot, buffer = self.frame_ring.begin_write()
+        frame_data, progress = self.get_frame(frame_number, out=buffer)
+        self.frame_ring.commit(slot, len(frame_data), frame_number, progress)
+
+    def notify_frame(self):
+        """通知界面有新帧；上一个通知尚未被处理时不再排队新的信号，界面处理时会直接取到最新帧"""
+        if not self.notify_pending:
+            self.notify_pending = True
+            self.frame_ready_signal.emit()
+
+    def take_latest_frame(self):
+        """界面线程：取最新的完整帧，跳过其间积压的帧，返回 (帧数据, 帧号, 进度) 或None"""
+        self.notify_pending = False
+        latest = self.frame_ring.acquire_latest(self.last_taken_sequence)
+        if latest is None:
+            return None
+        frame_data, frame_number, progress, sequence = latest
+        self.last_taken_sequence = sequence
+        return frame_data, frame_number, progress
 
     def pause(self):
         """暂停播放"""
+        self.clock.pause()
         self.paused = True
 
     def resume(self):
-        """继续播放"""
+        """继续播放，暂停期间的时长不计入单调时钟"""
+        self.clock.resume()
         self.paused = False
 
     def stop(self):
@@ -63,6 +212,28 @@ class OscillofunThread(QThread):
         """跳转到指定帧"""
         if 0 <= frame_number < self.total_frames:
             self.current_frame = frame_number
+            self.source.seek(self.frame_bounds(frame_number)[0])
+            self.clock.anchor(frame_number / self.frame_rate)
+
+    def refresh_frame(self):
+        """信号变换改变后重新发布当前帧；播放中下一帧自然生效，暂停或未开始时立即刷新"""
+        if self.isRunning():
+            self.preview_pending = True
+        elif 0 <= self.current_frame < self.total_frames:
+            self.publish_frame(self.current_frame)
+            self.notify_frame()
+
+    def scrub(self, frame_number):
+        """时间轴拖动：跳转并立即显示该帧，暂停或尚未开始播放时同样刷新画面"""
+        if not 0 <= frame_number < self.total_frames:
+            return
+        self.seek(frame_number)
+        if not self.isRunning():
+            # 线程未运行时没有其他写入者，直接在调用线程中发布
+            self.publish_frame(frame_number)
+            self.notify_frame()
+        elif self.paused:
+            self.preview_pending = True
 
     def get_progress(self):
         """获取当前播放进度百分比"""
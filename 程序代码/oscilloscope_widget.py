@@ -1,73 +1,178 @@
+import time
+
+import numpy as np
 from PyQt5.QtWidgets import QWidget
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QPainter, QColor, QPen, QFont
-
-
-class OscilloscopeWidget(QWidget):
-    """改进的示波器显示组件，支持坐标轴反转功能"""
-
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setMinimumSize(500, 500)
-        self.setSizePolicy(1, 1)
-
-        self.current_frame_data = None
-        self.display_range = [-0.7, 0.7, -0.7, 0.7]
-        self.point_color = Qt.green
-        self.point_size = 2
-        self.x_reversed = False  # X轴反转标志
-        self.y_reversed = False  # Y轴反转标志
-
-    def set_frame_data(self, frame_data):
-        """设置当前帧的数据"""
-        self.current_frame_data = frame_data
+from PyQt5.QtGui import QPainter, QColor, QPen, QFont, QPolygonF, QPixmap
+
+from beam_interpolation import upsample_frame
+from phosphor_buffer import PhosphorBuffer
+from signal_stats import DEFAULT_DISPLAY_RANGE
+from signal_transform import SignalTransform
+
+HIT_LEVELS = 4  # 按命中次数分档的亮度级数
+
+
+def map_to_screen(frame_data, width, height, display_range, out=None):
+    """将一帧（已经过信号变换的）X-Y数据一次性向量化映射为屏幕坐标，返回 (N, 2) 的float64数组
+
+    显示范围的中心映射到窗口中心；自动范围以信号的直流偏移为中心，不一定关于0对称。
+    """
+    x_min, x_max, y_min, y_max = display_range
+    x_scale = width / (x_max - x_min) if x_max != x_min else 1
+    y_scale = -(height / (y_max - y_min) if y_max != y_min else 1)  # 屏幕坐标Y轴向下
+    x_offset = width // 2 - (x_min + x_max) / 2 * x_scale
+    y_offset = height // 2 - (y_min + y_max) / 2 * y_scale
+
+    n = len(frame_data)
+    if out is None:
+        out = np.empty((n, 2), dtype=np.float64)
+
+    np.multiply(frame_data[:, 0], x_scale, out=out[:, 0])
+    out[:, 0] += x_offset
+    if frame_data.shape[1] >= 2:
+        np.multiply(frame_data[:, 1], y_scale, out=out[:, 1])
+        out[:, 1] += y_offset
+    else:
+        out[:, 1] = y_offset
+    return out
+
+
+def polygon_buffer(n):
+    """创建n个点的QPolygonF，返回 (多边形, 映射其内存的 (n, 2) float64数组)"""
+    polygon = QPolygonF(n)
+    if n == 0:
+        return polygon, np.empty((0, 2), dtype=np.float64)
+    ptr = polygon.data()
+    ptr.setsize(n * 2 * 8)
+    return polygon, np.frombuffer(ptr, dtype=np.float64).reshape(n, 2)
+
+
+def points_to_polygon(frame_data, width, height, display_range):
+    """直接在QPolygonF的内存中完成坐标映射，便于一次性批量提交给Qt绘制"""
+    polygon, buffer = polygon_buffer(len(frame_data))
+    if len(frame_data):
+        map_to_screen(frame_data, width, height, display_range, out=buffer)
+    return polygon
+
+
+def bin_to_pixels(screen_points, width, height, max_points=None):
+    """将屏幕坐标量化到像素网格并去重，返回 (唯一像素坐标 (M, 2) float64, 各像素的命中次数)
+
+    像素序号 y*width+x 打包为一维整数后一次np.unique，落在同一像素上的采样只保留一个；
+    窗口外的点不可见，直接丢弃。唯一像素数超过max_points时沿像素序号均匀抽取，
+    因此绘制量只取决于窗口尺寸和点数预算，与采样率无关。
+    """
+    pixels = np.rint(screen_points).astype(np.int64)
+    x, y = pixels[:, 0], pixels[:, 1]
+    inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+    unique, counts = np.unique(y[inside] * width + x[inside], return_counts=True)
+    if max_points is not None and len(unique) > max_points:
+        keep = np.linspace(0, len(unique) - 1, max_points).astype(np.intp)
+        unique, counts = unique[keep], counts[keep]
+    points = np.empty((len(unique), 2), dtype=np.float64)
+    np.remainder(unique, width, out=points[:, 0], casting="unsafe")
+    np.floor_divide(unique, width, out=points[:, 1], casting="unsafe")
+    return points, counts
+
+
+def hit_levels(counts, levels=4):
+    """按命中次数的对数把像素分为levels档亮度，返回各像素的档位 (0为最暗)"""
+    return np.minimum(np.log2(counts).astype(np.intp), levels - 1)
+
+
+class ScopeDecorations:
+    """示波器的网格、方向指示器、标题与叠加层绘制，供QPainter与OpenGL两种显示组件共用
+
+    坐标轴反转等由信号变换（self.transform）在画面线程中作用于数据，显示组件只负责标示状态。
+    """
+
+    @property
+    def x_reversed(self):
+        return self.transform.x_reversed
+
+    @property
+    def y_reversed(self):
+        return self.transform.y_reversed
+
+    def paint_timed(self):
+        """性能监视或画质调节器需要本次绘制的耗时"""
+        monitor = self.perf_monitor
+        governor = self.quality_governor
+        return (monitor is not None and monitor.enabled) or (governor is not None and governor.enabled)
+
+    def record_paint_time(self, paint_ms):
+        """将绘制耗时交给性能监视与画质调节器"""
+        if self.perf_monitor is not None:
+            self.perf_monitor.mark_painted(self.frame_number, paint_ms)
+        if self.quality_governor is not None and self.quality_governor.enabled:
+            self.quality_governor.record_paint(paint_ms)
+
+    def set_render_quality(self, antialiasing=None, point_size=None):
+        """设置抗锯齿与点大小（画质调节器降级时使用）"""
+        if antialiasing is not None:
+            self.antialiasing = antialiasing
+        if point_size is not None:
+            self.point_size = point_size
         self.update()
 
-    def set_display_range(self, display_range):
-        """设置显示范围"""
-        self.display_range = display_range
+    def set_transform(self, transform):
+        """使用与画面线程共用的信号变换"""
+        self.transform = transform
+        self.transform_changed()
+
+    def transform_changed(self):
+        """信号变换参数改变：清除余辉并重绘标示"""
+        self.phosphor.clear()
         self.update()
 
     def set_x_axis_reversed(self, reversed):
         """设置X轴反转"""
-        self.x_reversed = reversed
-        self.update()
+        self.transform.set_axis_reversed(x=reversed)
+        self.transform_changed()
 
     def set_y_axis_reversed(self, reversed):
         """设置Y轴反转"""
-        self.y_reversed = reversed
-        self.update()
+        self.transform.set_axis_reversed(y=reversed)
+        self.transform_changed()
 
     def toggle_x_axis(self):
         """切换X轴方向"""
-        self.x_reversed = not self.x_reversed
-        self.update()
+        self.set_x_axis_reversed(not self.x_reversed)
         return self.x_reversed
 
     def toggle_y_axis(self):
         """切换Y轴方向"""
-        self.y_reversed = not self.y_reversed
-        self.update()
+        self.set_y_axis_reversed(not self.y_reversed)
         return self.y_reversed
 
-    def paintEvent(self, event):
-        """绘制示波器界面 - X-Y模式"""
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        painter.fillRect(self.rect(), QColor(0, 0, 0))
-        painter.setRenderHint(QPainter.Antialiasing, True)  # 抗锯齿
-        painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
-
-        width = self.width()
-        height = self.height()
-
-        self.draw_grid(painter, width, height)
-
-        if self.current_frame_data is not None and len(self.current_frame_data) > 0:
-            self.draw_xy_points(painter, width, height)
-
-        self.draw_title(painter, width)
-        self.draw_axis_labels(painter, width, height)  # 添加坐标轴标签
+    def static_layers(self, width, height):
+        """返回缓存的 (背景层, 文字层) QPixmap
+
+        网格、方向指示器和文字只随尺寸、显示范围、坐标轴方向与标题变化，变化时才重新绘制；
+        背景层画在数据之下，透明的文字层画在数据之上，每帧只需两次贴图。
+        """
+        key = (width, height, self.devicePixelRatioF(), tuple(self.display_range),
+               self.transform.describe(), self.title_text)
+        if key != self.layer_key:
+            self.background_layer = self.render_layer(
+                width, height, QColor(0, 0, 0), lambda painter: self.draw_grid(painter, width, height))
+            self.text_layer = self.render_layer(width, height, Qt.transparent, lambda painter: (
+                self.draw_title(painter, width), self.draw_axis_labels(painter, width, height)))
+            self.layer_key = key
+        return self.background_layer, self.text_layer
+
+    def render_layer(self, width, height, fill, draw):
+        """按设备像素比创建图层并调用draw(painter)绘制"""
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(int(width * ratio), int(height * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(fill)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        draw(painter)
+        painter.end()
+        return pixmap
 
     def draw_grid(self, painter, width, height):
         """绘制网格和坐标轴"""
@@ -141,11 +246,240 @@ class OscilloscopeWidget(QWidget):
             painter.drawLine(x_arrow_x + arrow_size, x_arrow_y, x_arrow_x + arrow_size // 2,
                              x_arrow_y + arrow_size // 2)
 
+    def draw_overlay(self, painter):
+        """绘制性能统计叠加层"""
+        painter.setPen(QPen(QColor(255, 200, 0)))
+        font = QFont("Monospace", 9)
+        font.setStyleHint(QFont.TypeWriter)
+        painter.setFont(font)
+        line_height = painter.fontMetrics().height()
+        for i, line in enumerate(self.overlay_text.split("\n")):
+            painter.drawText(10, 80 + i * line_height, line)
+
+    def draw_title(self, painter, width):
+        """绘制标题和坐标轴状态"""
+        pen = QPen(QColor(255, 255, 255))
+        font = QFont("Arial", 14, QFont.Bold)
+        painter.setPen(pen)
+        painter.setFont(font)
+
+        text_width = painter.fontMetrics().width(self.title_text)
+        painter.drawText((width - text_width) // 2, 30, self.title_text)
+
+        # 显示坐标轴状态
+        axis_status = self.transform.describe()
+        status_font = QFont("Arial", 10)
+        painter.setFont(status_font)
+        status_width = painter.fontMetrics().width(axis_status)
+        painter.drawText((width - status_width) // 2, 55, axis_status)
+
+    def draw_axis_labels(self, painter, width, height):
+        """绘制坐标轴标签"""
+        pen = QPen(QColor(200, 200, 200))
+        font = QFont("Arial", 8)
+        painter.setPen(pen)
+        painter.setFont(font)
+
+        center_x = width // 2
+        center_y = height // 2
+
+
+class OscilloscopeWidget(ScopeDecorations, QWidget):
+    """改进的示波器显示组件，支持坐标轴反转功能"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumSize(500, 500)
+        self.setSizePolicy(1, 1)
+
+        self.current_frame_data = None
+        self.display_range = list(DEFAULT_DISPLAY_RANGE)
+        self.point_color = Qt.green
+        self.point_size = 2
+        self.title_text = "Oscillofun - X-Y Mode"
+        self.transform = SignalTransform()  # 坐标轴反转等信号变换，播放时与画面线程共用
+        self.render_mode = "vectorized"  # 渲染方式: vectorized(批量) / legacy(逐点)
+        self.draw_mode = "points"  # 绘制方式: points(点) / beam(相邻采样连成光束)
+        self.interpolation = "none"  # 光束模式的帧内插值: none / linear / polyphase
+        self.upsample_factor = 4
+        self.pixel_binning = True  # 点模式下按像素去重，绘制量不随采样率增长
+        self.max_points = 8192  # 去重后每帧最多绘制的点数，None表示不限
+        self.hit_brightness = False  # 按像素命中次数分档亮度
+        self.persistence_enabled = False  # 荧光余辉模式
+        self.phosphor = PhosphorBuffer()
+        self.frame_number = -1
+        self.perf_monitor = None  # 可选的PerfMonitor性能埋点
+        self.quality_governor = None  # 可选的QualityGovernor，接收每次绘制的耗时
+        self.antialiasing = True
+        self.overlay_text = None  # 性能叠加层文字，None表示不显示
+        self.layer_key = None  # 静态图层对应的尺寸、范围与方向，变化时重建
+        self.background_layer = None
+        self.text_layer = None
+
+    def set_frame_data(self, frame_data, frame_number=-1):
+        """设置当前帧的数据"""
+        self.current_frame_data = frame_data
+        self.frame_number = frame_number
+        if self.persistence_enabled:
+            self.deposit_phosphor(frame_data)
+        self.update()
+
+    def set_display_range(self, display_range, clear=True):
+        """设置显示范围；clear为False时保留余辉（自适应量程的小幅调整），用户改变量程时清空"""
+        self.display_range = display_range
+        if clear:
+            self.phosphor.clear()
+        self.update()
+
+    def set_overlay_text(self, text):
+        """设置性能叠加层文字，None表示隐藏"""
+        self.overlay_text = text
+        self.update()
+
+    def set_persistence(self, enabled, decay_time=None):
+        """开启/关闭荧光余辉模式，decay_time为衰减时间常数（秒）"""
+        self.persistence_enabled = enabled
+        if decay_time is not None:
+            self.phosphor.set_decay_time(decay_time)
+        self.phosphor.clear()
+        self.update()
+
+    def deposit_phosphor(self, frame_data):
+        """将新一帧的采样点沉积到余辉缓冲区"""
+        self.phosphor.resize(self.width(), self.height())
+        if frame_data is None:
+            self.phosphor.clear()
+            return
+        if len(frame_data.shape) == 1 or len(frame_data) == 0:
+            return
+        screen_points = map_to_screen(self.beam_frame(frame_data), self.width(), self.height(),
+                                      self.display_range)
+        self.phosphor.deposit(screen_points)
+
+    def set_render_mode(self, mode):
+        """设置数据点渲染方式，便于对比向量化批量绘制与逐点绘制"""
+        if mode not in ("vectorized", "legacy"):
+            raise ValueError(f"未知的渲染方式: {mode}")
+        self.render_mode = mode
+        self.update()
+
+    def set_draw_mode(self, mode, interpolation=None, upsample_factor=None):
+        """设置绘制方式，光束模式可选帧内升采样插值"""
+        if mode not in ("points", "beam"):
+            raise ValueError(f"未知的绘制方式: {mode}")
+        if interpolation not in (None, "none", "linear", "polyphase"):
+            raise ValueError(f"未知的插值方式: {interpolation}")
+        self.draw_mode = mode
+        if interpolation is not None:
+            self.interpolation = interpolation
+        if upsample_factor is not None:
+            self.upsample_factor = max(1, int(upsample_factor))
+        self.phosphor.clear()
+        self.update()
+
+    def set_level_of_detail(self, pixel_binning=None, max_points=None, hit_brightness=None):
+        """设置点模式的像素去重：是否启用、每帧点数上限（0表示不限）与是否按命中次数分档亮度"""
+        if pixel_binning is not None:
+            self.pixel_binning = pixel_binning
+        if max_points is not None:
+            self.max_points = max_points or None
+        if hit_brightness is not None:
+            self.hit_brightness = hit_brightness
+        self.update()
+
+    def beam_frame(self, frame_data):
+        """光束模式下返回升采样后的帧数据，其它模式原样返回"""
+        if self.draw_mode != "beam" or self.interpolation == "none":
+            return frame_data
+        return upsample_frame(frame_data, self.upsample_factor, self.interpolation)
+
+    def paintEvent(self, event):
+        """绘制示波器界面 - X-Y模式"""
+        paint_start = time.perf_counter() if self.paint_timed() else None
+
+        width = self.width()
+        height = self.height()
+        background_layer, text_layer = self.static_layers(width, height)
+
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, background_layer)
+        painter.setRenderHint(QPainter.Antialiasing, self.antialiasing)  # 抗锯齿
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
+
+        if self.persistence_enabled:
+            self.draw_phosphor(painter)
+        elif self.current_frame_data is not None and len(self.current_frame_data) > 0:
+            self.draw_xy_points(painter, width, height)
+
+        painter.drawPixmap(0, 0, text_layer)
+
+        if self.overlay_text:
+            self.draw_overlay(painter)
+
+        if paint_start is not None:
+            painter.end()
+            self.record_paint_time((time.perf_counter() - paint_start) * 1000)
+
+    def draw_phosphor(self, painter):
+        """将余辉缓冲区作为一张图像叠加到网格之上"""
+        if self.phosphor.width != self.width() or self.phosphor.height != self.height():
+            return
+        painter.save()
+        painter.setCompositionMode(QPainter.CompositionMode_Plus)
+        painter.drawImage(0, 0, self.phosphor.to_qimage())
+        painter.restore()
+
     def draw_xy_points(self, painter, width, height):
-        """绘制X-Y模式的数据点，支持坐标轴反转[4,6](@ref)"""
+        """绘制X-Y模式的数据点，按render_mode选择渲染方式"""
         if len(self.current_frame_data.shape) == 1:
             return
 
+        if self.render_mode == "legacy":
+            self.draw_xy_points_legacy(painter, width, height)
+        else:
+            self.draw_xy_points_vectorized(painter, width, height)
+
+    def draw_xy_points_vectorized(self, painter, width, height):
+        """向量化映射整帧坐标，并通过一次drawPoints/drawPolyline调用批量提交"""
+        pen = QPen(self.point_color)
+        pen.setWidth(self.point_size)
+        painter.setPen(pen)
+
+        if self.draw_mode == "beam":
+            polygon = points_to_polygon(self.beam_frame(self.current_frame_data), width, height,
+                                        self.display_range)
+            painter.drawPolyline(polygon)
+        elif self.pixel_binning:
+            self.draw_binned_points(painter, pen, width, height)
+        else:
+            polygon = points_to_polygon(self.current_frame_data, width, height, self.display_range)
+            painter.drawPoints(polygon)
+
+    def draw_binned_points(self, painter, pen, width, height):
+        """只绘制去重后的像素；开启命中亮度时每档亮度一次drawPoints"""
+        screen_points = map_to_screen(self.current_frame_data, width, height, self.display_range)
+        points, counts = bin_to_pixels(screen_points, width, height, self.max_points)
+        if not self.hit_brightness:
+            polygon, buffer = polygon_buffer(len(points))
+            buffer[:] = points
+            painter.drawPoints(polygon)
+            return
+
+        levels = hit_levels(counts, HIT_LEVELS)
+        color = QColor(self.point_color)
+        for level in range(HIT_LEVELS):
+            selected = points[levels == level]
+            if len(selected) == 0:
+                continue
+            color.setAlphaF(0.4 + 0.6 * level / (HIT_LEVELS - 1))
+            pen.setColor(color)
+            painter.setPen(pen)
+            polygon, buffer = polygon_buffer(len(selected))
+            buffer[:] = selected
+            painter.drawPoints(polygon)
+
+    def draw_xy_points_legacy(self, painter, width, height):
+        """逐点绘制X-Y模式的数据点（坐标轴反转已由信号变换作用于数据）[4,6](@ref)"""
         pen = QPen(self.point_color)
         pen.setWidth(self.point_size)
         painter.setPen(pen)
@@ -169,43 +503,8 @@ class OscilloscopeWidget(QWidget):
                     self.current_frame_data[i]
                 y_val = 0
 
-            # 应用坐标轴反转[6](@ref)
-            if self.x_reversed:
-                x_val = -x_val
-            if self.y_reversed:
-                y_val = -y_val
-
             # 将数据坐标转换为屏幕坐标[5](@ref)
             x_screen = int(center_x + x_val * x_scale)
             y_screen = int(center_y - y_val * y_scale)  # 屏幕坐标Y轴向下
 
             painter.drawPoint(x_screen, y_screen)
-
-    def draw_title(self, painter, width):
-        """绘制标题和坐标轴状态"""
-        pen = QPen(QColor(255, 255, 255))
-        font = QFont("Arial", 14, QFont.Bold)
-        painter.setPen(pen)
-        painter.setFont(font)
-
-        title_text = "Oscillofun - X-Y Mode"
-        text_width = painter.fontMetrics().width(title_text)
-        painter.drawText((width - text_width) // 2, 30, title_text)
-
-        # 显示坐标轴状态
-        axis_status = f"X轴: {'反向' if self.x_reversed else '正向'}, Y轴: {'反向' if self.y_reversed else '正向'}"
-        status_font = QFont("Arial", 10)
-        painter.setFont(status_font)
-        status_width = painter.fontMetrics().width(axis_status)
-        painter.drawText((width - status_width) // 2, 55, axis_status)
-
-    def draw_axis_labels(self, painter, width, height):
-        """绘制坐标轴标签"""
-        pen = QPen(QColor(200, 200, 200))
-        font = QFont("Arial", 8)
-        painter.setPen(pen)
-        painter.setFont(font)
-
-        center_x = width // 2
-        center_y = height // 2
-
@@ -0,0 +1,146 @@
+import csv
+import json
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+RECORD_FIELDS = ("frame", "created", "produce_ms", "delivered", "painted", "paint_ms",
+                 "create_to_paint_ms", "dropped_frames", "sync_offset_ms")
+
+
+class PerfMonitor:
+    """逐帧性能埋点：记录帧生成、信号送达与绘制完成的时间戳"""
+
+    def __init__(self, window=300, max_records=1000000):
+        self.enabled = False
+        self.window = window  # 滚动百分位统计的窗口帧数
+        self.max_records = max_records
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """清空所有记录"""
+        with self.lock:
+            self.pending = {}  # 尚未绘制完成的帧
+            self.records = []
+            self.frame_intervals = deque(maxlen=self.window)
+            self.produce_times = deque(maxlen=self.window)
+            self.paint_times = deque(maxlen=self.window)
+            self.latencies = deque(maxlen=self.window)
+            self.sync_offsets = deque(maxlen=self.window)
+            self.last_created = None
+            self.dropped_frames = 0
+
+    def set_enabled(self, enabled):
+        """开关埋点，关闭时各埋点方法只做一次属性判断"""
+        if enabled and not self.enabled:
+            self.reset()
+        self.enabled = enabled
+
+    def mark_created(self, frame_number, produce_ms, dropped_frames=0, sync_offset=0.0):
+        """工作线程：帧数据生成完毕"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        with self.lock:
+            if self.last_created is not None:
+                self.frame_intervals.append((now - self.last_created) * 1000)
+            self.last_created = now
+            self.produce_times.append(produce_ms)
+            self.sync_offsets.append(sync_offset * 1000)
+            self.dropped_frames = dropped_frames
+            self.pending[frame_number] = {
+                "frame": frame_number,
+                "created": now,
+                "produce_ms": produce_ms,
+                "delivered": None,
+                "painted": None,
+                "paint_ms": None,
+                "create_to_paint_ms": None,
+                "dropped_frames": dropped_frames,
+                "sync_offset_ms": sync_offset * 1000,
+            }
+
+    def mark_delivered(self, frame_number):
+        """GUI线程：帧信号送达"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        with self.lock:
+            record = self.pending.get(frame_number)
+            if record is not None:
+                record["delivered"] = now
+
+    def mark_painted(self, frame_number, paint_ms):
+        """GUI线程：包含该帧的绘制完成"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        with self.lock:
+            self.paint_times.append(paint_ms)
+            record = self.pending.pop(frame_number, None)
+            if record is None:
+                return
+            record["painted"] = now
+            record["paint_ms"] = paint_ms
+            record["create_to_paint_ms"] = (now - record["created"]) * 1000  # 从帧数据生成完毕到绘制完成
+            self.latencies.append(record["create_to_paint_ms"])
+            # 被更新帧覆盖而未绘制的帧不再等待
+            for stale in [n for n in self.pending if n < frame_number]:
+                self._append_record(self.pending.pop(stale))
+            self._append_record(record)
+
+    def _append_record(self, record):
+        """保存一条完成的记录，达到max_records后不再保存（调用方持有锁）"""
+        if len(self.records) < self.max_records:
+            self.records.append(record)
+
+    def percentiles(self, percents=(50, 95, 99)):
+        """滚动窗口内各指标的百分位（毫秒）"""
+        with self.lock:
+            series = {
+                "frame_interval": list(self.frame_intervals),
+                "produce": list(self.produce_times),
+                "paint": list(self.paint_times),
+                "create_to_paint": list(self.latencies),
+                "sync_offset": list(self.sync_offsets),
+            }
+        result = {}
+        for name, values in series.items():
+            if values:
+                result[name] = dict(zip(percents, np.percentile(values, percents)))
+        return result
+
+    def overlay_text(self):
+        """生成屏幕叠加层显示的文字"""
+        stats = self.percentiles()
+        labels = (("frame_interval", "帧间隔"), ("produce", "生成"), ("paint", "绘制"),
+                  ("create_to_paint", "生成至绘制"), ("sync_offset", "音画偏差"))
+        lines = []
+        for key, label in labels:
+            if key in stats:
+                p = stats[key]
+                lines.append(f"{label} p50/p95/p99: {p[50]:.1f}/{p[95]:.1f}/{p[99]:.1f} ms")
+        lines.append(f"丢帧: {self.dropped_frames}")
+        return "\n".join(lines)
+
+    def _rows(self):
+        """按帧号排序的完整记录"""
+        with self.lock:
+            rows = self.records + list(self.pending.values())
+        return sorted(rows, key=lambda r: r["frame"])
+
+    def export_csv(self, file_path):
+        """导出逐帧记录为CSV"""
+        with open(file_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=RECORD_FIELDS)
+            writer.writeheader()
+            writer.writerows(self._rows())
+
+    def export_json(self, file_path):
+        """导出逐帧记录和百分位统计为JSON"""
+        summary = {name: {str(k): v for k, v in p.items()} for name, p in self.percentiles().items()}
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "frames": self._rows()}, f, ensure_ascii=False, indent=1)
@@ -0,0 +1,77 @@
+import time
+
+import numpy as np
+from PyQt5.QtGui import QImage, qRgb
+
+
+class PhosphorBuffer:
+    """模拟示波器荧光余辉的强度累积缓冲区"""
+
+    def __init__(self, decay_time=0.12, gain=0.35, color=(0, 255, 0)):
+        self.decay_time = decay_time  # 余辉衰减时间常数（秒）
+        self.gain = gain  # 每个采样点沉积的亮度
+        self.width = 0
+        self.height = 0
+        self.intensity = np.zeros((0, 0), dtype=np.float32)
+        self._pixels = np.zeros((0, 0), dtype=np.uint8)
+        self._last_time = None
+        self._color_table = [qRgb(int(color[0] * i / 255), int(color[1] * i / 255), int(color[2] * i / 255))
+                             for i in range(256)]
+
+    def resize(self, width, height):
+        """按窗口分辨率重新分配缓冲区"""
+        if width == self.width and height == self.height:
+            return
+        self.width = width
+        self.height = height
+        self.intensity = np.zeros((height, width), dtype=np.float32)
+        self._pixels = np.zeros((height, width), dtype=np.uint8)
+        self._last_time = None
+
+    def clear(self):
+        """清空余辉"""
+        self.intensity.fill(0)
+        self._last_time = None
+
+    def set_decay_time(self, decay_time):
+        """设置余辉衰减时间常数（秒）"""
+        self.decay_time = max(1e-3, float(decay_time))
+
+    def decay(self, now=None):
+        """按距上次沉积经过的时间做指数衰减"""
+        now = time.monotonic() if now is None else now
+        if self._last_time is not None:
+            factor = np.exp(-(now - self._last_time) / self.decay_time)
+            self.intensity *= np.float32(factor)
+        self._last_time = now
+
+    def deposit(self, screen_points, now=None):
+        """将一帧屏幕坐标向量化沉积到强度缓冲区"""
+        self.decay(now)
+        if self.width == 0 or self.height == 0 or len(screen_points) == 0:
+            return
+
+        xs = np.rint(screen_points[:, 0]).astype(np.intp)
+        ys = np.rint(screen_points[:, 1]).astype(np.intp)
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        flat_index = ys[inside] * self.width + xs[inside]
+
+        hits = np.bincount(flat_index, minlength=self.width * self.height)
+        self.intensity += (hits.reshape(self.height, self.width) * self.gain).astype(np.float32)
+
+    def tone_map(self):
+        """将强度缓冲区映射为8位亮度，返回复用的像素数组"""
+        # 1 - exp(-I) 的软饱和映射，高密度区域不会生硬截断
+        np.multiply(-np.expm1(-self.intensity), 255, out=self._pixels, casting="unsafe")
+        return self._pixels
+
+    def to_qimage(self):
+        """将强度缓冲区色调映射后整体转换为一张QImage"""
+        if self.width == 0 or self.height == 0:
+            return QImage()
+
+        self.tone_map()
+        image = QImage(self._pixels.data, self.width, self.height, self.width, QImage.Format_Indexed8)
+        image.setColorTable(self._color_table)
+        return image
+
@@ -0,0 +1,191 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from audio_loader import AUDIO_EXTENSIONS, load_audio_with_stats
+from library_index import LibraryIndex
+
+
+class Playlist:
+    """播放列表：文件路径队列与当前位置"""
+
+    def __init__(self):
+        self.files = []
+        self.current = -1
+
+    def __len__(self):
+        return len(self.files)
+
+    def add_files(self, file_paths):
+        """追加文件，返回第一个新文件的序号"""
+        first = len(self.files)
+        self.files.extend(file_paths)
+        return first
+
+    def add_folder(self, folder):
+        """按文件名顺序追加文件夹中的音频文件，返回第一个新文件的序号"""
+        names = sorted(name for name in os.listdir(folder) if name.lower().endswith(AUDIO_EXTENSIONS))
+        return self.add_files([os.path.join(folder, name) for name in names])
+
+    def next_index(self, index=None):
+        """index（默认当前曲目）之后的序号，已到末尾时返回None"""
+        index = self.current + 1 if index is None else index + 1
+        return index if index < len(self.files) else None
+
+    def upcoming(self, depth):
+        """当前曲目之后的depth个序号"""
+        return list(range(self.current + 1, min(self.current + 1 + depth, len(self.files))))
+
+    def clear(self):
+        """清空列表"""
+        self.files = []
+        self.current = -1
+
+
+class PreparedTrack:
+    """预取完成的曲目：已解码的数据（或已开始解码的流式数据源）、采样率和信号统计"""
+
+    def __init__(self, index, file_path, data, fs, stats):
+        self.index = index
+        self.file_path = file_path
+        self.data = data
+        self.fs = fs
+        self.stats = stats
+
+    @property
+    def nbytes(self):
+        """占用的内存：流式数据源计环形缓冲区，子进程解码的数据源计整块共享内存，内存映射的缓存数据由系统按需换页，不计入"""
+        if hasattr(self.data, "ring"):
+            return self.data.ring.nbytes
+        if isinstance(self.data, np.memmap):
+            return 0
+        return getattr(self.data, "nbytes", 0)
+
+    def close(self):
+        """释放数据（停止流式解码线程）"""
+        if hasattr(self.data, "close"):
+            self.data.close()
+        self.data = None
+
+
+class TrackPrefetcher(QObject):
+    """在后台线程池中解码并准备后续曲目；预取曲目的总内存超过上限时只保留紧接着的下一首"""
+    track_ready = pyqtSignal(object)  # PreparedTrack，跨线程信号在界面线程中处理
+
+    def __init__(self, cache=None, streaming=True, decode_process=False, workers=1, max_bytes=512 * 1024 ** 2):
+        super().__init__()
+        self.cache = cache
+        self.streaming = streaming
+        self.decode_process = decode_process
+        self.max_bytes = max_bytes
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.prepared = {}  # 序号 -> PreparedTrack
+        self.pending = {}  # 序号 -> 文件路径
+        self.wanted = set()  # 仍需要的序号，其余的加载完成后直接释放
+        self.lock = threading.Lock()
+
+    def prefetch(self, playlist, depth=2):
+        """预取当前曲目之后的depth首，并释放不再需要的预取结果"""
+        upcoming = playlist.upcoming(depth)
+        with self.lock:
+            self.wanted = set(upcoming)
+            for index in [i for i in self.prepared if i not in self.wanted]:
+                self.prepared.pop(index).close()
+            for position, index in enumerate(upcoming):
+                if index in self.prepared or index in self.pending:
+                    continue
+                if position > 0 and self._total_bytes() >= self.max_bytes:
+                    break
+                self.pending[index] = playlist.files[index]
+                self.executor.submit(self._load, index, playlist.files[index])
+
+    def _load(self, index, file_path):
+        """工作线程：加载一首曲目"""
+        try:
+            data, fs, stats = load_audio_with_stats(file_path, streaming=self.streaming, cache=self.cache,
+                                                    decode_process=self.decode_process)
+        except Exception as e:
+            print(f"预取失败 {os.path.basename(file_path)}: {e}")
+            with self.lock:
+                self.pending.pop(index, None)
+            return
+        track = PreparedTrack(index, file_path, data, fs, stats)
+        with self.lock:
+            self.pending.pop(index, None)
+            if index not in self.wanted:
+                track.close()
+                return
+            self.prepared[index] = track
+            self._enforce_limit()
+            if index not in self.prepared:
+                return
+        self.track_ready.emit(track)
+
+    def _total_bytes(self):
+        return sum(track.nbytes for track in self.prepared.values())
+
+    def _enforce_limit(self):
+        """超过内存上限时从最靠后的曲目开始释放，紧接着的下一首始终保留"""
+        nearest = min(self.prepared)
+        for index in sorted(self.prepared, reverse=True):
+            if self._total_bytes() <= self.max_bytes:
+                break
+            if index != nearest:
+                self.prepared.pop(index).close()
+
+    def take(self, index):
+        """取出已预取的曲目，由调用方负责释放；尚未完成时返回None"""
+        with self.lock:
+            return self.prepared.pop(index, None)
+
+    def close(self):
+        """停止预取并释放所有预取结果"""
+        with self.lock:
+            self.wanted = set()
+            for track in self.prepared.values():
+                track.close()
+            self.prepared = {}
+        self.executor.shutdown(wait=False)
+
+
+class ThumbnailIndexer(QObject):
+    """在后台为播放列表中的文件建立曲库索引（X-Y缩略图与统计），每完成一首通知界面
+
+    扫描在单个后台线程中排队进行，分析本身由曲库索引的进程池完成；默认只用一半CPU核心，不影响播放。
+    """
+    thumbnail_ready = pyqtSignal(str, object)  # 文件的绝对路径, 索引条目（无法分析时为None）
+
+    def __init__(self, index=None, jobs=None):
+        super().__init__()
+        self.index = index or LibraryIndex()
+        self.jobs = jobs or max(1, (os.cpu_count() or 2) // 2)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.closed = False
+
+    def request(self, file_paths):
+        """排队索引一批文件，已在索引中的立即通知"""
+        if file_paths and not self.closed:
+            self.executor.submit(self._scan, list(file_paths))
+
+    def _scan(self, file_paths):
+        """工作线程：增量扫描一批文件"""
+        try:
+            self.index.scan(file_paths, jobs=self.jobs, callback=self.thumbnail_ready.emit,
+                            should_stop=lambda: self.closed)
+        except Exception as e:
+            print(f"曲库索引失败: {e}")
+
+    def close(self):
+        """取消排队的扫描，正在分析的文件完成后停止"""
+        self.closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def load_track(index, file_path, streaming=True, cache=None, decode_process=False):
+    """在调用线程中直接加载一首曲目（预取尚未完成时使用）"""
+    data, fs, stats = load_audio_with_stats(file_path, streaming=streaming, cache=cache,
+                                            decode_process=decode_process)
+    return PreparedTrack(index, file_path, data, fs, stats)
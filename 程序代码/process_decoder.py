@@ -0,0 +1,194 @@
+import multiprocessing
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from audio_source import to_stereo
+
+# forkserver预加载本模块，每个解码子进程无需重新导入numpy与soundfile
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+MAX_SHARED_BYTES = 256 * 1024 ** 2  # 整轨放入共享内存的上限（48kHz立体声约23分钟），更长的文件用流式解码
+CANCEL = "cancel"
+
+
+def decode_worker(file_path, shm_name, total_samples, connection, block_size=65536):
+    """解码子进程：逐块解码写入界面进程分配的共享内存，每块报告一次进度，收到CANCEL时停止"""
+    try:
+        import soundfile
+
+        with soundfile.SoundFile(file_path) as sound_file:
+            shm = shared_memory.SharedMemory(name=shm_name)
+            samples = None
+            try:
+                samples = np.ndarray((total_samples, 2), dtype=np.float32, buffer=shm.buf)
+                position = 0
+                while position < total_samples:
+                    if connection.poll() and connection.recv() == CANCEL:
+                        connection.send(("cancelled", position))
+                        return
+                    block = sound_file.read(block_size, dtype="float32", always_2d=True)
+                    if len(block) == 0:
+                        break  # 实际长度短于文件头声明的长度
+                    block = to_stereo(block)[:total_samples - position]
+                    samples[position:position + len(block)] = block
+                    position += len(block)
+                    connection.send(("progress", position))
+                connection.send(("done", position))
+            finally:
+                samples = None  # 先释放数组视图才能关闭共享内存
+                shm.close()
+    except Exception as e:
+        connection.send(("error", str(e)))
+    finally:
+        connection.close()
+
+
+class SharedMemoryAudioSource:
+    """在子进程中解码、经共享内存传回的数据源
+
+    界面进程把共享内存直接映射为 (采样点, 2) 的float32数组，读取返回视图而不复制；
+    解码进度和取消通过管道传递，解码占用另一个CPU核心，不与界面线程争用GIL。
+    整轨都在共享内存中，因此只用于不超过max_bytes的文件；解码按顺序进行，
+    跳转到尚未解码的位置时要等顺序解码追上，上限内的文件通常在数秒内解码完毕。
+    """
+
+    def __init__(self, file_path, read_timeout=0.5, block_sinks=(), start=True, max_bytes=MAX_SHARED_BYTES):
+        import soundfile
+
+        # 本进程只读文件头确定采样率与长度，据此分配共享内存，不等待子进程启动
+        with soundfile.SoundFile(file_path) as sound_file:
+            self.fs = sound_file.samplerate
+            self.total_samples = sound_file.frames
+        if self.total_samples * 2 * 4 > max_bytes:
+            raise ValueError(f"解码后 {self.total_samples * 8 / 1024 ** 2:.0f}MB，超过共享内存上限 "
+                             f"{max_bytes / 1024 ** 2:.0f}MB")
+        self.file_path = file_path
+        self.read_timeout = read_timeout
+        self.block_sinks = list(block_sinks)  # 接收解码块的写入器（如解码缓存、信号统计）
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, self.total_samples * 2 * 4))
+        self.samples = np.ndarray((self.total_samples, 2), dtype=np.float32, buffer=self.shm.buf)
+        self.decoded = 0  # 子进程已写入的采样数
+        self.error = None
+        self.closed = False
+        self.started = False
+        self.condition = threading.Condition()
+
+        context = multiprocessing.get_context(START_METHOD)
+        if START_METHOD == "forkserver":
+            context.set_forkserver_preload([__name__])
+        self.connection, self.child_connection = context.Pipe()
+        self.process = context.Process(
+            target=decode_worker, args=(file_path, self.shm.name, self.total_samples, self.child_connection),
+            daemon=True)
+        self.listen_thread = threading.Thread(target=self._listen_loop, daemon=True)
+        if start:
+            self.start()
+
+    def start(self):
+        """启动解码子进程；需要先挂接写入器时以start=False构造，挂接后再调用"""
+        self.started = True
+        self.process.start()
+        self.child_connection.close()
+        self.listen_thread.start()
+
+    def __len__(self):
+        return self.total_samples
+
+    @property
+    def channels(self):
+        return 2
+
+    @property
+    def nbytes(self):
+        return self.samples.nbytes
+
+    @property
+    def finished(self):
+        """是否已解码到文件末尾"""
+        return self.decoded >= self.total_samples
+
+    @property
+    def progress(self):
+        """解码进度 (0-1)"""
+        return self.decoded / self.total_samples if self.total_samples else 1.0
+
+    def _listen_loop(self):
+        """接收子进程的进度消息，把新解码的部分交给写入器"""
+        completed = False
+        while True:
+            try:
+                message = self.connection.recv()
+            except (EOFError, OSError):
+                break
+            kind = message[0]
+            if kind == "progress":
+                position = message[1]
+                if not self.closed:
+                    for sink in self.block_sinks:
+                        sink.write(self.decoded, self.samples[self.decoded:position])
+                with self.condition:
+                    self.decoded = position
+                    self.condition.notify_all()
+            elif kind == "done":
+                with self.condition:
+                    self.total_samples = message[1]  # 提前结束时以实际长度为准
+                    self.condition.notify_all()
+                if not self.closed:
+                    for sink in self.block_sinks:
+                        sink.finish(self.total_samples)
+                    completed = True
+                break
+            elif kind == "error":
+                self.error = message[1]
+                print(f"子进程解码失败: {self.error}")
+                break
+            else:
+                break  # 已取消
+        if not completed:
+            for sink in self.block_sinks:
+                sink.abort()
+        self.block_sinks = []
+        with self.condition:
+            self.condition.notify_all()
+
+    def read(self, start, stop):
+        """读取 [start, stop) 区间的采样点（共享内存上的视图），数据未就绪时最多等待read_timeout秒"""
+        stop = min(stop, self.total_samples)
+        with self.condition:
+            self.condition.wait_for(lambda: self.closed or self.error is not None or self.decoded >= stop,
+                                    timeout=self.read_timeout)
+            stop = min(stop, self.decoded)
+        return self.samples[start:max(start, stop)]
+
+    def release(self, position):
+        """整个文件都在共享内存中，无需释放"""
+
+    def seek(self, position):
+        """共享内存可随机访问，无需处理"""
+
+    def close(self):
+        """取消解码并释放共享内存"""
+        if self.closed:
+            return
+        self.closed = True
+        with self.condition:
+            self.condition.notify_all()
+        if self.started:
+            try:
+                self.connection.send(CANCEL)
+            except OSError:
+                pass  # 子进程已退出
+            self.process.join(timeout=2)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.listen_thread.join()
+        else:
+            self.child_connection.close()
+        self.connection.close()
+        self.samples = np.zeros((0, 2), dtype=np.float32)
+        self.shm.unlink()
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # 仍有视图引用共享内存，映射随这些数组回收时释放
@@ -0,0 +1,129 @@
+from collections import deque
+
+import numpy as np
+
+
+class QualityLevel:
+    """一档画质：每帧点数上限、抗锯齿、点大小与刷新率上限（None表示不限）"""
+
+    def __init__(self, name, max_points, antialiasing, point_size, max_frame_rate):
+        self.name = name
+        self.max_points = max_points
+        self.antialiasing = antialiasing
+        self.point_size = point_size
+        self.max_frame_rate = max_frame_rate
+
+
+# 从高到低排列，降级时依次减少点数、关闭抗锯齿、降低刷新率、缩小点
+QUALITY_LEVELS = (
+    QualityLevel("高", 8192, True, 2, None),
+    QualityLevel("中", 4096, True, 2, None),
+    QualityLevel("低", 2048, False, 2, 60),
+    QualityLevel("最低", 1024, False, 1, 30),
+)
+
+
+class QualityGovernor:
+    """画质调节器：按实测的绘制与生成耗时在帧预算内升降画质档位
+
+    每个评估窗口取绘制、生成耗时的p90，超过帧预算的high_load连续down_after个窗口则降一档；
+    按上一档的帧预算估算仍低于low_load、并连续up_after个窗口时才升一档。
+    升降阈值相距较远且升档更慢，负载在阈值附近波动时不会来回切换；
+    升档后很快又被迫降档（高一档的绘制本身更慢）时，再次升档前等待的窗口数加倍。
+    """
+
+    def __init__(self, high_load=0.8, low_load=0.5, down_after=2, up_after=8, min_samples=10, window=120):
+        self.enabled = True
+        self.high_load = high_load
+        self.low_load = low_load
+        self.down_after = down_after
+        self.up_after = up_after
+        self.min_samples = min_samples
+        self.paint_times = deque(maxlen=window)  # 界面线程写入
+        self.produce_times = deque(maxlen=window)  # 画面线程写入
+        self.level = 0
+        self.over_count = 0
+        self.under_count = 0
+        self.windows_at_level = 0  # 进入当前档位后评估过的窗口数
+        self.raised = False  # 当前档位是否由升档进入
+        self.up_backoff = 1  # 升档等待窗口数的倍数
+        self.last_dropped = None
+        self.last_load = None  # 最近一次评估的负载（相对帧预算）
+
+    @property
+    def current(self):
+        """当前的画质档位"""
+        return QUALITY_LEVELS[self.level]
+
+    def frame_rate(self, requested, level=None):
+        """在指定档位（默认当前档位）下实际使用的刷新率"""
+        cap = QUALITY_LEVELS[self.level if level is None else level].max_frame_rate
+        return requested if cap is None else min(requested, cap)
+
+    def record_paint(self, paint_ms):
+        """界面线程：记录一次绘制耗时"""
+        self.paint_times.append(paint_ms)
+
+    def record_produce(self, produce_ms):
+        """画面线程：记录一帧数据的生成耗时"""
+        self.produce_times.append(produce_ms)
+
+    def set_enabled(self, enabled):
+        """开关自动调节，关闭时恢复最高画质"""
+        self.enabled = enabled
+        self.up_backoff = 1
+        self.set_level(0)
+
+    def set_level(self, level):
+        """手动指定档位，并重新开始计量"""
+        level = max(0, min(level, len(QUALITY_LEVELS) - 1))
+        self.raised = level < self.level
+        self.level = level
+        self.over_count = 0
+        self.under_count = 0
+        self.windows_at_level = 0
+        self.paint_times.clear()
+        self.produce_times.clear()
+
+    def evaluate(self, requested_rate, dropped_frames=0):
+        """界面定时调用：窗口内样本足够时评估一次，档位改变时返回True"""
+        if not self.enabled or len(self.paint_times) < self.min_samples:
+            return False
+        paint_ms = np.percentile(list(self.paint_times), 90)
+        produce_ms = np.percentile(list(self.produce_times), 90) if self.produce_times else 0.0
+        cost_ms = max(paint_ms, produce_ms)  # 绘制与生成在不同线程中并行
+        dropped = 0 if self.last_dropped is None else max(0, dropped_frames - self.last_dropped)
+        self.last_dropped = dropped_frames
+        self.paint_times.clear()
+        self.produce_times.clear()
+        self.windows_at_level += 1
+        if self.raised and self.windows_at_level > self.up_after:
+            self.up_backoff = 1  # 升档后已稳定运行
+
+        self.last_load = cost_ms * self.frame_rate(requested_rate) / 1000
+        if self.last_load > self.high_load or dropped > self.min_samples // 2:
+            self.over_count += 1
+            self.under_count = 0
+        elif self.level > 0 and cost_ms * self.frame_rate(requested_rate, self.level - 1) / 1000 < self.low_load:
+            self.under_count += 1
+            self.over_count = 0
+        else:
+            self.over_count = 0
+            self.under_count = 0
+
+        if self.over_count >= self.down_after and self.level < len(QUALITY_LEVELS) - 1:
+            if self.raised and self.windows_at_level <= self.down_after * 2:
+                self.up_backoff = min(self.up_backoff * 2, 16)
+            self.set_level(self.level + 1)
+            return True
+        if self.under_count >= self.up_after * self.up_backoff:
+            self.set_level(self.level - 1)
+            return True
+        return False
+
+    def status_text(self):
+        """状态栏显示的画质说明"""
+        if not self.enabled:
+            return "画质: 固定"
+        load = "" if self.last_load is None else f" 负载 {self.last_load * 100:.0f}%"
+        return f"画质: {self.current.name}{load}"
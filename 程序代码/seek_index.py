@@ -0,0 +1,241 @@
+import io
+import mmap
+import os
+
+import numpy as np
+
+# MPEG Layer III 比特率表 (kbps)，索引0为自由格式
+MPEG1_BITRATES = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+MPEG2_BITRATES = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+# 从中间帧开始解码时，解码器要先重新同步并填充比特储备，开头若干帧输出无效，
+# 其帧数与码率有关，构建索引时实测得出，跳转时多回退这些帧预解码并丢弃
+MAX_SETTLE_FRAMES = 16
+SETTLE_MARGIN = 2
+CALIBRATION_FRAMES = 256  # 校准时顺序解码的帧数（约6秒）
+DECODER_DELAY = 529  # Layer III解码器固有延迟
+
+
+class FileSlice(io.RawIOBase):
+    """从指定字节偏移开始的只读文件视图，供解码器从帧边界处打开"""
+
+    def __init__(self, file_path, offset):
+        super().__init__()
+        self.file = open(file_path, "rb")
+        self.offset = offset
+        self.size = os.path.getsize(file_path) - offset
+        self.file.seek(offset)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self.file.readinto(buffer)
+
+    def seek(self, position, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            target = position
+        elif whence == io.SEEK_CUR:
+            target = self.tell() + position
+        else:
+            target = self.size + position
+        self.file.seek(self.offset + max(0, target))
+        return self.tell()
+
+    def tell(self):
+        return self.file.tell() - self.offset
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
+def parse_gapless_delay(header, side_info_length, samples_per_frame):
+    """读取首帧中的Xing/Info与LAME标签，返回完整解码输出相对于第0帧起点的采样偏移
+
+    带信息帧时解码器不输出该帧，并按LAME标签裁掉编码器延迟和解码器固有的529个采样。
+    """
+    tag = header[4 + side_info_length:8 + side_info_length]
+    if tag not in (b"Xing", b"Info"):
+        return 0
+    delay = samples_per_frame
+    lame = 4 + side_info_length + 120
+    if header[lame:lame + 4] == b"LAME" and len(header) >= lame + 24:
+        encoder_delay = (header[lame + 21] << 4) | (header[lame + 22] >> 4)
+        delay += encoder_delay + DECODER_DELAY
+    return delay
+
+
+def scan_mp3_frames(file_path):
+    """扫描MP3帧头，返回 (每帧采样数, 各帧起始字节偏移数组, 解码偏移)，无法解析时返回None"""
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        position = 0
+        if data[:3] == b"ID3":
+            # ID3v2标签长度为同步安全整数
+            size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+            position = 10 + size + (10 if data[5] & 0x10 else 0)
+
+        offsets = []
+        samples_per_frame = None
+        delay = 0
+        end = len(data) - 4
+        while position < end:
+            b0, b1, b2 = data[position], data[position + 1], data[position + 2]
+            version = (b1 >> 3) & 3
+            if b0 != 0xFF or (b1 & 0xE0) != 0xE0 or version == 1 or ((b1 >> 1) & 3) != 1:
+                if offsets:
+                    break  # 尾部的ID3v1/APE标签
+                position += 1  # 首帧之前的垃圾数据，逐字节寻找同步字
+                continue
+            bitrate_index = b2 >> 4
+            rate_index = (b2 >> 2) & 3
+            if bitrate_index in (0, 15) or rate_index == 3:
+                return None  # 自由格式或无效帧头
+            padding = (b2 >> 1) & 1
+            sample_rate = SAMPLE_RATES[version][rate_index]
+            mono = (data[position + 3] >> 6) == 3
+            if version == 3:
+                length = 144000 * MPEG1_BITRATES[bitrate_index] // sample_rate + padding
+                samples_per_frame = 1152
+                side_info_length = 17 if mono else 32
+            else:
+                length = 72000 * MPEG2_BITRATES[bitrate_index] // sample_rate + padding
+                samples_per_frame = 576
+                side_info_length = 9 if mono else 17
+            if not offsets:
+                delay = parse_gapless_delay(data[position:position + length], side_info_length,
+                                            samples_per_frame)
+            offsets.append(position)
+            position += length
+
+    if len(offsets) <= MAX_SETTLE_FRAMES * 3:
+        return None
+    return samples_per_frame, np.asarray(offsets, dtype=np.int64), delay
+
+
+class Mp3SeekIndex:
+    """MP3跳转索引：采样位置 -> 帧起始字节偏移，跳转时从最近的帧边界直接开始解码"""
+
+    def __init__(self, file_path, samples_per_frame, offsets, delay, preroll_frames=MAX_SETTLE_FRAMES):
+        self.file_path = file_path
+        self.samples_per_frame = samples_per_frame
+        self.offsets = offsets
+        self.delay = delay  # 解码器输出的第0个采样相对于第0帧起点的偏移（编码器延迟、信息帧等）
+        self.preroll_frames = preroll_frames
+
+    def frame_start_sample(self, frame_index):
+        """第k帧第一个采样在完整解码输出中的位置"""
+        return frame_index * self.samples_per_frame - self.delay
+
+    def locate(self, position):
+        """返回 (开始解码的帧序号, 需丢弃的采样数)"""
+        target = (position + self.delay) // self.samples_per_frame
+        frame_index = int(min(target, len(self.offsets) - 1)) - self.preroll_frames
+        return frame_index, position - self.frame_start_sample(frame_index)
+
+    def open_at(self, position):
+        """在position之前足够远的帧边界打开解码器，返回 (SoundFile, 需丢弃的采样数)；太靠前时返回None"""
+        import soundfile
+
+        frame_index, skip = self.locate(position)
+        if frame_index < 1 or skip < 0:
+            return None
+        sound_file = soundfile.SoundFile(FileSlice(self.file_path, int(self.offsets[frame_index])))
+        return sound_file, skip
+
+    def to_arrays(self):
+        """序列化为可缓存的数组"""
+        params = [self.samples_per_frame, self.delay, self.preroll_frames]
+        return {"offsets": self.offsets, "params": np.array(params, dtype=np.int64)}
+
+    @classmethod
+    def from_arrays(cls, file_path, arrays):
+        """从缓存的数组恢复"""
+        samples_per_frame, delay, preroll_frames = (int(v) for v in arrays["params"])
+        return cls(file_path, samples_per_frame, arrays["offsets"], delay, preroll_frames)
+
+
+def measure_settle_frames(index, reference, frame):
+    """从第frame帧开始解码，返回输出与顺序解码一致之前的无效帧数，始终不一致时返回None"""
+    import soundfile
+
+    frame_length = index.samples_per_frame
+    start = index.frame_start_sample(frame)
+    expected = reference[start:start + frame_length * (MAX_SETTLE_FRAMES + 2)]
+    with soundfile.SoundFile(FileSlice(index.file_path, int(index.offsets[frame]))) as partial:
+        probe = partial.read(len(expected), dtype="float32", always_2d=True)
+    if len(probe) != len(expected) or len(expected) % frame_length:
+        return None
+    mismatch = np.abs(probe - expected).max(axis=1) > 1e-4
+    bad = np.flatnonzero(mismatch.reshape(-1, frame_length).any(axis=1))
+    settle = int(bad[-1]) + 1 if len(bad) else 0
+    return settle if settle <= MAX_SETTLE_FRAMES else None
+
+
+def calibrate_index(index):
+    """实测解码器重新同步所需的帧数，并在几处跳转位置校验输出与顺序解码逐采样一致
+
+    参照数据必须顺序解码得到：libsndfile对VBR文件的seek并不精确。
+    """
+    import soundfile
+
+    frame_length = index.samples_per_frame
+    frames = min(len(index.offsets), CALIBRATION_FRAMES)
+    with soundfile.SoundFile(index.file_path) as full:
+        reference = full.read(index.frame_start_sample(frames), dtype="float32", always_2d=True)
+
+    last = frames - MAX_SETTLE_FRAMES - 3
+    settles = [measure_settle_frames(index, reference, int(frame))
+               for frame in np.linspace(MAX_SETTLE_FRAMES, last, 3).astype(np.int64)]
+    if None in settles:
+        return False
+    index.preroll_frames = max(settles) + SETTLE_MARGIN
+
+    for frame in np.linspace(index.preroll_frames + 1, last, 4).astype(np.int64):
+        position = index.frame_start_sample(int(frame)) + frame_length // 3
+        expected = reference[position:position + frame_length * 2]
+        opened = index.open_at(position)
+        if opened is None:
+            return False
+        sound_file, skip = opened
+        with sound_file:
+            probe = sound_file.read(skip + len(expected), dtype="float32", always_2d=True)[skip:]
+        if len(probe) != len(expected) or not np.allclose(probe, expected, atol=1e-4):
+            return False
+    return True
+
+
+def build_seek_index(file_path, cache=None):
+    """加载时为压缩格式构建一次跳转索引，并作为解码缓存的附属数据保存
+
+    目前只有MP3需要：FLAC自带seektable，Ogg由libsndfile二分查找，WAV可直接定位。
+    """
+    if os.path.splitext(file_path)[1].lower() != ".mp3":
+        return None
+    if cache is not None:
+        arrays = cache.load_sidecar(file_path, "seek_index")
+        if arrays is not None:
+            return Mp3SeekIndex.from_arrays(file_path, arrays)
+
+    try:
+        scanned = scan_mp3_frames(file_path)
+        if scanned is None:
+            return None
+        index = Mp3SeekIndex(file_path, *scanned)
+        if not calibrate_index(index):
+            print("跳转索引与解码器输出不一致，改用解码器自身的定位")
+            return None
+    except Exception as e:
+        print(f"无法构建跳转索引: {e}")
+        return None
+
+    if cache is not None:
+        try:
+            cache.save_sidecar(file_path, "seek_index", index.to_arrays())
+        except OSError as e:
+            print(f"无法缓存跳转索引: {e}")
+    return index
@@ -0,0 +1,81 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+
+def lissajous(fs, seconds, freq_x=220.0, freq_y=330.0, phase=np.pi / 2, amplitude=0.5):
+    """生成左右声道为李萨如图形的立体声测试信号，返回 (N, 2) 的float32数组"""
+    t = np.arange(int(fs * seconds), dtype=np.float64) / fs
+    left = np.sin(2 * np.pi * freq_x * t + phase)
+    right = np.sin(2 * np.pi * freq_y * t)
+    return (amplitude * np.column_stack((left, right))).astype(np.float32)
+
+
+def swept_lissajous(fs, seconds, start_ratio=1.0, end_ratio=2.0, base_freq=110.0, amplitude=0.5):
+    """生成频率比随时间缓慢变化的立体声信号，图形持续演变"""
+    t = np.arange(int(fs * seconds), dtype=np.float64) / fs
+    ratio = start_ratio + (end_ratio - start_ratio) * t / max(seconds, 1e-9)
+    phase_y = 2 * np.pi * base_freq * np.cumsum(ratio) / fs
+    left = np.sin(2 * np.pi * base_freq * t)
+    right = np.sin(phase_y)
+    return (amplitude * np.column_stack((left, right))).astype(np.float32)
+
+
+def noise(fs, seconds, amplitude=0.3, seed=0):
+    """生成固定种子的立体声白噪声（最坏情况：点均匀铺满屏幕）"""
+    rng = np.random.default_rng(seed)
+    return (amplitude * rng.standard_normal((int(fs * seconds), 2))).astype(np.float32)
+
+
+GENERATORS = {"lissajous": lissajous, "swept": swept_lissajous, "noise": noise}
+
+
+def to_pcm(data, sample_format):
+    """将float32立体声转换为交织的原始PCM字节：s16为16位整数，f32为32位浮点"""
+    if sample_format == "s16":
+        return (np.clip(data, -1, 1) * 32767).astype("<i2").tobytes()
+    return data.astype("<f4").tobytes()
+
+
+def main():
+    """命令行入口：按实时速率向标准输出写原始PCM，用于测试播放器的管道输入
+
+    例：python signal_generator.py lissajous | python oscillofun_player.py --pipe -
+    """
+    parser = argparse.ArgumentParser(description="生成测试信号，以交织的原始PCM写到标准输出")
+    parser.add_argument("signal", nargs="?", choices=sorted(GENERATORS), default="lissajous")
+    parser.add_argument("--rate", type=int, default=44100, help="采样率")
+    parser.add_argument("--format", choices=("s16", "f32"), default="s16", help="采样格式")
+    parser.add_argument("--seconds", type=float, default=0, help="输出时长，0表示一直输出")
+    parser.add_argument("--loop-seconds", type=float, default=10, help="预先生成并循环输出的信号长度")
+    parser.add_argument("--no-realtime", action="store_true", help="不按实时速率限速，尽快输出")
+    args = parser.parse_args()
+
+    pcm = to_pcm(GENERATORS[args.signal](args.rate, args.loop_seconds), args.format)
+    frame_bytes = len(pcm) // int(args.rate * args.loop_seconds)
+    chunk = (args.rate // 50) * frame_bytes  # 每次写20毫秒
+    total = int(args.seconds * args.rate) * frame_bytes if args.seconds > 0 else None
+    out = sys.stdout.buffer
+    written = 0
+    start = time.monotonic()
+    try:
+        while total is None or written < total:
+            offset = written % len(pcm)
+            size = min(chunk, len(pcm) - offset)
+            if total is not None:
+                size = min(size, total - written)
+            out.write(pcm[offset:offset + size])
+            out.flush()
+            written += size
+            if not args.no_realtime:
+                wait = start + written / frame_bytes / args.rate - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass  # 读取端已关闭
+
+
+if __name__ == "__main__":
+    main()
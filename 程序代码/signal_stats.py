@@ -0,0 +1,217 @@
+import numpy as np
+
+from audio_source import as_audio_source
+from signal_transform import SignalTransform
+
+DEFAULT_DISPLAY_RANGE = (-0.7, 0.7, -0.7, 0.7)
+HISTOGRAM_BINS = 4096
+HISTOGRAM_LIMIT = 2.0  # 直方图覆盖 [-2, 2]，超出的采样计入两端
+MIN_HALF_SPAN = 0.01  # 静音文件的最小显示半幅
+
+
+class SignalStats:
+    """逐声道的峰值、RMS、直流偏移与分位数统计，可按数据块增量累积
+
+    分位数由固定分箱的直方图给出，每个数据块只需一次向量化的bincount，
+    因此既能在加载时一次扫描完整文件，也能跟随流式解码逐块更新。
+    """
+
+    def __init__(self, channels=2):
+        self.channels = channels
+        self.count = 0
+        self.total = np.zeros(channels)
+        self.total_squares = np.zeros(channels)
+        self.minimum = np.full(channels, np.inf)
+        self.maximum = np.full(channels, -np.inf)
+        self.histogram = np.zeros((channels, HISTOGRAM_BINS), dtype=np.int64)
+        self.complete = False  # 是否已覆盖整个文件
+
+    def update(self, block):
+        """累积一个 (采样点, 声道) 数据块"""
+        if len(block) == 0:
+            return
+        block = block[:, :self.channels]
+        self.count += len(block)
+        self.total += block.sum(axis=0, dtype=np.float64)
+        self.total_squares += np.einsum("ij,ij->j", block, block, dtype=np.float64)
+        np.minimum(self.minimum, block.min(axis=0), out=self.minimum)
+        np.maximum(self.maximum, block.max(axis=0), out=self.maximum)
+
+        # 各声道的分箱序号错开HISTOGRAM_BINS，一次bincount得到所有声道的直方图
+        scale = HISTOGRAM_BINS / (2 * HISTOGRAM_LIMIT)
+        bins = ((block + HISTOGRAM_LIMIT) * scale).astype(np.int64)
+        np.clip(bins, 0, HISTOGRAM_BINS - 1, out=bins)
+        bins += np.arange(self.channels) * HISTOGRAM_BINS
+        self.histogram += np.bincount(bins.ravel(), minlength=self.histogram.size).reshape(self.histogram.shape)
+
+    @property
+    def peak(self):
+        return np.maximum(np.abs(self.minimum), np.abs(self.maximum)) if self.count else np.zeros(self.channels)
+
+    @property
+    def dc_offset(self):
+        return self.total / self.count if self.count else np.zeros(self.channels)
+
+    @property
+    def rms(self):
+        return np.sqrt(self.total_squares / self.count) if self.count else np.zeros(self.channels)
+
+    def percentile(self, q):
+        """各声道的q分位数（精度为一个直方图分箱）"""
+        if not self.count:
+            return np.zeros(self.channels)
+        cumulative = np.cumsum(self.histogram, axis=1)
+        index = np.array([np.searchsorted(row, q / 100 * row[-1]) for row in cumulative])
+        edges = (index + 0.5) * (2 * HISTOGRAM_LIMIT / HISTOGRAM_BINS) - HISTOGRAM_LIMIT
+        return np.clip(edges, self.minimum, self.maximum)
+
+    def display_range(self, channels=(0, 1), transform=None, coverage=99.9, margin=1.1):
+        """以直流偏移为中心、覆盖coverage%采样的显示范围，X/Y取相同半幅避免图形变形
+
+        transform为显示前的信号变换（默认只乘方向系数 (-1, -1)），范围按变换后的坐标给出。
+        """
+        if not self.count:
+            return list(DEFAULT_DISPLAY_RANGE)
+        transform = transform or SignalTransform((-1, -1))
+        tail = (100 - coverage) / 2
+        low = self.percentile(tail)[list(channels)]
+        high = self.percentile(100 - tail)[list(channels)]
+        center = self.dc_offset[list(channels)]
+        half = max(np.max(np.maximum(high - center, center - low)) * margin * transform.extent(), MIN_HALF_SPAN)
+        cx, cy = transform.apply(center.astype(np.float32))  # 显示的数据已经过信号变换
+        return [float(cx - half), float(cx + half), float(cy - half), float(cy + half)]
+
+    def summary(self):
+        """各声道统计的文字摘要"""
+        return " | ".join(f"声道{c + 1}: 峰值 {self.peak[c]:.3f} RMS {self.rms[c]:.3f} 直流 {self.dc_offset[c]:+.4f}"
+                          for c in range(self.channels))
+
+    def to_arrays(self):
+        """序列化为可缓存的数组"""
+        return {"count": np.array([self.count]), "total": self.total, "total_squares": self.total_squares,
+                "minimum": self.minimum, "maximum": self.maximum, "histogram": self.histogram}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """从缓存的数组恢复，缓存中只保存完整扫描的结果"""
+        stats = cls(len(arrays["total"]))
+        stats.count = int(arrays["count"][0])
+        stats.total = arrays["total"]
+        stats.total_squares = arrays["total_squares"]
+        stats.minimum = arrays["minimum"]
+        stats.maximum = arrays["maximum"]
+        stats.histogram = arrays["histogram"]
+        stats.complete = True
+        return stats
+
+
+class StatsWriter:
+    """挂接到流式解码上的统计写入器：解码块增量更新统计，完整覆盖文件后写入缓存
+
+    统计与采样顺序无关，跳转后继续累积尚未覆盖的部分；只有向后跳过了数据时才无法完整。
+    """
+    sequential = False  # 跳转后仍保留挂接
+
+    def __init__(self, stats, file_path=None, cache=None):
+        self.stats = stats
+        self.file_path = file_path
+        self.cache = cache
+        self.position = 0  # 已累积到的采样位置
+        self.gapless = True
+
+    def write(self, position, block):
+        """累积一个解码块中尚未统计过的部分"""
+        end = position + len(block)
+        if end <= self.position:
+            return  # 向前跳转后重新解码的数据已统计过
+        if position > self.position:
+            self.gapless = False
+        self.stats.update(block[max(0, self.position - position):])
+        self.position = end
+
+    def finish(self, total_samples):
+        """解码结束，统计覆盖整个文件时缓存"""
+        if self.gapless and self.position == total_samples:
+            self.stats.complete = True
+            save_stats(self.file_path, self.stats, self.cache)
+
+    def abort(self):
+        """发生跳转，无需处理"""
+
+
+def compute_stats(data, chunk_size=65536):
+    """对完整的 (采样点, 声道) 数组或可随机读取的数据源做一次分块扫描"""
+    source = as_audio_source(data, None)
+    stats = SignalStats(source.channels)
+    for start in range(0, len(source), chunk_size):
+        block = source.read(start, start + chunk_size)
+        stats.update(block.reshape(len(block), -1))
+    stats.complete = True
+    return stats
+
+
+def save_stats(file_path, stats, cache):
+    """将完整的统计作为解码缓存的附属数据保存"""
+    if cache is None or file_path is None:
+        return
+    try:
+        cache.save_sidecar(file_path, "signal_stats", stats.to_arrays())
+    except OSError as e:
+        print(f"无法缓存信号统计: {e}")
+
+
+def load_stats(file_path, data, cache=None):
+    """获取音频的信号统计：优先读缓存；流式数据源挂接增量统计；内存数组或内存映射数据源一次扫描后缓存
+
+    流式数据源必须以start=False构造，挂接写入器后再启动解码。
+    """
+    if cache is not None:
+        arrays = cache.load_sidecar(file_path, "signal_stats")
+        if arrays is not None:
+            return SignalStats.from_arrays(arrays)
+
+    if hasattr(data, "block_sinks"):
+        stats = SignalStats(data.channels)
+        data.block_sinks.append(StatsWriter(stats, file_path, cache))
+        return stats
+
+    stats = compute_stats(data)
+    save_stats(file_path, stats, cache)
+    return stats
+
+
+class RangeTracker:
+    """播放中缓慢自适应的显示范围：按每帧自身的峰值（只对当前帧做归约）平滑跟随
+
+    范围扩大快、收缩慢以免削顶；半幅不低于全文件统计范围的一定比例，避免在静音段放大底噪。
+    平滑后的半幅变化超过step比例时才更新输出的范围，范围不必每帧改变（背景缓存与余辉随之保持）。
+    """
+
+    def __init__(self, base_range, attack_time=0.05, release_time=2.0, floor_ratio=0.15, margin=1.2, step=0.02):
+        self.attack_time = attack_time
+        self.release_time = release_time
+        self.floor_ratio = floor_ratio
+        self.margin = margin
+        self.step = step
+        self.set_base_range(base_range)
+        self.half = self.base_half
+        self.output_half = self.half  # 最近一次输出的半幅
+
+    def set_base_range(self, base_range):
+        """设置全文件统计给出的显示范围，作为中心和半幅下限的依据"""
+        x_min, x_max, y_min, y_max = base_range
+        self.center = ((x_min + x_max) / 2, (y_min + y_max) / 2)
+        self.base_half = max(x_max - x_min, y_max - y_min) / 2
+
+    def update(self, frame_data, dt):
+        """用一帧数据更新范围，返回新的显示范围"""
+        if frame_data is not None and len(frame_data) and frame_data.ndim == 2:
+            deviation = np.abs(frame_data[:, :2] - self.center).max() * self.margin
+            target = max(deviation, self.base_half * self.floor_ratio, MIN_HALF_SPAN)
+            time_constant = self.attack_time if target > self.half else self.release_time
+            self.half += (target - self.half) * (1 - np.exp(-dt / time_constant))
+            if abs(self.half - self.output_half) > self.output_half * self.step:
+                self.output_half = self.half
+        cx, cy = self.center
+        half = self.output_half
+        return [cx - half, cx + half, cy - half, cy + half]
@@ -0,0 +1,94 @@
+import numpy as np
+
+SQRT_HALF = np.sqrt(0.5)
+
+# 视图 -> (名称, 作用于方向系数之后的2×2矩阵)
+VIEWS = {
+    "xy": ("X-Y", np.eye(2)),
+    # 测角仪：左右声道旋转45°，水平为侧信号 (L-R)/√2，垂直为中信号 (L+R)/√2
+    "mid_side": ("中/侧", np.array([[SQRT_HALF, -SQRT_HALF], [SQRT_HALF, SQRT_HALF]])),
+}
+
+
+class SignalTransform:
+    """显示前的信号变换：去直流、增益、方向系数、视图旋转与坐标轴反转合成为一个2×2矩阵加偏移
+
+    参数变化时只重建矩阵，每帧只需一次matmul；矩阵与偏移作为一个元组整体替换，
+    界面线程修改参数时画面线程读到的始终是一致的一组系数。
+    """
+
+    def __init__(self, direction_coeff=(1, 1), x_reversed=False, y_reversed=False, view="xy",
+                 gain=1.0, dc_offset=(0.0, 0.0)):
+        self.direction_coeff = tuple(direction_coeff)
+        self.x_reversed = x_reversed
+        self.y_reversed = y_reversed
+        self.view = view
+        self.gain = gain
+        self.dc_offset = tuple(dc_offset)
+        self.coefficients = None  # (转置后的float32矩阵, float32偏移或None)
+        self.rebuild()
+
+    def rebuild(self):
+        """按当前参数重建矩阵：y = F·V·D·g·(x - dc)，合成为 y = M·x + b"""
+        if self.view not in VIEWS:
+            raise ValueError(f"未知的视图: {self.view}")
+        flips = np.diag([-1.0 if self.x_reversed else 1.0, -1.0 if self.y_reversed else 1.0])
+        matrix = flips @ VIEWS[self.view][1] @ np.diag(self.direction_coeff) * self.gain
+        offset = -matrix @ np.asarray(self.dc_offset, dtype=np.float64)
+        self.coefficients = (np.ascontiguousarray(matrix.T, dtype=np.float32),
+                             offset.astype(np.float32) if np.any(offset) else None)
+
+    def set_axis_reversed(self, x=None, y=None):
+        """设置坐标轴反转，None表示不变"""
+        if x is not None:
+            self.x_reversed = x
+        if y is not None:
+            self.y_reversed = y
+        self.rebuild()
+
+    def set_view(self, view):
+        """设置视图（xy / mid_side）"""
+        self.view = view
+        self.rebuild()
+
+    def set_gain(self, gain):
+        """设置增益"""
+        self.gain = gain
+        self.rebuild()
+
+    def set_dc_offset(self, dc_offset):
+        """设置需要减去的直流偏移（左、右声道）"""
+        self.dc_offset = tuple(float(v) for v in dc_offset)
+        self.rebuild()
+
+    @property
+    def matrix(self):
+        return self.coefficients[0].T
+
+    @property
+    def offset(self):
+        offset = self.coefficients[1]
+        return np.zeros(2, dtype=np.float32) if offset is None else offset
+
+    def apply(self, frame_data, out=None):
+        """变换一帧 (采样点, 2) 数据，提供out时直接写入out"""
+        matrix_t, offset = self.coefficients
+        result = np.matmul(frame_data, matrix_t, out=out)
+        if offset is not None:
+            result += offset
+        return result
+
+    def extent(self):
+        """半幅为h的正方形变换后的最大半幅与h之比，用于换算显示范围"""
+        return float(np.abs(self.matrix).sum(axis=1).max())
+
+    def describe(self):
+        """变换状态的文字说明"""
+        text = f"X轴: {'反向' if self.x_reversed else '正向'}, Y轴: {'反向' if self.y_reversed else '正向'}"
+        if self.view != "xy":
+            text += f", 视图: {VIEWS[self.view][0]}"
+        if self.gain != 1:
+            text += f", 增益: {self.gain:g}x"
+        if any(self.dc_offset):
+            text += ", 已去直流"
+        return text
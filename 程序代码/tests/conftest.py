@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 模块平铺在程序代码目录下，测试从该目录导入；界面相关的检查在离屏平台上运行
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
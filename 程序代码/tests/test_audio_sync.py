@@ -0,0 +1,72 @@
+import wave
+
+import numpy as np
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("pygame")
+
+from audio_backends import ManualClock, NullSink
+from audio_loader import load_audio
+from audio_player import AudioPlayer
+from audio_source import as_audio_source
+from oscillofun_thread import OscillofunThread
+
+
+def write_test_wav(path, seconds, fs=44100):
+    """写入一段16位立体声李萨如信号"""
+    t = np.arange(int(seconds * fs)) / fs
+    samples = np.column_stack((np.sin(2 * np.pi * 220 * t), np.sin(2 * np.pi * 330 * t))) * 0.5
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(fs)
+        f.writeframes((samples * 32767).astype("<i2").tobytes())
+
+
+def test_null_sink_rolls_over_to_queued_track():
+    fs = 1000
+    clock = ManualClock()
+    sink = NullSink(as_audio_source(np.zeros((2500, 2), np.float32), fs), fs, clock)
+    sink.start(0)
+    clock.advance(1.0)
+    assert sink.get_position_samples() == 1000
+
+    generation = sink.set_next(as_audio_source(np.zeros((1000, 2), np.float32), fs))
+    clock.advance(2.0)
+    assert sink.get_position_samples(generation) == 500  # 越过第一首末尾后从下一首开头计
+    assert sink.get_position_samples(0) == 2500  # 已播完的曲目报告其长度
+
+    sink.pause()
+    clock.advance(5.0)
+    assert sink.get_position_samples(generation) == 500
+    sink.unpause()
+    clock.advance(1.0)
+    assert sink.get_position_samples(generation) == 1000  # 没有下一首时停在末尾
+
+
+def test_frames_follow_null_sink_clock(tmp_path):
+    from PyQt5.QtCore import QCoreApplication
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    frame_rate = 30
+    path = tmp_path / "sync.wav"
+    write_test_wav(path, 1.5)
+    data, fs = load_audio(str(path))
+
+    player = AudioPlayer("null")
+    assert player.load_samples(data, fs, str(path))
+    thread = OscillofunThread(data, fs, frame_rate=frame_rate)
+    thread.set_clock_source(player.get_position)
+    thread.start()
+    player.play()
+    finished = thread.wait(5000)
+    player.stop()
+    player.release_samples()
+    app.processEvents()
+
+    assert finished
+    assert thread.current_frame >= thread.total_frames
+    stats = thread.get_sync_stats()
+    assert stats["dropped_frames"] <= 2
+    assert stats["max_sync_offset"] < 1.5 / frame_rate  # 画面与音频时钟的偏差不超过一帧半
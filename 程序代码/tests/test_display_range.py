@@ -0,0 +1,72 @@
+import types
+
+import numpy as np
+import pytest
+
+from signal_stats import SignalStats
+from signal_transform import SignalTransform
+from oscilloscope_widget import map_to_screen
+
+
+def dc_offset_signal(n=4410, dc=0.3, amplitude=0.05):
+    """带直流偏移的小幅正弦：X/Y两声道相位相差90度，画面为偏离原点的小圆"""
+    t = np.arange(n) / 441
+    return np.column_stack((dc + amplitude * np.cos(2 * np.pi * t),
+                            dc + amplitude * np.sin(2 * np.pi * t))).astype(np.float32)
+
+
+def auto_range(data):
+    stats = SignalStats()
+    stats.update(data)
+    return stats.display_range(transform=SignalTransform())
+
+
+def test_auto_range_is_centered_on_dc_offset():
+    x_min, x_max, y_min, y_max = auto_range(dc_offset_signal())
+    assert (x_min + x_max) / 2 == pytest.approx(0.3, abs=1e-3)
+    assert (y_min + y_max) / 2 == pytest.approx(0.3, abs=1e-3)
+
+
+def test_map_to_screen_keeps_offset_signal_on_screen():
+    data = dc_offset_signal()
+    screen = map_to_screen(data, 300, 200, auto_range(data))
+    assert screen[:, 0].min() >= 0 and screen[:, 0].max() <= 300
+    assert screen[:, 1].min() >= 0 and screen[:, 1].max() <= 200
+    assert screen[:, 0].mean() == pytest.approx(150, abs=2)  # 显示范围中心落在窗口中心
+    assert screen[:, 1].mean() == pytest.approx(100, abs=2)
+
+
+def test_gl_transform_matches_map_to_screen():
+    gl_widget = pytest.importorskip("gl_oscilloscope_widget")
+    data = dc_offset_signal()
+    width, height = 300, 200
+    display_range = auto_range(data)
+    scale, offset = gl_widget.GLOscilloscopeWidget.screen_transform(
+        types.SimpleNamespace(display_range=display_range), width, height)
+    ndc = data * np.array(scale) + np.array(offset)
+    screen = map_to_screen(data, width, height, display_range)
+    expected = np.column_stack((2 * screen[:, 0] / width - 1, 1 - 2 * screen[:, 1] / height))
+    np.testing.assert_allclose(ndc, expected, atol=1e-6)
+
+
+def test_painter_widget_draws_offset_signal():
+    QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+    from gl_oscilloscope_widget import image_to_rgb, check_lit_pixels
+    from oscilloscope_widget import OscilloscopeWidget
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    data = dc_offset_signal()
+    widget = OscilloscopeWidget()
+    widget.set_transform(SignalTransform())
+    widget.resize(300, 300)
+    widget.show()
+    widget.set_display_range(auto_range(data))
+    widget.set_frame_data(data)
+    for _ in range(5):
+        app.processEvents()
+    rgb = image_to_rgb(widget.grab().toImage())
+    expected = map_to_screen(data[:441], widget.width(), widget.height(), widget.display_range)
+    hit, stray = check_lit_pixels(rgb, expected, radius=widget.point_size * 2 + 2)
+    widget.close()
+    assert hit > 0.9  # 顶部少数点被标题文字遮挡
+    assert stray == 0
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("PyQt5")
+
+from multi_scope import MultiScopeScheduler
+from signal_transform import SignalTransform
+
+
+def test_scopes_use_their_signal_transform():
+    fs, frame_rate = 1000, 10
+    data = np.random.default_rng(0).uniform(-1, 1, (fs, 4)).astype(np.float32)
+    scheduler = MultiScopeScheduler(frame_rate, workers=1)
+    source_id = scheduler.add_source(data, fs)
+    default_id = scheduler.add_scope(source_id, (0, 1))
+    transform = SignalTransform(direction_coeff=(-1, -1), view="mid_side")
+    transformed_id = scheduler.add_scope(source_id, (2, 3), transform=transform)
+
+    def frame_of(scope_id):
+        scheduler.publish_frame(3)
+        return {sid: frame.copy() for sid, frame, _, _ in scheduler.take_latest_frames()}[scope_id]
+
+    block = data[300:400]
+    np.testing.assert_allclose(frame_of(default_id), -block[:, :2])
+    np.testing.assert_allclose(frame_of(transformed_id), transform.apply(block[:, 2:4]), atol=1e-6)
+
+    transform.set_axis_reversed(x=True)  # 显示组件上的设置修改共用的变换，下一帧即生效
+    flipped = frame_of(transformed_id)
+    np.testing.assert_allclose(flipped, transform.apply(block[:, 2:4]), atol=1e-6)
+    assert not np.allclose(flipped[:, 0], frame_of(default_id)[:, 0])
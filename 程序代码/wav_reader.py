@@ -0,0 +1,132 @@
+import os
+import struct
+
+import numpy as np
+
+from audio_source import to_stereo
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# (格式, 位深) -> (采样数据类型, 零点, 满幅)；24位等非对齐格式交给soundfile
+SAMPLE_FORMATS = {
+    (WAVE_FORMAT_PCM, 8): ("u1", 128, 128),
+    (WAVE_FORMAT_PCM, 16): ("<i2", 0, 32768),
+    (WAVE_FORMAT_PCM, 32): ("<i4", 0, 2 ** 31),
+    (WAVE_FORMAT_IEEE_FLOAT, 32): ("<f4", 0, 1),
+    (WAVE_FORMAT_IEEE_FLOAT, 64): ("<f8", 0, 1),
+}
+
+
+class WavInfo:
+    """WAV文件头信息：采样率、声道数、采样格式与数据区位置"""
+
+    def __init__(self, fs, channels, dtype, zero, full_scale, data_offset, frames):
+        self.fs = fs
+        self.channels = channels
+        self.dtype = dtype
+        self.zero = zero
+        self.full_scale = full_scale
+        self.data_offset = data_offset
+        self.frames = frames
+
+
+def parse_wav_header(file_path):
+    """解析RIFF/WAVE文件头，返回WavInfo；不是可直接映射的PCM/浮点WAV时返回None"""
+    with open(file_path, "rb") as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+            return None
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            chunk_id, size = struct.unpack("<4sI", header)
+            if chunk_id == b"data":
+                break
+            if chunk_id == b"fmt ":
+                fmt = f.read(size)
+                f.seek(size & 1, os.SEEK_CUR)
+            else:
+                f.seek(size + (size & 1), os.SEEK_CUR)  # 块按偶数字节对齐
+        data_offset = f.tell()
+        file_size = os.fstat(f.fileno()).st_size
+
+    if fmt is None or len(fmt) < 16:
+        return None
+    format_tag, channels, fs, _, block_align, bits = struct.unpack("<HHIIHH", fmt[:16])
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        format_tag = struct.unpack("<H", fmt[24:26])[0]  # 子格式GUID的前两个字节即格式代码
+    sample_format = SAMPLE_FORMATS.get((format_tag, bits))
+    if sample_format is None or channels == 0 or block_align != channels * bits // 8:
+        return None
+
+    # 录音中断或流式写入的文件数据块长度可能为0或占位值，以文件实际大小为准
+    available = file_size - data_offset
+    if size == 0 or size > available:
+        size = available
+    return WavInfo(fs, channels, *sample_format, data_offset, size // block_align)
+
+
+def map_samples(file_path, info):
+    """以内存映射方式打开原始采样，返回 (采样点, 声道) 数组"""
+    if info.frames == 0:
+        return np.zeros((0, info.channels), dtype=info.dtype)
+    return np.memmap(file_path, dtype=info.dtype, mode="r", offset=info.data_offset,
+                     shape=(info.frames, info.channels))
+
+
+def to_float(samples, info):
+    """将原始采样转换为float32立体声"""
+    if info.dtype == "<f4":
+        return to_stereo(samples)
+    block = np.array(to_stereo(samples), dtype=np.float32)  # 转换结果在内存中，不再是memmap
+    if info.zero:
+        block -= info.zero
+    if info.full_scale != 1:
+        block *= 1 / info.full_scale
+    return block
+
+
+def load_wav(file_path, info=None):
+    """不经解码器读取PCM WAV，返回 (float32立体声数组, 采样率)；格式不支持时返回None
+
+    32位浮点立体声直接返回内存映射（数据按需分页读入），其余格式一次转换。
+    """
+    info = info or parse_wav_header(file_path)
+    if info is None:
+        return None
+    return to_float(map_samples(file_path, info), info), info.fs
+
+
+class WavAudioSource:
+    """内存映射的PCM WAV数据源：随机读取并按块转换为float32立体声，无需解码线程"""
+
+    def __init__(self, file_path, info):
+        self.file_path = file_path
+        self.info = info
+        self.fs = info.fs
+        self.samples = map_samples(file_path, info)
+
+    def __len__(self):
+        return len(self.samples)
+
+    @property
+    def channels(self):
+        return 2  # 读取的数据块统一整理为立体声
+
+    def read(self, start, stop):
+        """读取 [start, stop) 区间的采样点"""
+        return to_float(self.samples[start:stop], self.info)
+
+    def release(self, position):
+        """已播放的数据由系统换出，无需释放"""
+
+    def seek(self, position):
+        """内存映射可随机访问，无需处理"""
+
+    def close(self):
+        """关闭数据源"""
+        self.samples = np.zeros((0, self.info.channels), dtype=self.info.dtype)